@@ -34,6 +34,10 @@ CORS_ALLOWED_ORIGINS = [
     "http://127.0.0.1:8080",
 ]
 
+CORS_EXPOSE_HEADERS = [
+    "X-News-Pending",
+]
+
 
 # Application definition
 
@@ -54,6 +58,11 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Compresses the remaining dynamic responses. Dataset endpoints
+    # (conditional_on_dataset) encode their own responses so that their
+    # strong ETags survive; the middleware passes anything that already
+    # carries a Content-Encoding through untouched.
+    'django.middleware.gzip.GZipMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -94,6 +103,68 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# File based so that snapshots rendered by the pipeline scripts or one web
+# worker are reused by every other worker on the host.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'django_cache',
+    }
+}
+
+# Snapshots are keyed by dataset version, so entries of superseded
+# versions are never read again; they expire after SNAPSHOT_TTL seconds.
+# A current snapshot that expires is re-rendered on the next request.
+
+SNAPSHOT_TTL = 24 * 60 * 60
+
+
+# News feed
+# Headlines are cached per country for NEWS_CACHE_TTL seconds and served
+# stale (while refreshing in the background) for up to NEWS_STALE_TTL.
+
+NEWS_FEED_SOURCE = 'growth.services.news.GoogleNewsSource'
+NEWS_FEED_OPTIONS = {}
+NEWS_CACHE_TTL = 10 * 60
+NEWS_STALE_TTL = 24 * 60 * 60
+NEWS_FETCH_TIMEOUT = 5
+NEWS_BATCH_DEADLINE = 3
+NEWS_BATCH_MAX_COUNTRIES = 20
+
+
+# Growth model registry
+# Versions are registered by scripts/train_ml_model.py; the active one is
+# served by POST /api/predict/. Manage with `manage.py modelregistry`.
+
+MODEL_REGISTRY_DIR = BASE_DIR / 'ml_models'
+
+
+# OSM infrastructure extraction
+# `manage.py extractinfra` adds every city's downloads to the compressed
+# store in OSM_CACHE_DIR, evicting least recently used responses beyond
+# OSM_CACHE_MAX_BYTES (None: no cap); --offline reads the store instead of
+# downloading. Finished cities are recorded in the checkpoint so that an
+# interrupted run can be resumed with --resume. Plain osmnx files left by
+# other tools only join the store, and count against the cap, through
+# `manage.py osmcache import`.
+
+OSM_CACHE_DIR = BASE_DIR / 'cache'
+OSM_CACHE_MAX_BYTES = 20 * 1024 ** 3
+OSM_CHECKPOINT = BASE_DIR / 'osm_checkpoint.json'
+
+# Betweenness is estimated from enough sampled sources for every node's
+# score to be within EPSILON of the exact value with probability
+# 1 - DELTA, unless TIME_BUDGET seconds per city run out first. THREADS
+# searches sources in parallel within one city.
+OSM_BETWEENNESS_EPSILON = 0.05
+OSM_BETWEENNESS_DELTA = 0.1
+OSM_BETWEENNESS_TIME_BUDGET = 60
+OSM_BETWEENNESS_THREADS = 1
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -0,0 +1,81 @@
+from rest_framework.exceptions import ValidationError
+
+# Prediction metrics that carry a (metric, id) index and can therefore
+# be sorted or ranked with an index scan.
+INDEXED_METRICS = ("growth_score", "predicted_growth", "aqi", "crime_rate", "traffic_index")
+
+# Public sort keys -> ORM ordering. "id" follows the metric in the same
+# direction, so the whole ordering is a forward or backward walk of the
+# composite index and cursor pagination has a stable tie-breaker.
+PREDICTION_ORDERINGS = {}
+for _metric in INDEXED_METRICS:
+    PREDICTION_ORDERINGS[_metric] = (_metric, "id")
+    PREDICTION_ORDERINGS[f"-{_metric}"] = (f"-{_metric}", "-id")
+
+DEFAULT_PREDICTION_ORDERING = "-growth_score"
+
+
+def _float_param(params, name):
+    value = params.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise ValidationError({name: f"Expected a number, got '{value}'."})
+
+
+def filter_predictions(queryset, params):
+    """
+    Applies the ?country=, ?min_score=, ?max_score= and ?ordering= query
+    parameters to a CityGrowthPrediction queryset.
+
+    Returns the filtered queryset and the ordering tuple that was applied.
+    """
+    country = params.get("country")
+    if country:
+        queryset = queryset.filter(city__country=country)
+
+    min_score = _float_param(params, "min_score")
+    if min_score is not None:
+        queryset = queryset.filter(growth_score__gte=min_score)
+
+    max_score = _float_param(params, "max_score")
+    if max_score is not None:
+        queryset = queryset.filter(growth_score__lte=max_score)
+
+    ordering_key = params.get("ordering", DEFAULT_PREDICTION_ORDERING)
+    if ordering_key not in PREDICTION_ORDERINGS:
+        raise ValidationError({
+            "ordering": f"Unsupported ordering '{ordering_key}'. "
+                        f"Choose from: {', '.join(sorted(PREDICTION_ORDERINGS))}."
+        })
+    ordering = PREDICTION_ORDERINGS[ordering_key]
+
+    return queryset.order_by(*ordering), ordering
+
+
+def ranking_params(params, max_k):
+    """
+    Validates ?metric=, ?order= and ?k= for the rankings endpoint and
+    returns (metric, ordering, k).
+    """
+    metric = params.get("metric", "growth_score")
+    if metric not in INDEXED_METRICS:
+        raise ValidationError({
+            "metric": f"Unsupported metric '{metric}'. Choose from: {', '.join(INDEXED_METRICS)}."
+        })
+
+    order = params.get("order", "desc")
+    if order not in ("asc", "desc"):
+        raise ValidationError({"order": "Expected 'asc' or 'desc'."})
+
+    try:
+        k = int(params.get("k", 10))
+    except ValueError:
+        raise ValidationError({"k": "Expected an integer."})
+    if not 1 <= k <= max_k:
+        raise ValidationError({"k": f"Must be between 1 and {max_k}."})
+
+    key = metric if order == "asc" else f"-{metric}"
+    return metric, PREDICTION_ORDERINGS[key], k
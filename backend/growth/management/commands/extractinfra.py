@@ -0,0 +1,120 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from growth.models import City, InfrastructureFeature
+from growth.osm import extract
+from growth.services.bulk import bulk_upsert
+from growth.services.snapshots import rebuild_snapshots
+
+METRIC_FIELDS = [
+    "nodes", "edges", "avg_degree", "intersections", "infrastructure_index",
+    "avg_betweenness", "max_betweenness", "giant_component_ratio", "circuity", "street_density",
+]
+
+
+class Command(BaseCommand):
+    help = "Compute street-network features for every city on a process pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--offline", action="store_true",
+                            help="Compute from the cached Overpass responses instead of downloading.")
+        parser.add_argument("--cache-dir", default=None,
+                            help="OSM cache directory; online runs add their downloads to it "
+                                 "(default: OSM_CACHE_DIR).")
+        parser.add_argument("--graph-dir", default=None,
+                            help="Keep assembled road graphs here as .npz and reuse them (offline only).")
+        parser.add_argument("--jobs", type=int, default=4,
+                            help="Worker processes; 1 runs in this process.")
+        parser.add_argument("--batch-size", type=int, default=50,
+                            help="Cities per database write and checkpoint.")
+        parser.add_argument("--checkpoint", default=None,
+                            help="Checkpoint file (default: OSM_CHECKPOINT).")
+        parser.add_argument("--resume", action="store_true",
+                            help="Skip cities the checkpoint marks as saved or skipped.")
+        parser.add_argument("--epsilon", type=float, default=None,
+                            help="Betweenness error bound (default: OSM_BETWEENNESS_EPSILON).")
+        parser.add_argument("--delta", type=float, default=None,
+                            help="Probability the bound may fail (default: OSM_BETWEENNESS_DELTA).")
+        parser.add_argument("--time-budget", type=float, default=None,
+                            help="Seconds of betweenness sampling per city (default: OSM_BETWEENNESS_TIME_BUDGET).")
+        parser.add_argument("--threads", type=int, default=None,
+                            help="Betweenness threads per city (default: OSM_BETWEENNESS_THREADS).")
+
+    def handle(self, *args, offline=False, cache_dir=None, graph_dir=None, jobs=4,
+               batch_size=50, checkpoint=None, resume=False, epsilon=None, delta=None,
+               time_budget=None, threads=None, **options):
+        if jobs < 1 or batch_size < 1:
+            raise CommandError("--jobs and --batch-size must be positive.")
+        metric_options = {
+            "epsilon": epsilon if epsilon is not None else settings.OSM_BETWEENNESS_EPSILON,
+            "delta": delta if delta is not None else settings.OSM_BETWEENNESS_DELTA,
+            "time_budget": time_budget if time_budget is not None else settings.OSM_BETWEENNESS_TIME_BUDGET,
+            "workers": threads if threads is not None else settings.OSM_BETWEENNESS_THREADS,
+        }
+        if not 0 < metric_options["epsilon"] < 1:
+            raise CommandError("--epsilon must be between 0 and 1 (exclusive).")
+        if not 0 < metric_options["delta"] < 1:
+            raise CommandError("--delta must be between 0 and 1 (exclusive).")
+        if metric_options["time_budget"] is not None and metric_options["time_budget"] < 0:
+            raise CommandError("--time-budget must not be negative.")
+        if metric_options["workers"] < 1:
+            raise CommandError("--threads must be positive.")
+        path = checkpoint or settings.OSM_CHECKPOINT
+        self.checkpoint = extract.Checkpoint.load(path) if resume else extract.Checkpoint(path)
+        self.batch = []
+        self.saved = 0
+
+        cities = {city_id: (name, country) for city_id, name, country
+                  in City.objects.order_by("id").values_list("id", "name", "country")}
+        pending = [(city_id, name, country) for city_id, (name, country) in cities.items()
+                   if not self.checkpoint.is_done(city_id)]
+        if len(pending) < len(cities):
+            self.stdout.write(f"Resuming: {len(cities) - len(pending)} cities already done")
+
+        cache_dir = str(cache_dir or settings.OSM_CACHE_DIR)
+        initargs = (cache_dir, graph_dir, metric_options, offline, settings.OSM_CACHE_MAX_BYTES)
+        failed = 0
+        try:
+            for city_id, features, error in self.extract(pending, jobs, initargs):
+                name, _ = cities[city_id]
+                if error is not None:
+                    failed += 1
+                    self.checkpoint.mark([city_id], extract.FAILED)
+                    self.stderr.write(f"Failed {name}: {error}")
+                elif features is None:
+                    self.checkpoint.mark([city_id], extract.SKIPPED)
+                    self.stdout.write(f"No OSM data for {name}, skipping")
+                else:
+                    self.batch.append(InfrastructureFeature(city_id=city_id, **features))
+                    self.stdout.write(f"Computed infrastructure for {name}")
+                    if len(self.batch) >= batch_size:
+                        self.flush()
+        finally:
+            # Keep what finished before an interruption.
+            self.flush()
+
+        if self.saved:
+            rebuild_snapshots()
+        self.stdout.write(self.style.SUCCESS(
+            f"Saved {self.saved} cities, {failed} failed, checkpoint at {self.checkpoint.path}"
+        ))
+
+    def extract(self, pending, jobs, initargs):
+        if jobs == 1:
+            extract.init_worker(*initargs)
+            for item in pending:
+                yield extract.extract_city(*item)
+            return
+        with ProcessPoolExecutor(max_workers=jobs, initializer=extract.init_worker,
+                                 initargs=initargs) as pool:
+            yield from extract.bounded_map(pool, extract.extract_city, pending, limit=2 * jobs)
+
+    def flush(self):
+        batch, self.batch = self.batch, []
+        if batch:
+            bulk_upsert(InfrastructureFeature, batch, unique_fields=["city"], update_fields=METRIC_FIELDS)
+            self.checkpoint.mark([feature.city_id for feature in batch], extract.SAVED)
+            self.saved += len(batch)
+        self.checkpoint.save()
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from growth.ml import registry
+
+
+class Command(BaseCommand):
+    help = "Inspect the growth model registry and move the active version."
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=["list", "show", "promote", "rollback"])
+        parser.add_argument("version", nargs="?", help="Version id for show/promote.")
+
+    def handle(self, *args, action, version=None, **options):
+        try:
+            if action == "list":
+                self.list_versions()
+            elif action == "show":
+                self.show(version or registry.active_version())
+            elif action == "promote":
+                if not version:
+                    raise CommandError("promote needs a version id.")
+                registry.promote(version)
+                self.stdout.write(self.style.SUCCESS(f"Active model version is now {version}"))
+            elif action == "rollback":
+                version = registry.rollback()
+                self.stdout.write(self.style.SUCCESS(f"Rolled back to model version {version}"))
+        except registry.RegistryError as exc:
+            raise CommandError(str(exc))
+
+    def list_versions(self):
+        active = registry.active_version()
+        versions = registry.list_versions()
+        if not versions:
+            self.stdout.write("No model versions registered.")
+        for meta in versions:
+            marker = "*" if meta["version"] == active else " "
+            metrics = ", ".join(f"{k}={v}" for k, v in sorted(meta["metrics"].items()))
+            self.stdout.write(f"{marker} {meta['version']}  {meta['created_at']}  {metrics}")
+
+    def show(self, version):
+        if version is None:
+            raise CommandError("No active model version.")
+        meta = registry.get_metadata(version)
+        for key, value in meta.items():
+            self.stdout.write(f"{key}: {value}")
@@ -0,0 +1,126 @@
+import re
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from growth.osm.store import MANIFEST_FILE, CacheStore
+
+UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+
+
+def parse_size(value):
+    """
+    "500M", "20GB", "1024" -> bytes.
+    """
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMGT]?)I?B?\s*", value.upper())
+    if not match:
+        raise CommandError(f"Invalid size {value!r}; use e.g. 500M or 20G.")
+    return int(float(match.group(1)) * UNITS[match.group(2)])
+
+
+def format_size(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+class Command(BaseCommand):
+    help = "Inspect the OSM response cache, import osmnx downloads into it and prune it."
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=["list", "stats", "import", "prune"])
+        parser.add_argument("--cache-dir", default=None, help="Cache directory (default: OSM_CACHE_DIR).")
+        parser.add_argument("--city", default=None, help="Only entries of this city (list, prune).")
+        parser.add_argument("--keep", action="store_true",
+                            help="import: leave the original osmnx files in place.")
+        parser.add_argument("--max-size", default=None,
+                            help="prune: evict least recently used entries down to this size "
+                                 "(default: OSM_CACHE_MAX_BYTES when no other criterion is given).")
+        parser.add_argument("--older-than", type=float, default=None,
+                            help="prune: remove entries fetched more than this many days ago.")
+        parser.add_argument("--dry-run", action="store_true", help="prune: only list what would go.")
+
+    def handle(self, *args, action, cache_dir=None, city=None, keep=False, max_size=None,
+               older_than=None, dry_run=False, **options):
+        self.store = CacheStore(cache_dir or settings.OSM_CACHE_DIR, settings.OSM_CACHE_MAX_BYTES)
+        if action == "list":
+            self.list_entries(city)
+        elif action == "stats":
+            self.stats()
+        elif action == "import":
+            self.import_files(keep)
+        elif action == "prune":
+            self.prune(max_size, older_than, city, dry_run)
+
+    def pending_files(self):
+        """
+        Plain osmnx responses not in the store yet.
+        """
+        return [path for path in sorted(Path(self.store.directory).glob("*.json"))
+                if path.name != MANIFEST_FILE and path.stem not in self.store]
+
+    def list_entries(self, city):
+        entries = sorted(self.store.entries.items(), key=lambda item: (item[1]["city"], item[1]["fetched_at"]))
+        if city is not None:
+            entries = [(key, entry) for key, entry in entries if entry["city"].lower() == city.lower()]
+        if not entries:
+            self.stdout.write("No cached responses.")
+        for key, entry in entries:
+            self.stdout.write(
+                f"{key[:12]}  {entry['kind']:<9}  {entry['city'] or '-':<20}  "
+                f"{format_size(entry['size']):>9}  fetched {entry['fetched_at'][:19]}  "
+                f"used {entry['last_used'][:19]}"
+            )
+
+    def stats(self):
+        entries = self.store.entries.values()
+        stored = sum(entry["size"] for entry in entries)
+        raw = sum(entry["raw_size"] for entry in entries)
+        cap = settings.OSM_CACHE_MAX_BYTES
+        self.stdout.write(f"{len(entries)} entries, {format_size(stored)} stored "
+                          f"({format_size(raw)} uncompressed)"
+                          + (f", cap {format_size(cap)}" if cap else ""))
+        by_city = defaultdict(lambda: [0, 0])
+        for entry in entries:
+            by_city[entry["city"] or "-"][0] += 1
+            by_city[entry["city"] or "-"][1] += entry["size"]
+        for name, (count, size) in sorted(by_city.items(), key=lambda item: -item[1][1]):
+            self.stdout.write(f"  {name:<20} {count:>5} entries {format_size(size):>10}")
+        pending = self.pending_files()
+        if pending:
+            size = sum(path.stat().st_size for path in pending)
+            self.stdout.write(f"{len(pending)} osmnx files ({format_size(size)}) not imported; "
+                              "run `manage.py osmcache import`.")
+
+    def import_files(self, keep):
+        pending = self.pending_files()
+        imported = self.store.import_files(pending, keep=keep)
+        raw = sum(entry["raw_size"] for entry in imported.values())
+        stored = sum(entry["size"] for entry in imported.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {len(imported)} responses: {format_size(raw)} -> {format_size(stored)}"
+        ))
+
+    def prune(self, max_size, older_than, city, dry_run):
+        max_bytes = parse_size(max_size) if max_size else None
+        if max_bytes is None and older_than is None and city is None:
+            max_bytes = settings.OSM_CACHE_MAX_BYTES
+            if max_bytes is None:
+                raise CommandError("Nothing to prune by: pass --max-size, --older-than or --city.")
+        fetched_before = None
+        if older_than is not None:
+            fetched_before = datetime.now(timezone.utc) - timedelta(days=older_than)
+
+        removed = self.store.prune(max_bytes, fetched_before, city, dry_run=dry_run)
+        for entry in removed:
+            self.stdout.write(f"{'Would remove' if dry_run else 'Removed'} {entry['key'][:12]}  "
+                              f"{entry['city'] or '-'}  {format_size(entry['size'])}")
+        freed = sum(entry["size"] for entry in removed)
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Would free' if dry_run else 'Freed'} {format_size(freed)} in {len(removed)} entries; "
+            f"{format_size(self.store.total_size() - (freed if dry_run else 0))} left"
+        ))
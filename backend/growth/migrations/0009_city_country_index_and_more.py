@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('growth', '0008_citygrowthprediction_historic_growth'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='city',
+            index=models.Index(fields=['country'], name='growth_city_country_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='citygrowthprediction',
+            index=models.Index(fields=['growth_score', 'id'], name='growth_pred_score_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('growth', '0010_datasetversion'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='citygrowthprediction',
+            index=models.Index(fields=['predicted_growth', 'id'], name='growth_pred_predicted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='citygrowthprediction',
+            index=models.Index(fields=['aqi', 'id'], name='growth_pred_aqi_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='citygrowthprediction',
+            index=models.Index(fields=['crime_rate', 'id'], name='growth_pred_crime_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='citygrowthprediction',
+            index=models.Index(fields=['traffic_index', 'id'], name='growth_pred_traffic_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('growth', '0011_ranking_metric_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='citygrowthprediction',
+            name='feature_fingerprint',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+    ]
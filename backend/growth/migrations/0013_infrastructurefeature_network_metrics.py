@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('growth', '0012_citygrowthprediction_feature_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='infrastructurefeature',
+            name='avg_betweenness',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='infrastructurefeature',
+            name='circuity',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='infrastructurefeature',
+            name='giant_component_ratio',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='infrastructurefeature',
+            name='max_betweenness',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='infrastructurefeature',
+            name='street_density',
+            field=models.FloatField(default=0.0),
+        ),
+    ]
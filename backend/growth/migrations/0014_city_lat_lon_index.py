@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('growth', '0013_infrastructurefeature_network_metrics'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='city',
+            index=models.Index(fields=['latitude', 'longitude'], name='growth_city_lat_lon_idx'),
+        ),
+    ]
@@ -0,0 +1,114 @@
+import numpy as np
+
+from ..models import CityGrowthPrediction
+
+# Order of the columns the growth model is trained on and expects at
+# inference time: physical infrastructure first, then the economic and
+# quality-of-life metrics from CityGrowthPrediction.
+FEATURE_NAMES = [
+    "nodes",
+    "edges",
+    "infrastructure_index",
+    "avg_betweenness",
+    "max_betweenness",
+    "giant_component_ratio",
+    "circuity",
+    "street_density",
+    "gdp_current",    # Economic Base
+    "traffic_index",  # Negative Driver
+    "crime_rate",     # Negative Driver
+    "aqi",            # Negative Driver
+]
+
+# Column -> ORM lookup for the joined training query, rooted at
+# CityGrowthPrediction. Everything the target and factor rules need is
+# fetched in one round trip.
+TRAINING_COLUMNS = {
+    "prediction_id": "id",
+    "city_id": "city_id",
+    "nodes": "city__infrastructurefeature__nodes",
+    "edges": "city__infrastructurefeature__edges",
+    "infrastructure_index": "city__infrastructurefeature__infrastructure_index",
+    "avg_betweenness": "city__infrastructurefeature__avg_betweenness",
+    "max_betweenness": "city__infrastructurefeature__max_betweenness",
+    "giant_component_ratio": "city__infrastructurefeature__giant_component_ratio",
+    "circuity": "city__infrastructurefeature__circuity",
+    "street_density": "city__infrastructurefeature__street_density",
+    "gdp_current": "gdp_current",
+    "traffic_index": "traffic_index",
+    "crime_rate": "crime_rate",
+    "aqi": "aqi",
+    "gdp_growth_rate": "gdp_growth_rate",
+    "population": "city__population",
+}
+
+
+def load_training_frame():
+    """
+    Returns {column: float64 array} for every city that has both
+    infrastructure features and a prediction row, ordered by city id.
+    """
+    rows = (
+        CityGrowthPrediction.objects
+        .filter(city__infrastructurefeature__isnull=False)
+        .order_by("city_id")
+        .values_list(*TRAINING_COLUMNS.values())
+    )
+    matrix = np.array(list(rows), dtype=np.float64).reshape(-1, len(TRAINING_COLUMNS))
+    return {name: matrix[:, i] for i, name in enumerate(TRAINING_COLUMNS)}
+
+
+def training_matrix(frame, feature_names=FEATURE_NAMES):
+    return np.column_stack([frame[name] for name in feature_names])
+
+
+def growth_target(frame, rng=None):
+    """
+    Synthetic "ground truth" growth score:
+    + Positive: Infra Index, GDP (high base can convert to stability or growth)
+    - Negative: High Traffic, High Crime, High AQI (Pollution)
+    plus uniform +-0.5 "market volatility" noise drawn from `rng`.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+
+    # Normalized Factors
+    norm_infra = frame["infrastructure_index"] * 2.0            # (0-2 roughly)
+    norm_gdp = np.minimum(2.0, frame["gdp_current"] / 50.0)     # Cap impact of massive GDP
+    norm_traffic = frame["traffic_index"] / 10.0                # 0-1
+    norm_crime = np.minimum(1.0, frame["crime_rate"] / 800.0)   # 0-1
+    norm_aqi = np.minimum(1.0, frame["aqi"] / 300.0)            # 0-1
+
+    # Good Infra + Money = Growth; Traffic/Crime slow things down
+    growth_potential = (norm_infra * 4.0) + (norm_gdp * 2.0)
+    drag = (norm_traffic * 2.5) + (norm_crime * 1.5) + (norm_aqi * 1.0)
+
+    # Final Score (tuned to be typically 1.0 to 9.0)
+    final_score = np.clip(3.0 + growth_potential - drag, 1.0, 9.5)
+    return final_score + rng.uniform(-0.5, 0.5, size=len(final_score))
+
+
+POSITIVE_FACTORS = [
+    ("High Economic Velocity", lambda f, p: f["gdp_growth_rate"] > 6.0),
+    ("Large Talent Pool", lambda f, p: f["population"] > 5000000),
+    ("Robost Infrastructure", lambda f, p: f["infrastructure_index"] > 0.8),
+    ("Efficient Commute (Low Traffic)", lambda f, p: f["traffic_index"] < 5.0),
+]
+NEGATIVE_FACTORS = [
+    ("Severe Traffic Bottlenecks", lambda f, p: f["traffic_index"] > 8.0),
+    ("Safety Concerns", lambda f, p: f["crime_rate"] > 400),
+    ("Environmental Stress", lambda f, p: f["aqi"] > 150),
+    ("Stagnation Risk", lambda f, p: p < 3.0),
+]
+
+
+def growth_factors(frame, predicted_growth):
+    """
+    Returns (positive, negative) factor lists per row, evaluating each
+    rule once over the whole frame.
+    """
+    def labels(rules):
+        masks = np.column_stack([rule(frame, predicted_growth) for _, rule in rules])
+        return [[rules[j][0] for j in np.flatnonzero(row)] for row in masks]
+
+    return labels(POSITIVE_FACTORS), labels(NEGATIVE_FACTORS)
@@ -0,0 +1,141 @@
+"""
+Compact, array-backed evaluator for tree ensemble regressors.
+
+FlatForest flattens the trees of a fitted scikit-learn forest into five
+contiguous arrays shared by all trees:
+
+    feature    int32    split feature per node (0 at leaves)
+    threshold  float64  split threshold per node
+    left       int32    global index of the left child, -1 at leaves
+    right      int32    global index of the right child, -1 at leaves
+    value      float64  node output (only read at leaves)
+
+plus `roots`, the index of each tree's root. That is 28 bytes per node
+against roughly 70 for sklearn's node structs and value arrays. Rows
+are routed through all trees at once with NumPy gathers, one level per
+step, and tree outputs are summed in estimator order, so predictions
+are bit-for-bit identical to RandomForestRegressor.predict.
+
+The arrays are saved as plain .npy files so that every worker can
+memory-map the same copy.
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+
+ARRAYS = ("feature", "threshold", "left", "right", "value", "roots")
+META_FILE = "forest.json"
+
+
+class FlatForest:
+    def __init__(self, feature, threshold, left, right, value, roots, n_features):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.n_features = n_features
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        """
+        Flattens a fitted single-output forest regressor (e.g.
+        RandomForestRegressor, ExtraTreesRegressor).
+        """
+        estimators = getattr(forest, "estimators_", None)
+        if not estimators or getattr(forest, "n_outputs_", 1) != 1:
+            raise ValueError("Expected a fitted single-output forest regressor.")
+
+        trees = [estimator.tree_ for estimator in estimators]
+        sizes = np.array([tree.node_count for tree in trees])
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        if sizes.sum() >= np.iinfo(np.int32).max:
+            raise ValueError("Forest is too large for int32 node ids.")
+
+        def children(tree, offset, which):
+            index = getattr(tree, which).astype(np.int64)
+            return np.where(index < 0, -1, index + offset)
+
+        leaves = np.concatenate([tree.children_left < 0 for tree in trees])
+        feature = np.concatenate([tree.feature for tree in trees])
+        feature = np.where(leaves, 0, feature).astype(np.int32)
+
+        return cls(
+            feature=feature,
+            threshold=np.concatenate([tree.threshold for tree in trees]).astype(np.float64),
+            left=np.concatenate([
+                children(tree, offset, "children_left") for tree, offset in zip(trees, offsets)
+            ]).astype(np.int32),
+            right=np.concatenate([
+                children(tree, offset, "children_right") for tree, offset in zip(trees, offsets)
+            ]).astype(np.int32),
+            value=np.concatenate([tree.value[:, 0, 0] for tree in trees]).astype(np.float64),
+            roots=offsets.astype(np.int32),
+            n_features=forest.n_features_in_,
+        )
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in ARRAYS)
+
+    def apply(self, X):
+        """
+        Returns the leaf index reached in every tree, shape
+        (n_rows, n_trees).
+        """
+        X = self._validate(X)
+        node = np.tile(self.roots, len(X))
+        row = np.repeat(np.arange(len(X)), self.n_trees)
+        # Only (row, tree) pairs that have not reached a leaf move on.
+        active = np.flatnonzero(self.left[node] >= 0)
+        while active.size:
+            current = node[active]
+            go_left = X[row[active], self.feature[current]] <= self.threshold[current]
+            current = np.where(go_left, self.left[current], self.right[current])
+            node[active] = current
+            active = active[self.left[current] >= 0]
+        return node.reshape(len(X), self.n_trees)
+
+    def predict(self, X):
+        leaf_values = self.value[self.apply(X)]
+        # Sequential sum over trees, matching sklearn's accumulation order.
+        return np.cumsum(leaf_values, axis=1)[:, -1] / self.n_trees
+
+    def _validate(self, X):
+        X = np.asarray(X)
+        if X.ndim == 1:
+            X = X[None, :]
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected rows with {self.n_features} features.")
+        # sklearn compares float32 features against float64 thresholds.
+        X = X.astype(np.float32).astype(np.float64)
+        if np.isnan(X).any():
+            raise ValueError("FlatForest does not support missing values.")
+        return X
+
+    def save(self, directory):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in ARRAYS:
+            np.save(directory / f"{name}.npy", getattr(self, name))
+        (directory / META_FILE).write_text(json.dumps({"n_features": self.n_features}))
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        directory = Path(directory)
+        meta = json.loads((directory / META_FILE).read_text())
+        arrays = {
+            name: np.load(directory / f"{name}.npy", mmap_mode="r" if mmap else None)
+            for name in ARRAYS
+        }
+        return cls(n_features=meta["n_features"], **arrays)
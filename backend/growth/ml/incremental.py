@@ -0,0 +1,121 @@
+"""
+Decides how much work a training run has to do.
+
+Every CityGrowthPrediction stores the fingerprint of the feature row it
+was last scored from. A run compares the current rows against those
+fingerprints and against the active model's metadata:
+
+    noop     the feature matrix hashes to the active model's
+             data_fingerprint, or no row changed since it was scored
+    rescore  some rows changed; score only those with the active model
+    retrain  no usable active model, the row count moved by more than
+             MAX_ROW_CHANGE, more than MAX_CHANGED_FRACTION of the rows
+             changed, or a feature mean drifted by more than MAX_DRIFT
+             training standard deviations
+"""
+import hashlib
+from collections import namedtuple
+
+import numpy as np
+
+from ..models import CityGrowthPrediction
+from . import registry
+from .features import FEATURE_NAMES
+
+MAX_ROW_CHANGE = 0.10
+MAX_CHANGED_FRACTION = 0.25
+MAX_DRIFT = 0.5
+
+Plan = namedtuple("Plan", ["action", "changed", "reason"])
+
+
+def row_fingerprints(X):
+    """
+    Returns a 32-character hex digest per row of the feature matrix.
+    """
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    return [hashlib.blake2b(row.tobytes(), digest_size=16).hexdigest() for row in X]
+
+
+def stored_fingerprints(prediction_ids):
+    """
+    Returns the stored fingerprint for each prediction id, in order.
+    """
+    stored = dict(
+        CityGrowthPrediction.objects
+        .filter(id__in=prediction_ids)
+        .values_list("id", "feature_fingerprint")
+    )
+    return [stored.get(prediction_id, "") for prediction_id in prediction_ids]
+
+
+def feature_stats(X):
+    """
+    Per-feature mean and standard deviation, stored with the model so
+    later runs can measure drift against the training distribution.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    return {
+        "feature_means": X.mean(axis=0).round(6).tolist(),
+        "feature_stds": X.std(axis=0).round(6).tolist(),
+    }
+
+
+def feature_drift(X, metrics):
+    """
+    Largest shift of a feature mean, in training standard deviations.
+    Returns None when the model carries no feature statistics.
+    """
+    if "feature_means" not in metrics:
+        return None
+    means = np.asarray(metrics["feature_means"])
+    stds = np.asarray(metrics["feature_stds"])
+    shift = np.abs(np.asarray(X, dtype=np.float64).mean(axis=0) - means)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scaled = shift / stds
+    # Constant features: any movement counts as full drift
+    scaled = np.where(stds > 0, scaled, np.where(shift > 0, np.inf, 0.0))
+    return float(scaled.max())
+
+
+def plan_update(X, fingerprints, previous, metadata=None):
+    """
+    Returns a Plan for the current feature matrix `X`, whose per-row
+    `fingerprints` are compared with the `previous` (stored) ones of the
+    same rows. `metadata` is the active registry version's (looked up
+    when omitted).
+    """
+    everything = np.arange(len(fingerprints))
+    if metadata is None:
+        version = registry.active_version()
+        if version is None:
+            return Plan("retrain", everything, "no active model")
+        metadata = registry.get_metadata(version)
+
+    if metadata.get("feature_names") != FEATURE_NAMES:
+        return Plan("retrain", everything, "feature schema changed")
+    if metadata.get("data_fingerprint") == registry.data_fingerprint(X):
+        return Plan("noop", everything[:0], "feature matrix unchanged")
+
+    changed = np.flatnonzero(np.asarray(fingerprints) != np.asarray(previous))
+    metrics = metadata.get("metrics", {})
+
+    trained_rows = metrics.get("n_rows")
+    if not trained_rows:
+        return Plan("retrain", everything, "model has no row count")
+    row_change = abs(len(X) - trained_rows) / trained_rows
+    if row_change > MAX_ROW_CHANGE:
+        return Plan("retrain", everything, f"row count changed by {row_change:.0%}")
+
+    if not len(changed):
+        return Plan("noop", changed, "no rows changed")
+
+    changed_fraction = len(changed) / len(X)
+    if changed_fraction > MAX_CHANGED_FRACTION:
+        return Plan("retrain", everything, f"{changed_fraction:.0%} of rows changed")
+
+    drift = feature_drift(X, metrics)
+    if drift is not None and drift > MAX_DRIFT:
+        return Plan("retrain", everything, f"feature drift {drift:.2f} std")
+
+    return Plan("rescore", changed, f"{len(changed)} rows changed")
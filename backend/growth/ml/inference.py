@@ -0,0 +1,101 @@
+"""
+Serving-side access to the trained growth model.
+
+The active registry version is loaded once per worker process (memory
+mapped) and reloaded only when the registry's ACTIVE pointer changes.
+Scoring is always one vectorized predict() call over the whole request
+batch. Small batches go through the flattened FlatForest arrays, which
+skip sklearn's per-call validation and thread dispatch; large batches
+are faster in sklearn's compiled tree traversal.
+"""
+import os
+from threading import Lock
+
+import numpy as np
+from rest_framework.exceptions import APIException
+
+from . import registry
+from .features import FEATURE_NAMES
+
+_lock = Lock()
+_loaded = None  # (pointer mtime, bundle)
+
+# Batches up to this size are scored with the FlatForest when available.
+FLAT_FOREST_MAX_ROWS = 128
+
+
+class ModelUnavailable(APIException):
+    status_code = 503
+    default_detail = "No trained growth model is available. Run scripts/train_ml_model.py."
+    default_code = "model_unavailable"
+
+
+def _load_active():
+    try:
+        model, metadata = registry.load()
+        forest = registry.load_forest(metadata["version"])
+    except registry.RegistryError:
+        raise ModelUnavailable()
+    return {
+        "model": model,
+        "forest": forest,
+        "feature_names": metadata["feature_names"],
+        "version": metadata["version"],
+    }
+
+
+def get_model():
+    """
+    Returns the active model bundle {"model", "forest",
+    "feature_names", "version"}, raising ModelUnavailable when nothing has been
+    registered yet.
+    """
+    global _loaded
+    pointer = registry.registry_dir() / registry.ACTIVE_FILE
+    try:
+        stat = os.stat(pointer)
+    except FileNotFoundError:
+        raise ModelUnavailable()
+    # The pointer is replaced atomically on promote/rollback, so its
+    # inode and mtime identify the active version cheaply.
+    state = (str(pointer), stat.st_ino, stat.st_mtime_ns)
+
+    loaded = _loaded
+    if loaded is None or loaded[0] != state:
+        with _lock:
+            loaded = _loaded
+            if loaded is None or loaded[0] != state:
+                loaded = (state, _load_active())
+                _loaded = loaded
+    return loaded[1]
+
+
+def feature_matrix(rows, feature_names=FEATURE_NAMES):
+    """
+    Builds the float64 feature matrix for a list of {feature: value}
+    dicts. Raises ValueError naming the first offending row.
+    """
+    matrix = np.empty((len(rows), len(feature_names)), dtype=np.float64)
+    for i, row in enumerate(rows):
+        try:
+            matrix[i] = [row[name] for name in feature_names]
+        except KeyError as exc:
+            raise ValueError(f"Row {i} is missing feature {exc.args[0]!r}.")
+        except (TypeError, ValueError):
+            raise ValueError(f"Row {i} has a non-numeric feature value.")
+    if not np.isfinite(matrix).all():
+        raise ValueError("Feature values must be finite numbers.")
+    return matrix
+
+
+def predict_growth(rows):
+    """
+    Scores a list of {feature: value} dicts with a single predict() call.
+    Returns (predictions, model_version).
+    """
+    bundle = get_model()
+    matrix = feature_matrix(rows, bundle["feature_names"])
+    model = bundle["model"]
+    if bundle["forest"] is not None and len(matrix) <= FLAT_FOREST_MAX_ROWS:
+        model = bundle["forest"]
+    return model.predict(matrix), bundle["version"]
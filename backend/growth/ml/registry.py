@@ -0,0 +1,192 @@
+"""
+Versioned model artifact registry.
+
+Every training run registers an artifact under MODEL_REGISTRY_DIR:
+
+    versions/<version>/model.joblib   uncompressed, so it can be memory-mapped
+    versions/<version>/meta.json      feature schema, metrics, data fingerprint
+    versions/<version>/forest/*.npy   flattened trees (forests only), see forest.py
+    ACTIVE                            {"version": ..., "history": [...]}
+
+Serving loads the active version with joblib's mmap_mode so that NumPy
+arrays inside the artifact are shared page cache across worker
+processes rather than per-process copies. promote() moves the active
+pointer and remembers the previous one; rollback() walks it back.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+import joblib
+import numpy as np
+import sklearn
+from django.conf import settings
+
+from .features import FEATURE_NAMES
+from .forest import FlatForest
+
+MODEL_FILE = "model.joblib"
+META_FILE = "meta.json"
+FOREST_DIR = "forest"
+ACTIVE_FILE = "ACTIVE"
+
+
+class RegistryError(Exception):
+    pass
+
+
+def registry_dir():
+    return Path(settings.MODEL_REGISTRY_DIR)
+
+
+def version_dir(version):
+    return registry_dir() / "versions" / version
+
+
+def _write_json_atomic(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    with os.fdopen(fd, "w") as tmp:
+        json.dump(data, tmp, indent=2)
+    os.replace(tmp_path, path)
+
+
+def data_fingerprint(X, y=None):
+    """
+    Stable SHA-256 over the training matrix (and target, if given), used
+    to tell whether a retrain would see different data.
+    """
+    digest = hashlib.sha256()
+    for array in (X, y):
+        if array is None:
+            continue
+        array = np.ascontiguousarray(array, dtype=np.float64)
+        digest.update(str(array.shape).encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+def list_versions():
+    """
+    Returns the metadata of every registered version, oldest first.
+    """
+    root = registry_dir() / "versions"
+    if not root.exists():
+        return []
+    return [
+        json.loads((path / META_FILE).read_text())
+        for path in sorted(root.iterdir())
+        if (path / META_FILE).exists()
+    ]
+
+
+def get_metadata(version):
+    path = version_dir(version) / META_FILE
+    if not path.exists():
+        raise RegistryError(f"Unknown model version '{version}'.")
+    return json.loads(path.read_text())
+
+
+def _read_pointer():
+    path = registry_dir() / ACTIVE_FILE
+    if not path.exists():
+        return {"version": None, "history": []}
+    return json.loads(path.read_text())
+
+
+def active_version():
+    return _read_pointer()["version"]
+
+
+def _next_version():
+    versions = [int(meta["version"]) for meta in list_versions()]
+    return f"{max(versions, default=0) + 1:04d}"
+
+
+def register(model, metrics=None, fingerprint=None, feature_names=FEATURE_NAMES, activate=True):
+    """
+    Stores `model` as a new version and, by default, makes it active.
+    Returns the new version id.
+    """
+    version = _next_version()
+    path = version_dir(version)
+    path.mkdir(parents=True)
+
+    # compress=0 keeps arrays raw on disk, which mmap_mode requires.
+    joblib.dump(model, path / MODEL_FILE, compress=0)
+    try:
+        FlatForest.from_sklearn(model).save(path / FOREST_DIR)
+        flat_forest = True
+    except ValueError:
+        flat_forest = False
+    _write_json_atomic(path / META_FILE, {
+        "version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "feature_names": list(feature_names),
+        "metrics": metrics or {},
+        "data_fingerprint": fingerprint,
+        "estimator": type(model).__name__,
+        "sklearn_version": sklearn.__version__,
+        "flat_forest": flat_forest,
+    })
+
+    if activate:
+        promote(version)
+    return version
+
+
+def promote(version):
+    """
+    Makes `version` the active model, pushing the current one onto the
+    rollback history.
+    """
+    get_metadata(version)
+    pointer = _read_pointer()
+    if pointer["version"] == version:
+        return
+    history = pointer["history"]
+    if pointer["version"] is not None:
+        history = history + [pointer["version"]]
+    _write_json_atomic(registry_dir() / ACTIVE_FILE, {"version": version, "history": history})
+
+
+def rollback():
+    """
+    Re-activates the previously active version and returns it.
+    """
+    pointer = _read_pointer()
+    if not pointer["history"]:
+        raise RegistryError("No previous model version to roll back to.")
+    history = pointer["history"][:-1]
+    version = pointer["history"][-1]
+    _write_json_atomic(registry_dir() / ACTIVE_FILE, {"version": version, "history": history})
+    return version
+
+
+def load(version=None, mmap=True):
+    """
+    Loads a registered model (the active one by default). Returns
+    (model, metadata).
+    """
+    version = version or active_version()
+    if version is None:
+        raise RegistryError("No active model version.")
+    metadata = get_metadata(version)
+    model = joblib.load(version_dir(version) / MODEL_FILE, mmap_mode="r" if mmap else None)
+    return model, metadata
+
+
+def load_forest(version=None, mmap=True):
+    """
+    Loads the flattened trees of a registered forest (the active version
+    by default), or returns None if the version has none.
+    """
+    version = version or active_version()
+    if version is None:
+        raise RegistryError("No active model version.")
+    if not get_metadata(version).get("flat_forest"):
+        return None
+    return FlatForest.load(version_dir(version) / FOREST_DIR, mmap=mmap)
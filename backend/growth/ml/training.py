@@ -0,0 +1,109 @@
+"""
+Cross-validated training for the growth model.
+
+A grid search over forest hyperparameters picks the configuration with
+the best k-fold R^2. The chosen configuration is then fitted on every
+row for serving, and once more per fold to produce out-of-fold
+predictions, so each city's predicted_growth comes from a model that
+never saw that city.
+
+Folds x parameter combinations run on joblib's process pool (one
+single-threaded forest per worker). The final fit parallelizes across
+trees instead. Both are capped by the CPU budget.
+"""
+import os
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import GridSearchCV, KFold, cross_val_predict
+
+from .incremental import feature_stats
+
+DEFAULT_PARAM_GRID = {
+    "n_estimators": [100, 200],
+    "max_depth": [None, 8, 16],
+}
+DEFAULT_FOLDS = 5
+
+
+def cpu_budget(cpus=None):
+    """
+    Resolves a CPU budget to a worker count: None or a non-positive
+    value means every available core (-1 is all, -2 all but one, as in
+    joblib).
+    """
+    try:
+        available = len(os.sched_getaffinity(0))
+    except AttributeError:
+        available = os.cpu_count() or 1
+    if cpus is None:
+        return available
+    if cpus <= 0:
+        return max(1, available + 1 + cpus)
+    return min(cpus, available)
+
+
+def _jsonable(params):
+    return {key: value.item() if isinstance(value, np.generic) else value
+            for key, value in params.items()}
+
+
+def train_growth_model(X, y, param_grid=None, folds=DEFAULT_FOLDS, cpus=None, random_state=42):
+    """
+    Searches `param_grid` with k-fold CV and fits the winner on all rows.
+
+    Returns (model, oof_predictions, metrics). `metrics` is
+    JSON-serializable and meant for the registry metadata.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    folds = min(folds, len(X))
+    if folds < 2:
+        raise ValueError("Cross-validation needs at least two rows.")
+
+    n_jobs = cpu_budget(cpus)
+    splitter = KFold(n_splits=folds, shuffle=True, random_state=random_state)
+    estimator = RandomForestRegressor(random_state=random_state, n_jobs=1)
+
+    search = GridSearchCV(
+        estimator,
+        param_grid or DEFAULT_PARAM_GRID,
+        cv=splitter,
+        scoring="r2",
+        n_jobs=n_jobs,
+        refit=False,
+    )
+    search.fit(X, y)
+    best = clone(estimator).set_params(**search.best_params_)
+
+    oof = cross_val_predict(best, X, y, cv=splitter, n_jobs=n_jobs)
+
+    model = clone(best).set_params(n_jobs=n_jobs).fit(X, y)
+    # Serving scores small batches; don't spin up a thread pool per call.
+    model.set_params(n_jobs=None)
+
+    results = search.cv_results_
+    metrics = {
+        "n_rows": len(X),
+        "cv_folds": folds,
+        "params": _jsonable(search.best_params_),
+        "cv_r2": round(float(search.best_score_), 4),
+        "oof_r2": round(float(r2_score(y, oof)), 4),
+        "oof_mae": round(float(mean_absolute_error(y, oof)), 4),
+        "oof_rmse": round(float(np.sqrt(mean_squared_error(y, oof))), 4),
+        "train_r2": round(float(model.score(X, y)), 4),
+        **feature_stats(X),
+        "search": [
+            {
+                "params": _jsonable(params),
+                "mean_r2": round(float(mean), 4),
+                "std_r2": round(float(std), 4),
+            }
+            for params, mean, std in zip(
+                results["params"], results["mean_test_score"], results["std_test_score"]
+            )
+        ],
+    }
+    return model, oof, metrics
@@ -8,6 +8,12 @@ class City(models.Model):
     latitude = models.FloatField()
     longitude = models.FloatField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["country"], name="growth_city_country_idx"),
+            models.Index(fields=["latitude", "longitude"], name="growth_city_lat_lon_idx"),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -19,6 +25,12 @@ class InfrastructureFeature(models.Model):
     avg_degree = models.FloatField()
     intersections = models.IntegerField()
     infrastructure_index = models.FloatField()
+    # Sampled, normalized node betweenness of the street network
+    avg_betweenness = models.FloatField(default=0.0)
+    max_betweenness = models.FloatField(default=0.0)
+    giant_component_ratio = models.FloatField(default=0.0) # share of street length
+    circuity = models.FloatField(default=0.0) # street length / straight-line distance
+    street_density = models.FloatField(default=0.0) # km of street per km2
 
     def __str__(self):
         return f"{self.city.name} Infrastructure"
@@ -38,6 +50,36 @@ class CityGrowthPrediction(models.Model):
     historic_growth = models.JSONField(default=list) # [{year: 2020, growth: 5.5}, ...]
     positive_factors = models.JSONField(default=list)
     negative_factors = models.JSONField(default=list)
+    # Hash of the feature row this prediction was last scored from
+    feature_fingerprint = models.CharField(max_length=32, blank=True, default="")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["growth_score", "id"], name="growth_pred_score_idx"),
+            models.Index(fields=["predicted_growth", "id"], name="growth_pred_predicted_idx"),
+            models.Index(fields=["aqi", "id"], name="growth_pred_aqi_idx"),
+            models.Index(fields=["crime_rate", "id"], name="growth_pred_crime_idx"),
+            models.Index(fields=["traffic_index", "id"], name="growth_pred_traffic_idx"),
+        ]
 
     def __str__(self):
         return f"{self.city.name} Growth Prediction"
+
+
+class DatasetVersion(models.Model):
+    """
+    Single-row counter bumped whenever City, InfrastructureFeature or
+    CityGrowthPrediction rows change. Drives snapshot invalidation and
+    the ETag / Last-Modified headers of the list endpoints.
+    """
+    version = models.PositiveBigIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Dataset v{self.version}"
+
+    @property
+    def token(self):
+        # The timestamp guards against a recreated database reusing a
+        # version number that is still present in a shared cache.
+        return f"{self.version}.{int(self.updated_at.timestamp() * 1_000_000)}"
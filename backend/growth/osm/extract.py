@@ -0,0 +1,213 @@
+"""
+Per-city street-network extraction for `manage.py extractinfra`.
+
+Everything here runs in worker processes and stays free of the ORM:
+workers get (city_id, name, country) and hand back plain feature dicts, and the
+command does the database writes in the parent. Each worker opens the
+OSM cache once (init_worker) and reuses it for every city it is given.
+Online and offline runs share one code path: both build a RoadGraph and
+compute network.network_metrics on it.
+
+Online workers let osmnx cache each city's responses in a private
+staging directory, seeded with what the cache already holds so reruns
+download nothing new, and move the new responses into the managed store
+(store.py) once the city is done. Downloads are thereby compressed,
+attributed to their city and evicted under the store's size cap as they
+arrive.
+
+The checkpoint is a JSON file mapping city ids to how they finished
+("saved", "skipped" when there is no OSM data, "failed"), rewritten
+atomically so an interrupted run can resume where it stopped.
+"""
+import json
+import os
+import shutil
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, wait
+from contextlib import contextmanager
+from itertools import islice
+from pathlib import Path
+
+from .graph import RoadGraph
+from .network import network_metrics
+from .overpass import OSMCache, Place
+from .store import MANIFEST_FILE, CacheStore
+
+SAVED, SKIPPED, FAILED = "saved", "skipped", "failed"
+
+_osm_cache = None
+_store = None
+_metric_options = {}
+
+
+def init_worker(cache_dir, graph_dir=None, metric_options=None, offline=False, max_bytes=None):
+    """
+    Process pool initializer: offline workers read `cache_dir`, online
+    ones download through osmnx and add the responses to the store in
+    `cache_dir`, evicting beyond `max_bytes`. `metric_options` are
+    passed on to network_metrics (betweenness sampling and budget).
+    """
+    global _osm_cache, _store, _metric_options
+    _osm_cache = OSMCache(cache_dir, graph_dir) if offline else None
+    _store = None if offline else CacheStore(cache_dir, max_bytes)
+    _metric_options = metric_options or {}
+
+
+@contextmanager
+def staged_downloads(store, city):
+    """
+    Yields a fresh directory for osmnx's cache, seeded with the
+    responses `store` holds for `city` and the plain osmnx files next to
+    it, so osmnx only downloads what the cache lacks. Afterwards, also
+    when the block fails part-way, the responses osmnx added join
+    `store` as `city`'s. Each city stages separately, so workers sharing
+    a store never pick up each other's (possibly half-written) files.
+    """
+    store.directory.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=store.directory, prefix=".download-") as staging:
+        staging = Path(staging)
+        seeded = _seed(store, city, staging)
+        try:
+            yield str(staging)
+        finally:
+            payloads = {}
+            for path in staging.glob("*.json"):
+                if path.name in seeded:
+                    continue
+                payload = path.read_bytes()
+                try:
+                    json.loads(payload)
+                except ValueError:
+                    continue  # cut short by the failure
+                payloads[path.stem] = payload
+            store.put_many(payloads, city=city)
+            store.flush()
+
+
+def _seed(store, city, staging):
+    """
+    Fills `staging` as described in staged_downloads and returns the
+    file names it put there.
+    """
+    seeded = set()
+    for key in store.city_keys(city):
+        (staging / f"{key}.json").write_bytes(store.get_raw(key))
+        seeded.add(f"{key}.json")
+    for path in store.directory.glob("*.json"):
+        if path.name == MANIFEST_FILE or path.name in seeded:
+            continue
+        try:
+            os.link(path, staging / path.name)
+        except OSError:
+            shutil.copyfile(path, staging / path.name)
+        seeded.add(path.name)
+    return seeded
+
+
+def download_features(name, country, store=None, **metric_options):
+    """
+    Geocodes "name, country", downloads the raw drive network of its
+    polygon with osmnx and computes the metrics on it, keeping the
+    responses in `store` when given. Returns None if the place has no
+    polygon.
+    """
+    import osmnx as ox
+
+    if store is None:
+        return _download_features(ox, name, country, **metric_options)
+    cache_folder = ox.settings.cache_folder
+    try:
+        with staged_downloads(store, name) as staging:
+            ox.settings.cache_folder = staging
+            return _download_features(ox, name, country, **metric_options)
+    finally:
+        ox.settings.cache_folder = cache_folder
+
+
+def _download_features(ox, name, country, **metric_options):
+    polygon = ox.geocode_to_gdf(f"{name}, {country}").geometry.iloc[0]
+    place = Place.from_geojson(name, polygon.__geo_interface__)
+    if place is None:
+        return None
+    G = ox.graph_from_polygon(polygon, network_type="drive", simplify=False, retain_all=True)
+    return network_metrics(RoadGraph.from_networkx(G), place, **metric_options)
+
+
+def cached_features(name, osm_cache, **metric_options):
+    """
+    Same metrics from the cached Overpass responses, without osmnx or
+    networkx. Returns None if the city's network was never downloaded.
+    """
+    place = osm_cache.place(name)
+    if place is None:
+        return None
+    graph = osm_cache.network(place)
+    if graph is None:
+        return None
+    return network_metrics(graph, place, **metric_options)
+
+
+def extract_city(city_id, name, country):
+    """
+    Returns (city_id, features, error). A failing city reports its
+    error instead of raising, so it cannot take the run down with it.
+    """
+    try:
+        if _osm_cache is not None:
+            features = cached_features(name, _osm_cache, **_metric_options)
+        else:
+            features = download_features(name, country, _store, **_metric_options)
+    except Exception as exc:
+        return city_id, None, f"{type(exc).__name__}: {exc}"
+    return city_id, features, None
+
+
+def bounded_map(pool, fn, items, limit):
+    """
+    Like pool.map(fn, *item) for each item, but with at most `limit`
+    tasks submitted at a time, yielding results as they complete.
+    """
+    items = iter(items)
+    running = {pool.submit(fn, *item) for item in islice(items, limit)}
+    while running:
+        done, running = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            item = next(items, None)
+            if item is not None:
+                running.add(pool.submit(fn, *item))
+            yield future.result()
+
+
+class Checkpoint:
+    def __init__(self, path, finished=None):
+        self.path = Path(path)
+        self.finished = finished or {}
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads the checkpoint at `path`; a missing file is an empty one.
+        """
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return cls(path)
+        return cls(path, {int(city_id): status for city_id, status in data["finished"].items()})
+
+    def is_done(self, city_id):
+        """
+        Saved and skipped cities are done; failed ones are retried.
+        """
+        return self.finished.get(city_id) in (SAVED, SKIPPED)
+
+    def mark(self, city_ids, status):
+        for city_id in city_ids:
+            self.finished[city_id] = status
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        partial = self.path.with_name(self.path.name + ".tmp")
+        with open(partial, "w") as f:
+            json.dump({"finished": {str(k): v for k, v in sorted(self.finished.items())}}, f)
+        os.replace(partial, self.path)
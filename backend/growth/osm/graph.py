@@ -0,0 +1,254 @@
+"""
+Compact directed road graph in CSR form.
+
+    indptr   int32 (n_nodes + 1)  arcs of node i are indptr[i]:indptr[i+1]
+    indices  int32 (n_arcs)       arc heads, grouped by tail
+    lengths  float32 (n_arcs)     great-circle arc length in metres
+    lon/lat  float32 (n_nodes)    node coordinates
+    osm_ids  int64 (n_nodes)      OSM node ids
+
+Parallel arcs are kept, so the graph is a directed multigraph like
+osmnx's MultiDiGraph. A whole metro is a few tens of bytes per node and
+arc, against kilobytes in networkx's dict-of-dicts. Graphs are saved as
+uncompressed .npz archives whose members load() memory-maps in place,
+so repeated runs share the page cache instead of re-parsing Overpass
+JSON.
+
+to_networkx()/from_networkx() exist for verification against osmnx;
+networkx itself is optional.
+"""
+import struct
+import zipfile
+
+import numpy as np
+
+try:
+    import networkx as nx
+except ImportError:  # pragma: no cover - optional dependency
+    nx = None
+
+# osmnx.distance.great_circle default
+EARTH_RADIUS_M = 6_371_009
+
+ARRAYS = ("indptr", "indices", "lengths", "lon", "lat", "osm_ids")
+
+
+def great_circle(lat1, lon1, lat2, lon2):
+    """
+    Haversine distance in metres, as osmnx computes edge lengths.
+    """
+    y1, x1, y2, x2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lon1, lat2, lon2))
+    h = np.sin((y2 - y1) / 2) ** 2 + np.cos(y1) * np.cos(y2) * np.sin((x2 - x1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(h, 0, 1)))
+
+
+def ring_area_km2(ring):
+    """
+    Area enclosed by a lon/lat ring, by the shoelace formula on the
+    sinusoidal (equal-area) projection.
+    """
+    lon, lat = np.radians(ring[:, 0]), np.radians(ring[:, 1])
+    x = EARTH_RADIUS_M * (lon - lon.mean()) * np.cos(lat)
+    y = EARTH_RADIUS_M * lat
+    return float(abs(np.dot(x[:-1], y[1:]) - np.dot(x[1:], y[:-1]))) / 2 / 1e6
+
+
+def bbox_ring(lon, lat):
+    """
+    The closed lon/lat ring around the points' bounding box.
+    """
+    x0, x1 = float(np.min(lon)), float(np.max(lon))
+    y0, y1 = float(np.min(lat)), float(np.max(lat))
+    return np.array([[x0, y0], [x1, y0], [x1, y1], [x0, y1], [x0, y0]])
+
+
+class RoadGraph:
+    def __init__(self, indptr, indices, lengths, lon, lat, osm_ids):
+        self.indptr = indptr
+        self.indices = indices
+        self.lengths = lengths
+        self.lon = lon
+        self.lat = lat
+        self.osm_ids = osm_ids
+
+    @classmethod
+    def from_arcs(cls, src, dst, lon, lat, osm_ids=None, lengths=None):
+        """
+        Builds the CSR arrays from arc lists. Lengths default to the
+        great-circle distance between the (float64) end coordinates.
+        """
+        src = np.asarray(src, dtype=np.int64)
+        dst = np.asarray(dst, dtype=np.int64)
+        lon = np.asarray(lon, dtype=np.float64)
+        lat = np.asarray(lat, dtype=np.float64)
+        n_nodes = len(lon)
+        if osm_ids is None:
+            osm_ids = np.arange(n_nodes)
+        if lengths is None:
+            lengths = great_circle(lat[src], lon[src], lat[dst], lon[dst])
+
+        order = np.argsort(src, kind="stable")
+        indptr = np.zeros(n_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n_nodes), out=indptr[1:])
+        if indptr[-1] > np.iinfo(np.int32).max:
+            raise ValueError("Too many arcs for int32 indices.")
+        return cls(
+            indptr=indptr.astype(np.int32),
+            indices=dst[order].astype(np.int32),
+            lengths=np.asarray(lengths, dtype=np.float32)[order],
+            lon=lon.astype(np.float32),
+            lat=lat.astype(np.float32),
+            osm_ids=np.asarray(osm_ids, dtype=np.int64),
+        )
+
+    @property
+    def n_nodes(self):
+        return len(self.indptr) - 1
+
+    @property
+    def n_arcs(self):
+        return len(self.indices)
+
+    @property
+    def src(self):
+        return np.repeat(np.arange(self.n_nodes, dtype=np.int32), np.diff(self.indptr))
+
+    @property
+    def dst(self):
+        return self.indices
+
+    @property
+    def out_degree(self):
+        return np.diff(self.indptr)
+
+    @property
+    def in_degree(self):
+        return np.bincount(self.indices, minlength=self.n_nodes)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in ARRAYS)
+
+    def subgraph(self, keep):
+        """
+        The graph induced by the nodes where `keep` is True.
+        """
+        keep = np.asarray(keep, dtype=bool)
+        nodes = np.flatnonzero(keep)
+        renumber = np.full(self.n_nodes, -1, dtype=np.int64)
+        renumber[nodes] = np.arange(len(nodes))
+        src, dst = self.src, self.dst
+        arcs = keep[src] & keep[dst]
+        return RoadGraph.from_arcs(
+            renumber[src[arcs]], renumber[dst[arcs]],
+            self.lon[nodes], self.lat[nodes], self.osm_ids[nodes], self.lengths[arcs],
+        )
+
+    def component_labels(self):
+        """
+        Weakly connected component label (the smallest node index in the
+        component) for every node, by pointer-jumping union-find.
+        """
+        src, dst = self.src, self.dst
+        parent = np.arange(self.n_nodes)
+        while True:
+            root_src, root_dst = parent[src], parent[dst]
+            differ = root_src != root_dst
+            if not differ.any():
+                return parent
+            np.minimum.at(parent, np.maximum(root_src, root_dst)[differ],
+                          np.minimum(root_src, root_dst)[differ])
+            while True:
+                grandparent = parent[parent]
+                if np.array_equal(grandparent, parent):
+                    break
+                parent = grandparent
+
+    def largest_component(self):
+        if self.n_nodes == 0:
+            return self
+        labels = self.component_labels()
+        return self.subgraph(labels == np.bincount(labels).argmax())
+
+    def save(self, path):
+        # Uncompressed, so load() can memory-map the members.
+        np.savez(path, **{name: getattr(self, name) for name in ARRAYS})
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        if not mmap:
+            with np.load(path) as archive:
+                return cls(**{name: archive[name] for name in ARRAYS})
+        return cls(**_mmap_npz(path))
+
+    def to_networkx(self):
+        """
+        osmnx-style MultiDiGraph: OSM ids as nodes with x/y attributes,
+        a `length` attribute on every edge.
+        """
+        if nx is None:
+            raise ImportError("networkx is required for to_networkx().")
+        G = nx.MultiDiGraph()
+        ids = self.osm_ids.tolist()
+        G.add_nodes_from(
+            (node, {"x": float(x), "y": float(y)})
+            for node, x, y in zip(ids, self.lon.tolist(), self.lat.tolist())
+        )
+        G.add_edges_from(
+            (ids[u], ids[v], {"length": float(length)})
+            for u, v, length in zip(self.src.tolist(), self.dst.tolist(), self.lengths.tolist())
+        )
+        return G
+
+    @classmethod
+    def from_networkx(cls, G):
+        """
+        Builds a RoadGraph from a networkx graph whose nodes carry x/y
+        coordinates. Undirected edges become a pair of arcs; missing
+        `length` attributes are computed.
+        """
+        ids = np.fromiter(G.nodes, dtype=np.int64, count=G.number_of_nodes())
+        position = {node: i for i, node in enumerate(G.nodes)}
+        lon = np.array([G.nodes[node]["x"] for node in G.nodes], dtype=np.float64)
+        lat = np.array([G.nodes[node]["y"] for node in G.nodes], dtype=np.float64)
+
+        edges = list(G.edges(data="length"))
+        src = np.array([position[u] for u, _, _ in edges], dtype=np.int64)
+        dst = np.array([position[v] for _, v, _ in edges], dtype=np.int64)
+        lengths = np.array([np.nan if length is None else length for _, _, length in edges])
+        missing = np.isnan(lengths)
+        lengths[missing] = great_circle(lat[src[missing]], lon[src[missing]],
+                                        lat[dst[missing]], lon[dst[missing]])
+        if not G.is_directed():
+            loops = src == dst
+            src, dst = np.concatenate([src, dst[~loops]]), np.concatenate([dst, src[~loops]])
+            lengths = np.concatenate([lengths, lengths[~loops]])
+        return cls.from_arcs(src, dst, lon, lat, ids, lengths)
+
+
+def _mmap_npz(path):
+    """
+    Memory-maps every member of an uncompressed .npz archive.
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as f:
+        for info in archive.infolist():
+            name = info.filename[:-len(".npy")]
+            if info.compress_type != zipfile.ZIP_STORED:
+                arrays[name] = np.load(archive.open(info))
+                continue
+            # Local file header: 30 fixed bytes, then name and extra field
+            f.seek(info.header_offset)
+            name_length, extra_length = struct.unpack("<HH", f.read(30)[26:30])
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            if np.prod(shape) == 0:
+                arrays[name] = np.empty(shape, dtype=dtype)
+            else:
+                arrays[name] = np.memmap(path, dtype=dtype, mode="r", shape=shape,
+                                         order="F" if fortran_order else "C", offset=f.tell())
+    return arrays
@@ -0,0 +1,271 @@
+"""
+Street-network metrics computed on a RoadGraph.
+
+Reproduces what `manage.py extractinfra` (online) gets from
+ox.graph_from_place(place, network_type="drive") followed by
+to_undirected() and degree statistics, without networkx:
+
+    1. largest weakly connected component of the downloaded graph
+    2. osmnx simplification: chains of interstitial nodes collapse into
+       one edge between their endpoints
+    3. truncation to the place polygon, then the largest component again
+    4. undirected multigraph: u->v and v->u collapse pairwise, so a node
+       pair carries max(count(u->v), count(v->u)) edges
+
+osmnx additionally simplifies within a polygon buffered by 500 m before
+truncating; without a geometry library that stage is skipped, which
+only differs for chains running more than 500 m outside the boundary.
+
+On top of those counts come sampled betweenness (centrality.py),
+circuity and street density of the same graph, and the giant-component
+ratio of the whole simplified network inside the place.
+"""
+import numpy as np
+
+from .centrality import sampled_betweenness
+from .graph import RoadGraph, bbox_ring, great_circle, ring_area_km2
+
+
+def infrastructure_index(nodes, edges, avg_degree, intersections):
+    return (
+        0.4 * (edges / nodes) +
+        0.4 * avg_degree +
+        0.2 * (intersections / nodes)
+    )
+
+
+def points_in_rings(lon, lat, rings, chunk=1 << 22):
+    """
+    Even-odd point-in-polygon test of every point against all `rings`.
+    """
+    inside = np.zeros(len(lon), dtype=bool)
+    for ring in rings:
+        x1, y1 = ring[:-1, 0], ring[:-1, 1]
+        x2, y2 = ring[1:, 0], ring[1:, 1]
+        step = max(1, chunk // max(len(x1), 1))
+        for start in range(0, len(lon), step):
+            px = lon[start:start + step, None]
+            py = lat[start:start + step, None]
+            straddles = (y1 > py) != (y2 > py)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                crossing_x = x1 + (py - y1) * (x2 - x1) / (y2 - y1)
+            crossings = (straddles & (px < crossing_x)).sum(axis=1)
+            inside[start:start + step] ^= (crossings % 2).astype(bool)
+    return inside
+
+
+def _lookup(keys, sorted_keys):
+    """
+    Position of each key in `sorted_keys`, or -1 where absent.
+    """
+    position = np.searchsorted(sorted_keys, keys)
+    position = np.minimum(position, len(sorted_keys) - 1)
+    return np.where(sorted_keys[position] == keys, position, -1)
+
+
+def simplify(graph):
+    """
+    osmnx.simplify_graph on a RoadGraph. Chain lengths are the sum of
+    their arcs, as osmnx sums the `length` attribute.
+    """
+    n_nodes = graph.n_nodes
+    src, dst = graph.src.astype(np.int64), graph.dst.astype(np.int64)
+    n = np.int64(max(n_nodes, 1))
+    in_degree, out_degree = graph.in_degree, graph.out_degree
+    degree = in_degree + out_degree
+    self_loop = np.bincount(src[src == dst], minlength=n_nodes) > 0
+
+    # Distinct neighbours regardless of direction
+    other = src != dst
+    pairs = np.unique(np.concatenate([
+        src[other] * n + dst[other],
+        dst[other] * n + src[other],
+    ]))
+    pair_node, pair_neighbour = pairs // n, pairs % n
+    neighbours = np.bincount(pair_node, minlength=n_nodes)
+
+    # osmnx _is_endpoint
+    endpoint = (
+        self_loop | (in_degree == 0) | (out_degree == 0)
+        | ~((neighbours == 2) & ((degree == 2) | (degree == 4)))
+    )
+    if endpoint.all():
+        return graph
+
+    # The two neighbours of each interstitial node
+    first = np.searchsorted(pair_node, np.arange(n_nodes))
+    first = np.minimum(first, len(pair_node) - 1)
+    neighbour_a = pair_neighbour[first]
+    neighbour_b = pair_neighbour[np.minimum(first + 1, len(pair_node) - 1)]
+
+    arcs, first_arc = np.unique(src * n + dst, return_index=True)
+    tail, head = arcs // n, arcs % n
+
+    # Continue p->x with x->q, q being x's other neighbour
+    following = np.where(neighbour_a[head] == tail, neighbour_b[head], neighbour_a[head])
+    next_arc = _lookup(head * n + following, arcs)
+
+    # Digitization quirks: a chain that cannot continue ends at that node
+    # (osmnx _build_path), which survives unless another chain runs
+    # through it.
+    interstitial_head = ~endpoint[head]
+    stuck = interstitial_head & (next_arc < 0)
+    passes = np.bincount(head[interstitial_head & ~stuck], minlength=n_nodes) > 0
+    # Components without an endpoint are isolated rings, which osmnx
+    # removes (remove_rings=True).
+    labels = graph.component_labels()
+    has_endpoint = np.bincount(labels[endpoint], minlength=n_nodes) > 0
+    keep = (endpoint | ~passes) & has_endpoint[labels]
+
+    # List ranking: after the loop, last[a] is the final arc of the chain
+    # starting at a and length[a] the chain's total length.
+    following_arc = np.where(~interstitial_head | stuck, -1, next_arc)
+    last = np.arange(len(arcs))
+    length = graph.lengths[first_arc].astype(np.float64)
+    for _ in range(int(np.ceil(np.log2(len(arcs) + 1))) + 1):
+        active = np.flatnonzero(following_arc >= 0)
+        if not len(active):
+            break
+        ahead = following_arc[active]
+        length[active] += length[ahead]
+        last[active] = last[ahead]
+        following_arc[active] = following_arc[ahead]
+
+    starts = endpoint[tail] & interstitial_head
+    direct = keep[src] & keep[dst]
+    merged = RoadGraph.from_arcs(
+        np.concatenate([src[direct], tail[starts]]),
+        np.concatenate([dst[direct], head[last[starts]]]),
+        graph.lon, graph.lat, graph.osm_ids,
+        np.concatenate([graph.lengths[direct], length[starts]]),
+    )
+    return merged.subgraph(keep)
+
+
+def undirected_edges(graph):
+    """
+    Collapses a directed multigraph the way MultiDiGraph.to_undirected()
+    does. Returns (u, v, multiplicity, length) per undirected node pair;
+    a pair's length is its mean arc length times its multiplicity.
+    """
+    n = np.int64(max(graph.n_nodes, 1))
+    src, dst = graph.src.astype(np.int64), graph.dst.astype(np.int64)
+    keys, inverse, counts = np.unique(src * n + dst, return_inverse=True, return_counts=True)
+    lengths = np.bincount(inverse, weights=graph.lengths, minlength=len(keys))
+    low = np.minimum(keys // n, keys % n)
+    high = np.maximum(keys // n, keys % n)
+    pair = low * n + high
+    order = np.argsort(pair, kind="stable")
+    pair, counts, lengths = pair[order], counts[order], lengths[order]
+    starts = np.flatnonzero(np.concatenate([[True], pair[1:] != pair[:-1]]))
+    if not len(starts):
+        return pair, pair, counts, lengths
+    multiplicity = np.maximum.reduceat(counts, starts)
+    length = np.add.reduceat(lengths, starts) / np.add.reduceat(counts, starts) * multiplicity
+    pair = pair[starts]
+    return pair // n, pair % n, multiplicity, length
+
+
+def in_place(graph, place):
+    """
+    Mask of the nodes inside `place`.
+    """
+    lon, lat = graph.lon, graph.lat
+    min_lon, min_lat, max_lon, max_lat = place.bbox
+    inside = (lon >= min_lon) & (lon <= max_lon) & (lat >= min_lat) & (lat <= max_lat)
+    candidates = np.flatnonzero(inside)
+    inside[candidates] = points_in_rings(lon[candidates], lat[candidates], place.rings)
+    return inside
+
+
+def truncate(graph, place):
+    """
+    The largest component of the nodes inside `place`.
+    """
+    return graph.subgraph(in_place(graph, place)).largest_component()
+
+
+def street_network(graph, place=None):
+    """
+    The graph the metrics describe: the largest component, simplified,
+    truncated to `place` when given.
+    """
+    graph = simplify(graph.largest_component())
+    if place is not None:
+        graph = truncate(graph, place)
+    return graph
+
+
+def giant_component_ratio(graph):
+    """
+    Share of the street length that lies in the largest weakly
+    connected component; 1.0 for a fully connected network.
+    """
+    if graph.n_arcs == 0:
+        return 1.0
+    labels = graph.component_labels()
+    length = np.bincount(labels[graph.src], weights=graph.lengths, minlength=graph.n_nodes)
+    return float(length.max() / length.sum()) if length.sum() > 0 else 1.0
+
+
+def circuity(graph):
+    """
+    Street length over straight-line distance between edge endpoints,
+    summed over the undirected edges (osmnx circuity_avg).
+    """
+    u, v, multiplicity, length = undirected_edges(graph)
+    straight = great_circle(graph.lat[u], graph.lon[u], graph.lat[v], graph.lon[v]) * multiplicity
+    return float(length.sum() / straight.sum()) if straight.sum() > 0 else 1.0
+
+
+def street_length_km(graph):
+    """
+    Total length of the undirected streets (osmnx street_length_total).
+    """
+    return float(undirected_edges(graph)[3].sum()) / 1000
+
+
+def network_metrics(graph, place=None, **betweenness):
+    """
+    Street-network features of a RoadGraph, truncated to `place` when
+    given. Returns None if nothing is left.
+
+    Besides the osmnx-compatible counts (nodes, edges, avg_degree,
+    intersections, infrastructure_index): sampled betweenness (mean and
+    max, see centrality.sampled_betweenness, which receives the extra
+    keyword arguments), the giant-component ratio of everything inside
+    the place, circuity, and street_density in km of street per km2 of
+    the place (of the network's bounding box without one).
+    """
+    streets = street_network(graph, place)
+    n_nodes = streets.n_nodes
+    if n_nodes == 0:
+        return None
+
+    u, v, multiplicity, _ = undirected_edges(streets)
+    degree = (np.bincount(u, weights=multiplicity, minlength=n_nodes)
+              + np.bincount(v, weights=multiplicity, minlength=n_nodes))
+    edges = int(multiplicity.sum())
+    avg_degree = float(degree.sum() / n_nodes)
+    intersections = int((degree >= 3).sum())
+
+    everything = simplify(graph)
+    if place is not None:
+        everything = everything.subgraph(in_place(everything, place))
+        area = place.area_km2
+    else:
+        area = ring_area_km2(bbox_ring(streets.lon, streets.lat))
+    scores, _, _ = sampled_betweenness(streets, **betweenness)
+
+    return {
+        "nodes": n_nodes,
+        "edges": edges,
+        "avg_degree": avg_degree,
+        "intersections": intersections,
+        "infrastructure_index": infrastructure_index(n_nodes, edges, avg_degree, intersections),
+        "avg_betweenness": float(scores.mean()),
+        "max_betweenness": float(scores.max()),
+        "giant_component_ratio": giant_component_ratio(everything),
+        "circuity": circuity(streets),
+        "street_density": street_length_km(streets) / area if area > 0 else 0.0,
+    }
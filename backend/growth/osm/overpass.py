@@ -0,0 +1,240 @@
+"""
+Reads the osmnx HTTP cache (backend/cache) without osmnx.
+
+The cache holds two kinds of responses, keyed by a hash of the request,
+either in the managed store (store.py) or as the plain <key>.json files
+osmnx writes:
+
+    Nominatim   a JSON list of geocoding results with GeoJSON outlines
+    Overpass    {"elements": [...]} with the nodes and ways of one
+                sub-query; osmnx splits a large place into several
+
+A place is resolved the way osmnx.geocode_to_gdf does (the first
+polygonal result for the query), and its road network is assembled
+from every Overpass response whose nodes overlap the place's bounding
+box. Assembled graphs can be kept as .npz next to the cache, keyed by
+the responses they were built from.
+"""
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+
+from .graph import RoadGraph, ring_area_km2
+from .store import MANIFEST_FILE, NOMINATIM, OVERPASS, CacheStore, describe
+
+# osmnx: settings.oneway_values / reversed_values
+ONEWAY_VALUES = {"yes", "true", "1", "-1", "reverse", "T", "F"}
+REVERSED_VALUES = {"-1", "reverse", "T"}
+
+
+class Place:
+    def __init__(self, name, rings, holes=None):
+        self.name = name
+        # Every ring (outer and holes) as an (n, 2) lon/lat array; the
+        # even-odd rule over all rings gives the polygon interior.
+        self.rings = rings
+        self.holes = holes or [False] * len(rings)
+        points = np.concatenate(rings)
+        self.bbox = (*points.min(axis=0), *points.max(axis=0))  # min_lon, min_lat, max_lon, max_lat
+
+    @classmethod
+    def from_geojson(cls, name, geometry):
+        """
+        Returns the Place for a GeoJSON (Multi)Polygon, or None for any
+        other geometry.
+        """
+        if geometry["type"] == "Polygon":
+            polygons = [geometry["coordinates"]]
+        elif geometry["type"] == "MultiPolygon":
+            polygons = geometry["coordinates"]
+        else:
+            return None
+        rings = [np.asarray(ring, dtype=np.float64)[:, :2] for polygon in polygons for ring in polygon]
+        holes = [i > 0 for polygon in polygons for i in range(len(polygon))]
+        return cls(name, rings, holes)
+
+    @property
+    def area_km2(self):
+        return float(sum(-ring_area_km2(ring) if hole else ring_area_km2(ring)
+                         for ring, hole in zip(self.rings, self.holes)))
+
+
+def _oneway(tags):
+    """
+    Returns 1 for one-way, -1 for one-way against the node order and 0
+    for two-way (osmnx _is_path_one_way / _is_path_reversed).
+    """
+    value = tags.get("oneway")
+    if value in ONEWAY_VALUES:
+        return -1 if value in REVERSED_VALUES else 1
+    if tags.get("junction") == "roundabout":
+        return 1
+    return 0
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return json.load(f)
+
+
+def parse_network(responses):
+    """
+    Builds a RoadGraph from Overpass responses, de-duplicating nodes
+    and ways that appear in more than one sub-query. Streets become
+    arcs osmnx-style: one per consecutive node pair, in both directions
+    unless the way is one-way.
+    """
+    coords = {}
+    ways = {}
+    for response in responses:
+        for element in response.get("elements", ()):
+            if element["type"] == "node":
+                coords[element["id"]] = (element["lon"], element["lat"])
+            elif element["type"] == "way":
+                ways[element["id"]] = element
+
+    paths = []
+    oneway = []
+    for way in ways.values():
+        nodes = np.asarray(way["nodes"], dtype=np.int64)
+        # osmnx drops consecutive duplicate node references
+        nodes = nodes[np.concatenate([[True], nodes[1:] != nodes[:-1]])]
+        if len(nodes) >= 2:
+            paths.append(nodes)
+            oneway.append(_oneway(way.get("tags", {})))
+
+    node_ids = np.fromiter(coords, dtype=np.int64, count=len(coords))
+    way_nodes = np.concatenate(paths) if paths else np.empty(0, dtype=np.int64)
+    osm_ids, inverse = np.unique(np.concatenate([node_ids, way_nodes]), return_inverse=True)
+
+    lon = np.full(len(osm_ids), np.nan)
+    lat = np.full(len(osm_ids), np.nan)
+    if len(coords):
+        xy = np.array(list(coords.values()), dtype=np.float64)
+        lon[inverse[:len(node_ids)]] = xy[:, 0]
+        lat[inverse[:len(node_ids)]] = xy[:, 1]
+
+    # Consecutive pairs that belong to the same way
+    positions = inverse[len(node_ids):]
+    lengths = np.array([len(p) for p in paths], dtype=np.int64)
+    way_of = np.repeat(np.arange(len(paths)), lengths)
+    same_way = way_of[:-1] == way_of[1:]
+    tail = positions[:-1][same_way]
+    head = positions[1:][same_way]
+    direction = np.asarray(oneway, dtype=np.int8)[way_of[:-1][same_way]]
+
+    forward = direction >= 0
+    backward = direction <= 0
+    src = np.concatenate([tail[forward], head[backward]])
+    dst = np.concatenate([head[forward], tail[backward]])
+    return RoadGraph.from_arcs(src, dst, lon, lat, osm_ids)
+
+
+class OSMCache:
+    """
+    Index over an osmnx cache directory. Stored responses are indexed
+    from the store manifest; plain osmnx files not imported yet are
+    classified (and Overpass bounding boxes computed) on first use.
+    With `graph_dir`, assembled graphs are saved there and memory-mapped
+    on later runs.
+    """
+    def __init__(self, directory, graph_dir=None):
+        self.directory = Path(directory)
+        self.graph_dir = Path(graph_dir) if graph_dir else None
+        self.store = CacheStore(directory)
+        self._places = None
+        self._overpass = None
+        self._files = None
+
+    def _scan(self):
+        places, overpass, files = [], [], {}
+        for key, entry in sorted(self.store.entries.items()):
+            files[key] = self.store.path(key)
+            if entry["kind"] == NOMINATIM:
+                places.append(self.store.get(key, touch=False))
+            elif entry["kind"] == OVERPASS and entry["bbox"]:
+                overpass.append((key, tuple(entry["bbox"])))
+        for path in sorted(self.directory.glob("*.json")):
+            if path.name == MANIFEST_FILE or path.stem in files:
+                continue
+            data = _read(path)
+            kind, bbox = describe(data)
+            files[path.stem] = path
+            if kind == NOMINATIM:
+                places.append(data)
+            elif kind == OVERPASS and bbox:
+                overpass.append((path.stem, bbox))
+        self._places, self._overpass, self._files = places, overpass, files
+
+    def _load(self, key):
+        if key in self.store:
+            return self.store.get(key)
+        return _read(self._files[key])
+
+    def place(self, name):
+        """
+        Returns the Place for a city name, or None if it was never
+        geocoded. Mirrors osmnx: the first result of the matching query
+        whose geometry is a (Multi)Polygon.
+        """
+        if self._places is None:
+            self._scan()
+        for results in self._places:
+            if not results or not _matches(results[0], name):
+                continue
+            for result in results:
+                place = Place.from_geojson(result.get("name") or name, result.get("geojson", {"type": None}))
+                if place is not None:
+                    return place
+        return None
+
+    def overpass_keys(self, bbox):
+        if self._overpass is None:
+            self._scan()
+        min_lon, min_lat, max_lon, max_lat = bbox
+        return [
+            key for key, (lo0, la0, lo1, la1) in self._overpass
+            if lo0 <= max_lon and lo1 >= min_lon and la0 <= max_lat and la1 >= min_lat
+        ]
+
+    def network(self, place):
+        """
+        Returns the RoadGraph covering `place`, or None if no cached
+        Overpass response overlaps it.
+        """
+        keys = self.overpass_keys(place.bbox)
+        if not keys:
+            return None
+        saved = None
+        if self.graph_dir is not None:
+            saved = self.graph_dir / f"{_responses_key(self._files[key] for key in keys)}.npz"
+            if saved.exists():
+                return RoadGraph.load(saved)
+
+        graph = parse_network(self._load(key) for key in keys)
+        self.store.flush()
+        if saved is not None:
+            self.graph_dir.mkdir(parents=True, exist_ok=True)
+            graph.save(saved)
+        return graph
+
+
+def _responses_key(paths):
+    """
+    Identifies a set of cached responses by name, size and mtime.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for path in sorted(paths):
+        stat = path.stat()
+        digest.update(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()
+
+
+def _matches(result, name):
+    name = name.lower()
+    return (
+        (result.get("name") or "").lower() == name
+        or (result.get("display_name") or "").lower().startswith(name + ",")
+    )
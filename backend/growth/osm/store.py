@@ -0,0 +1,355 @@
+"""
+Managed store for cached OSM responses.
+
+osmnx leaves one opaque <sha1>.json per HTTP response. The store keeps
+the same responses compressed (zstd when the `zstandard` package is
+installed, gzip otherwise) next to a manifest that says what each one
+is:
+
+    manifest.json   {"entries": {key: entry}}
+    <key>.json.zst  or <key>.json.gz
+
+An entry records the file, kind ("nominatim" or "overpass"), city,
+query, bbox (min_lon, min_lat, max_lon, max_lat), fetched_at,
+last_used, size (stored bytes) and raw_size. Reads are transparent
+whatever the codec, and OSMCache indexes the store from the manifest
+alone instead of parsing every response.
+
+With max_bytes set, put(), put_many() and import_files() evict least
+recently used entries until the store fits. Manifest updates take an
+exclusive lock (where fcntl is available) and re-read the manifest
+first, so worker processes sharing a store do not lose each other's
+writes. Files of removed entries are deleted only after the manifest
+that drops them is written, so a crash never leaves entries pointing at
+missing files.
+"""
+import gzip
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+MANIFEST_FILE = "manifest.json"
+LOCK_FILE = ".manifest.lock"
+NOMINATIM, OVERPASS = "nominatim", "overpass"
+ZSTD_LEVEL = 10
+GZIP_LEVEL = 6
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _compress(payload):
+    if zstandard is not None:
+        return ".json.zst", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(payload)
+    return ".json.gz", gzip.compress(payload, GZIP_LEVEL)
+
+
+def _decompress(path, blob):
+    if path.name.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"{path.name} is zstd-compressed; install the zstandard package.")
+        return zstandard.ZstdDecompressor().decompress(blob)
+    if path.name.endswith(".gz"):
+        return gzip.decompress(blob)
+    return blob
+
+
+def describe(data):
+    """
+    Returns (kind, bbox) of a decoded response; (None, None) if it is
+    neither a Nominatim nor an Overpass response.
+    """
+    if isinstance(data, list):
+        # The first polygonal result is the one places resolve to.
+        results = [r for r in data if r.get("geojson", {}).get("type") in ("Polygon", "MultiPolygon")]
+        box = (results or data or [{}])[0].get("boundingbox")
+        if box is None:
+            return NOMINATIM, None
+        south, north, west, east = map(float, box)
+        return NOMINATIM, (west, south, east, north)
+    if isinstance(data, dict) and "elements" in data:
+        lon = [e["lon"] for e in data["elements"] if e["type"] == "node"]
+        lat = [e["lat"] for e in data["elements"] if e["type"] == "node"]
+        return OVERPASS, (min(lon), min(lat), max(lon), max(lat)) if lon else None
+    return None, None
+
+
+def _contains(bbox, lon, lat):
+    return bbox[0] <= lon <= bbox[2] and bbox[1] <= lat <= bbox[3]
+
+
+class CacheStore:
+    def __init__(self, directory, max_bytes=None):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._entries = None
+        self._used = {}  # key -> last_used not yet written to the manifest
+        self._garbage = []  # files to delete once the manifest is written
+
+    @property
+    def entries(self):
+        if self._entries is None:
+            self._entries = self._read_manifest()
+        return self._entries
+
+    def _read_manifest(self):
+        try:
+            with open(self.directory / MANIFEST_FILE) as f:
+                return json.load(f)["entries"]
+        except FileNotFoundError:
+            return {}
+
+    def _write_manifest(self, entries):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=f".{MANIFEST_FILE}.")
+        with os.fdopen(fd, "w") as tmp:
+            json.dump({"entries": entries}, tmp, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.directory / MANIFEST_FILE)
+        self._entries = entries
+
+    @contextmanager
+    def _locked(self):
+        """
+        Holds the store lock and yields the current manifest, merged
+        with this instance's pending last_used updates; whatever the
+        block leaves in it is written back, then the files the block
+        discarded are deleted.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / LOCK_FILE, "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            entries = self._read_manifest()
+            for key, used in self._used.items():
+                if key in entries:
+                    entries[key]["last_used"] = max(entries[key]["last_used"], used)
+            self._used = {}
+            self._garbage = []
+            yield entries
+            self._write_manifest(entries)
+            for name in self._garbage:
+                (self.directory / name).unlink(missing_ok=True)
+            self._garbage = []
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def path(self, key):
+        return self.directory / self.entries[key]["file"]
+
+    def total_size(self):
+        return sum(entry["size"] for entry in self.entries.values())
+
+    def get(self, key, touch=True):
+        """
+        Returns the decoded response stored under `key` and, with
+        `touch`, marks it used (written to the manifest by flush()).
+        Raises KeyError for unknown keys.
+        """
+        return json.loads(self.get_raw(key, touch))
+
+    def get_raw(self, key, touch=True):
+        """
+        get() without the decoding: the response's JSON bytes.
+        """
+        path = self.path(key)
+        with open(path, "rb") as f:
+            payload = _decompress(path, f.read())
+        if touch:
+            self._used[key] = _now()
+        return payload
+
+    def city_keys(self, city):
+        """
+        Keys of the entries attributed to `city` (case-insensitively),
+        after re-reading the manifest for other processes' writes.
+        """
+        self._entries = self._read_manifest()
+        return [key for key, entry in self._entries.items() if entry["city"].casefold() == city.casefold()]
+
+    def _write(self, key, payload, city="", query="", fetched_at=None):
+        """
+        Compresses one response into its file and returns the entry for
+        it; the manifest is not touched.
+        """
+        kind, bbox = describe(json.loads(payload))
+        suffix, blob = _compress(payload)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=f".{key}.")
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(blob)
+        os.replace(tmp_path, self.directory / (key + suffix))
+
+        now = _now()
+        return {
+            "file": key + suffix,
+            "kind": kind,
+            "city": city,
+            "query": query,
+            "bbox": bbox,
+            "fetched_at": fetched_at or now,
+            "last_used": now,
+            "size": len(blob),
+            "raw_size": len(payload),
+        }
+
+    def _commit(self, new, keep=()):
+        """
+        Adds the written entries `new` to the manifest, attributes their
+        Overpass responses to cities and evicts down to max_bytes (never
+        the keys in `keep`), all under one lock and one manifest write.
+        """
+        if not new:
+            return new
+        with self._locked() as entries:
+            for key, entry in new.items():
+                previous = entries.get(key)
+                if previous and previous["file"] != entry["file"]:
+                    self._garbage.append(previous["file"])
+                entries[key] = entry
+            self._attribute(entries, new)
+            if self.max_bytes is not None:
+                self._evict(entries, self._lru(entries, self.max_bytes, keep=keep))
+        return new
+
+    def put(self, key, payload, city="", query="", fetched_at=None):
+        """
+        Stores the raw JSON bytes of one response and evicts down to
+        max_bytes (never the entry just stored). Returns its entry.
+        """
+        return self.put_many({key: payload}, city=city, query=query, fetched_at=fetched_at)[key]
+
+    def put_many(self, payloads, city="", query="", fetched_at=None):
+        """
+        put() for several responses {key: raw JSON bytes} at once, with
+        a single manifest update. Returns their entries by key.
+        """
+        new = {key: self._write(key, payload, city, query, fetched_at) for key, payload in payloads.items()}
+        return self._commit(new, keep=new)
+
+    def flush(self):
+        """
+        Writes pending last_used updates to the manifest.
+        """
+        if self._used:
+            with self._locked():
+                pass
+
+    @staticmethod
+    def _lru(entries, max_bytes, keep=()):
+        """
+        Least recently used keys, other than those in `keep`, to drop
+        for the rest to fit max_bytes.
+        """
+        total = sum(entry["size"] for entry in entries.values())
+        victims = []
+        for key in sorted(entries, key=lambda k: entries[k]["last_used"]):
+            if total <= max_bytes:
+                break
+            if key not in keep:
+                victims.append(key)
+                total -= entries[key]["size"]
+        return victims
+
+    def _evict(self, entries, keys):
+        """
+        Drops `keys` from the manifest being written; their files go
+        once it is (see _locked).
+        """
+        removed = []
+        for key in keys:
+            entry = entries.pop(key)
+            self._garbage.append(entry["file"])
+            removed.append(dict(entry, key=key))
+        return removed
+
+    def prune(self, max_bytes=None, fetched_before=None, city=None, dry_run=False):
+        """
+        Removes the entries of `city`, those fetched before the
+        `fetched_before` datetime, then least recently used ones until
+        the rest fit `max_bytes`. Returns the removed entries (only
+        lists them with dry_run, which neither locks nor writes the
+        manifest).
+        """
+        if dry_run:
+            entries = self._read_manifest()
+            return [dict(entries[key], key=key)
+                    for key in self._prune_victims(entries, max_bytes, fetched_before, city)]
+        with self._locked() as entries:
+            return self._evict(entries, self._prune_victims(entries, max_bytes, fetched_before, city))
+
+    def _prune_victims(self, entries, max_bytes, fetched_before, city):
+        victims = [
+            key for key, entry in entries.items()
+            if (city is not None and entry["city"].lower() == city.lower())
+            or (fetched_before is not None
+                and datetime.fromisoformat(entry["fetched_at"]) < fetched_before)
+        ]
+        if max_bytes is not None:
+            rest = {key: entry for key, entry in entries.items() if key not in victims}
+            victims += self._lru(rest, max_bytes)
+        return victims
+
+    @staticmethod
+    def _attribute(entries, keys):
+        """
+        Names the city of each Overpass entry in `keys` that has none:
+        the Nominatim place whose area contains the response's centre.
+        """
+        places = [(entry["city"], entry["bbox"]) for entry in entries.values()
+                  if entry["kind"] == NOMINATIM and entry["bbox"]]
+        for key in keys:
+            entry = entries[key]
+            if entry["kind"] != OVERPASS or not entry["bbox"] or entry["city"]:
+                continue
+            min_lon, min_lat, max_lon, max_lat = entry["bbox"]
+            lon, lat = (min_lon + max_lon) / 2, (min_lat + max_lat) / 2
+            matches = [(name, bbox) for name, bbox in places if _contains(bbox, lon, lat)]
+            if matches:
+                # The smallest containing area is the most specific place.
+                entry["city"], _ = min(matches, key=lambda m: (m[1][2] - m[1][0]) * (m[1][3] - m[1][1]))
+
+    def import_files(self, paths, keep=False):
+        """
+        Moves osmnx's plain <sha1>.json responses into the store. Cities
+        come from the Nominatim results; an Overpass response is
+        attributed to the city whose area contains its centre. The
+        fetch time is Overpass's data timestamp, or the file's mtime.
+        All files are compressed first and then committed with a single
+        manifest update, followed by eviction down to max_bytes.
+        Returns the new entries by key.
+        """
+        new = {}
+        for path in map(Path, paths):
+            with open(path, "rb") as f:
+                payload = f.read()
+            data = json.loads(payload)
+            kind, _ = describe(data)
+            if kind is None:
+                continue
+            fetched_at = (data.get("osm3s", {}).get("timestamp_osm_base") if kind == OVERPASS else None)
+            if fetched_at:
+                fetched_at = datetime.fromisoformat(fetched_at.replace("Z", "+00:00")).isoformat()
+            else:
+                fetched_at = datetime.fromtimestamp(path.stat().st_mtime, timezone.utc).isoformat()
+            city = (data[0].get("name") or "") if kind == NOMINATIM and data else ""
+            new[path.stem] = self._write(path.stem, payload, city=city, fetched_at=fetched_at)
+        self._commit(new)
+        if not keep:
+            for path in map(Path, paths):
+                if path.stem in new:
+                    path.unlink()
+        return new
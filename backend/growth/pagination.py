@@ -0,0 +1,15 @@
+from rest_framework.pagination import CursorPagination
+
+from .filters import DEFAULT_PREDICTION_ORDERING, PREDICTION_ORDERINGS
+
+
+class PredictionCursorPagination(CursorPagination):
+    """
+    Keyset pagination for prediction lists. The cursor encodes the last
+    seen sort value, so each page is an index range scan instead of an
+    OFFSET over the whole table.
+    """
+    page_size = 50
+    page_size_query_param = "limit"
+    max_page_size = 500
+    ordering = PREDICTION_ORDERINGS[DEFAULT_PREDICTION_ORDERING]
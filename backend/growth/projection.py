@@ -0,0 +1,88 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import BaseSerializer
+
+
+def field_tree(serializer_class):
+    """
+    Returns {name: None} for plain fields and {name: {...}} for nested
+    serializers, describing everything `serializer_class` can emit.
+    """
+    tree = {}
+    for name, field in serializer_class().fields.items():
+        if isinstance(field, BaseSerializer):
+            tree[name] = field_tree(type(field))
+        else:
+            tree[name] = None
+    return tree
+
+
+def _parse(value):
+    return [part.strip() for part in value.split(",") if part.strip()]
+
+
+def _lookup(tree, path, param):
+    node = tree
+    for part in path[:-1]:
+        if not isinstance(node.get(part), dict):
+            raise ValidationError({param: f"Unknown field '{'.'.join(path)}'."})
+        node = node[part]
+    if path[-1] not in node:
+        raise ValidationError({param: f"Unknown field '{'.'.join(path)}'."})
+    return node
+
+
+def _copy(tree):
+    return {k: (_copy(v) if isinstance(v, dict) else None) for k, v in tree.items()}
+
+
+def requested_fields(params, serializer_class):
+    """
+    Resolves ?fields= and ?exclude= (comma separated, dotted for nested
+    serializers, e.g. "growth_score,city.latitude") into the field tree
+    that should be emitted, or None when neither parameter was given.
+    """
+    fields = _parse(params.get("fields", ""))
+    exclude = _parse(params.get("exclude", ""))
+    if not fields and not exclude:
+        return None
+
+    full = field_tree(serializer_class)
+
+    if fields:
+        selected = {}
+        for name in fields:
+            path = name.split(".")
+            node = _lookup(full, path, "fields")
+            target = selected
+            for part in path[:-1]:
+                target = target.setdefault(part, {})
+            leaf = node[path[-1]]
+            target[path[-1]] = _copy(leaf) if isinstance(leaf, dict) else None
+    else:
+        selected = _copy(full)
+
+    for name in exclude:
+        path = name.split(".")
+        _lookup(full, path, "exclude")
+        node = selected
+        for part in path[:-1]:
+            node = node.get(part)
+            if not isinstance(node, dict):
+                break
+        else:
+            node.pop(path[-1], None)
+
+    return selected
+
+
+def only_columns(tree, prefix=""):
+    """
+    Maps a resolved field tree to the ORM paths for QuerySet.only().
+    """
+    columns = []
+    for name, subtree in tree.items():
+        if isinstance(subtree, dict):
+            columns.extend(only_columns(subtree, prefix=f"{prefix}{name}__"))
+        else:
+            columns.append(f"{prefix}{name}")
+    return columns
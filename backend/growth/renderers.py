@@ -0,0 +1,80 @@
+"""
+Renderers for the column-oriented response formats. Each one expects a
+dict of column name -> NumPy array as produced by
+growth.services.columnar.build_columns.
+
+MessagePack and Arrow are optional: their renderers are only offered
+for content negotiation when `msgpack` / `pyarrow` are installed.
+"""
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+def _is_columnar(data):
+    # Error payloads (validation, 404, ...) are plain dicts of messages.
+    return isinstance(data, dict) and all(hasattr(v, 'dtype') for v in data.values())
+
+
+def _as_lists(columns):
+    return {name: values.tolist() for name, values in columns.items()}
+
+
+class ColumnarJSONRenderer(JSONRenderer):
+    media_type = 'application/vnd.citygrowth.columnar+json'
+    format = 'columnar'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if _is_columnar(data):
+            data = _as_lists(data)
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/x-msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if _is_columnar(data):
+            data = _as_lists(data)
+        return msgpack.packb(data, use_bin_type=True)
+
+
+class ArrowRenderer(BaseRenderer):
+    media_type = 'application/vnd.apache.arrow.stream'
+    format = 'arrow'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not _is_columnar(data):
+            # Errors have no tabular shape; send them as a one-row table.
+            data = {key: [str(value)] for key, value in data.items()}
+        table = pa.table({name: pa.array(values) for name, values in data.items()})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+
+COLUMNAR_RENDERERS = [ColumnarJSONRenderer]
+if msgpack is not None:
+    COLUMNAR_RENDERERS.append(MessagePackRenderer)
+if pa is not None:
+    COLUMNAR_RENDERERS.append(ArrowRenderer)
+
+COLUMNAR_FORMATS = {renderer.format for renderer in COLUMNAR_RENDERERS}
@@ -1,23 +1,44 @@
 from rest_framework import serializers
 from .models import City, InfrastructureFeature, CityGrowthPrediction
 
-class CitySerializer(serializers.ModelSerializer):
+
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """
+    Accepts an optional `fields` tree (see growth.projection) and drops
+    every field that is not in it, recursing into nested serializers.
+    """
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            prune_fields(self, fields)
+
+
+def prune_fields(serializer, tree):
+    for name in list(serializer.fields):
+        if name not in tree:
+            serializer.fields.pop(name)
+        elif isinstance(tree[name], dict):
+            prune_fields(serializer.fields[name], tree[name])
+
+
+class CitySerializer(DynamicFieldsModelSerializer):
     class Meta:
         model = City
         fields = ['id', 'name', 'state', 'country', 'latitude', 'longitude', 'population']
 
-class InfrastructureSerializer(serializers.ModelSerializer):
+class InfrastructureSerializer(DynamicFieldsModelSerializer):
     city = CitySerializer()
 
     class Meta:
         model = InfrastructureFeature
         fields = "__all__"
 
-class CityGrowthPredictionSerializer(serializers.ModelSerializer):
+class CityGrowthPredictionSerializer(DynamicFieldsModelSerializer):
     city = CitySerializer()
     class Meta:
         model = CityGrowthPrediction
         fields = ['city', 'growth_score', 'predicted_growth', 'livability_score',
                   'livability_growth', 'gdp_current', 'gdp_growth_rate',
                   'positive_factors', 'negative_factors', 'crime_rate',
-                  'traffic_index', 'aqi', 'historic_growth']
\ No newline at end of file
+                  'traffic_index', 'aqi', 'historic_growth']
@@ -0,0 +1,69 @@
+"""
+Bulk write helpers for the data pipeline scripts.
+
+Saving rows one at a time makes every row its own autocommit
+transaction, which on SQLite means one fsync per city. These helpers
+write in chunks of BULK_BATCH_SIZE inside a single transaction.atomic()
+block (a savepoint when the caller already holds a transaction) and bump
+the dataset version once at the end, since bulk operations bypass the
+post_save signals that normally do it.
+"""
+from django.db import transaction
+
+from .dataset_version import bump_dataset_version
+
+BULK_BATCH_SIZE = 500
+
+
+def bulk_update(model, objs, fields, batch_size=BULK_BATCH_SIZE):
+    """
+    Writes `fields` of already-saved `objs`. Returns the number of rows
+    updated.
+    """
+    objs = list(objs)
+    if not objs:
+        return 0
+    with transaction.atomic():
+        updated = model.objects.bulk_update(objs, fields, batch_size=batch_size)
+        bump_dataset_version()
+    return updated
+
+
+def bulk_upsert(model, objs, unique_fields, update_fields=None, batch_size=BULK_BATCH_SIZE):
+    """
+    Inserts `objs`, updating `update_fields` of rows that already exist
+    with the same `unique_fields` (INSERT ... ON CONFLICT DO UPDATE).
+    Without `update_fields` existing rows are left untouched, like
+    get_or_create().
+    """
+    objs = list(objs)
+    if not objs:
+        return []
+    if update_fields:
+        options = {"update_conflicts": True, "unique_fields": unique_fields,
+                   "update_fields": update_fields}
+    else:
+        options = {"ignore_conflicts": True}
+    with transaction.atomic():
+        created = model.objects.bulk_create(objs, batch_size=batch_size, **options)
+        bump_dataset_version()
+    return created
+
+
+def bulk_save(model, objs, fields, batch_size=BULK_BATCH_SIZE):
+    """
+    For models without a unique natural key (City is matched by name):
+    bulk-creates the unsaved `objs` and bulk-updates `fields` on the
+    rest. Created objects get their primary keys set.
+    """
+    objs = list(objs)
+    new = [obj for obj in objs if obj.pk is None]
+    existing = [obj for obj in objs if obj.pk is not None]
+    with transaction.atomic():
+        if new:
+            model.objects.bulk_create(new, batch_size=batch_size)
+        if existing:
+            model.objects.bulk_update(existing, fields, batch_size=batch_size)
+        if objs:
+            bump_dataset_version()
+    return objs
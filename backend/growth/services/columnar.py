@@ -0,0 +1,73 @@
+"""
+Column-oriented views of the bulk datasets.
+
+Rows are read with a single values_list() query and transposed into one
+NumPy array per column, which the columnar renderers (JSON, MessagePack,
+Arrow IPC) then encode without repeating keys or nesting the city.
+"""
+import numpy as np
+from rest_framework.exceptions import ValidationError
+
+# Column name -> (ORM path, dtype). JSON blob fields are left out: they
+# are not scalar and have no sensible columnar encoding.
+CITY_COLUMNS = {
+    "id": ("id", np.int64),
+    "name": ("name", object),
+    "state": ("state", object),
+    "country": ("country", object),
+    "latitude": ("latitude", np.float64),
+    "longitude": ("longitude", np.float64),
+    "population": ("population", np.int64),
+}
+
+PREDICTION_COLUMNS = {
+    "city_id": ("city_id", np.int64),
+    "name": ("city__name", object),
+    "state": ("city__state", object),
+    "country": ("city__country", object),
+    "latitude": ("city__latitude", np.float64),
+    "longitude": ("city__longitude", np.float64),
+    "population": ("city__population", np.int64),
+    "growth_score": ("growth_score", np.float64),
+    "predicted_growth": ("predicted_growth", np.float64),
+    "livability_score": ("livability_score", np.float64),
+    "livability_growth": ("livability_growth", np.float64),
+    "gdp_current": ("gdp_current", np.float64),
+    "gdp_growth_rate": ("gdp_growth_rate", np.float64),
+    "crime_rate": ("crime_rate", np.float64),
+    "traffic_index": ("traffic_index", np.float64),
+    "aqi": ("aqi", np.int64),
+}
+
+
+def select_columns(params, available):
+    """
+    Resolves ?fields= / ?exclude= against the flat column names in
+    `available`, preserving the declared column order.
+    """
+    fields = [f.strip() for f in params.get("fields", "").split(",") if f.strip()]
+    exclude = {f.strip() for f in params.get("exclude", "").split(",") if f.strip()}
+
+    unknown = [name for name in [*fields, *exclude] if name not in available]
+    if unknown:
+        raise ValidationError({
+            "fields": f"Unknown column(s): {', '.join(unknown)}. "
+                      f"Choose from: {', '.join(available)}."
+        })
+
+    wanted = set(fields) if fields else set(available)
+    return [name for name in available if name in wanted and name not in exclude]
+
+
+def build_columns(queryset, columns, available):
+    """
+    Runs one values_list() query for `columns` and returns an ordered
+    dict of column name -> NumPy array.
+    """
+    paths = [available[name][0] for name in columns]
+    rows = list(queryset.values_list(*paths))
+    values = zip(*rows) if rows else [()] * len(columns)
+    return {
+        name: np.array(column, dtype=available[name][1])
+        for name, column in zip(columns, values)
+    }
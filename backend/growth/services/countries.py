@@ -0,0 +1,54 @@
+"""
+Countries present in the data, and cache keys for client-supplied
+country strings.
+
+Query strings are arbitrary, so nothing keyed by a raw ?country= value
+may be cached without bound. Callers check the value against the
+countries that have cities (re-read once per dataset version and
+process) and build cache keys with country_key(), which is short and
+safe for every cache backend whatever the client sent.
+"""
+import hashlib
+
+from ..models import City
+from .dataset_version import get_dataset_version
+
+_known = (None, {})
+
+
+def normalize_country(country):
+    return " ".join(country.split()).casefold()
+
+
+def country_key(country):
+    """
+    Cache key fragment for `country` ("*" for None): a digest of the
+    normalized name.
+    """
+    if country is None:
+        return "*"
+    return hashlib.blake2b(normalize_country(country).encode(), digest_size=12).hexdigest()
+
+
+def known_countries(generation=None):
+    """
+    Returns {normalized name: name as stored} for every country with at
+    least one city, as of dataset version token `generation`.
+    """
+    global _known
+    if generation is None:
+        generation = get_dataset_version().token
+    cached_generation, countries = _known
+    if cached_generation != generation:
+        names = City.objects.order_by().values_list("country", flat=True).distinct()
+        countries = {normalize_country(name): name for name in names}
+        _known = (generation, countries)
+    return countries
+
+
+def canonical_country(country, generation=None):
+    """
+    The stored spelling of `country` (matched after normalization), or
+    None if no city has it.
+    """
+    return known_countries(generation).get(normalize_country(country))
@@ -0,0 +1,28 @@
+from django.db.models import F
+from django.utils import timezone
+
+from ..models import DatasetVersion
+
+SINGLETON_ID = 1
+
+
+def get_dataset_version():
+    """
+    Returns the current DatasetVersion row, creating it on first use.
+    """
+    version, _ = DatasetVersion.objects.get_or_create(pk=SINGLETON_ID)
+    return version
+
+
+def bump_dataset_version():
+    """
+    Atomically increments the dataset version. Must be called by any
+    write path that bypasses model signals (bulk_create, bulk_update,
+    queryset.update).
+    """
+    updated = DatasetVersion.objects.filter(pk=SINGLETON_ID).update(
+        version=F("version") + 1,
+        updated_at=timezone.now(),
+    )
+    if not updated:
+        DatasetVersion.objects.get_or_create(pk=SINGLETON_ID)
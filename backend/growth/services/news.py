@@ -1,17 +1,83 @@
-import feedparser
+import logging
+import time
 import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, wait
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from pathlib import Path
 
-def fetch_growth_news(country="India"):
+import feedparser
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+from .countries import canonical_country, country_key
+from .singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Background refreshes and cold fetches run here so a slow upstream
+# never holds a request worker for longer than NEWS_FETCH_TIMEOUT.
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="news-refresh")
+# At most one fetch per country is in flight; everyone else shares it.
+_refreshes = SingleFlight()
+
+
+class HTTPFeedSource:
+    """
+    Fetches an RSS/Atom feed over HTTP. `url_template` is formatted with
+    the URL-encoded search query for the country.
+    """
+    url_template = "{query}"
+
+    def __init__(self, url_template=None, timeout=None):
+        if url_template is not None:
+            self.url_template = url_template
+        self.timeout = timeout if timeout is not None else settings.NEWS_FETCH_TIMEOUT
+
+    def query(self, country):
+        return f"Urban Development Economy Infrastructure {country}"
+
+    def url(self, country):
+        return self.url_template.format(query=urllib.parse.quote(self.query(country)))
+
+    def fetch(self, country):
+        with urllib.request.urlopen(self.url(country), timeout=self.timeout) as response:
+            return response.read()
+
+
+class GoogleNewsSource(HTTPFeedSource):
     """
-    Fetches real-time news related to Urban Growth, Economy, and Infrastructure
-    for a specific country using Google News RSS.
+    Real-time news related to Urban Growth, Economy, and Infrastructure
+    from the Google News RSS search.
     """
-    # URL Encode country
-    encoded_query = urllib.parse.quote(f"Urban Development Economy Infrastructure {country}")
-    rss_url = f"https://news.google.com/rss/search?q={encoded_query}&hl=en-US&gl=US&ceid=US:en"
-    
-    feed = feedparser.parse(rss_url)
-    
+    url_template = "https://news.google.com/rss/search?q={query}&hl=en-US&gl=US&ceid=US:en"
+
+
+class FileFeedSource:
+    """
+    Reads feeds from disk: `<directory>/<country>.xml`, falling back to
+    `<directory>/default.xml`. Meant for tests and offline development.
+    """
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def fetch(self, country):
+        path = self.directory / f"{country}.xml"
+        if not path.exists():
+            path = self.directory / "default.xml"
+        return path.read_bytes()
+
+
+def get_feed_source():
+    source_class = import_string(settings.NEWS_FEED_SOURCE)
+    return source_class(**settings.NEWS_FEED_OPTIONS)
+
+
+def parse_feed(raw):
+    feed = feedparser.parse(raw)
+
     news_items = []
     for entry in feed.entries[:10]: # Top 10 headlines
         news_items.append({
@@ -20,5 +86,125 @@ def fetch_growth_news(country="India"):
             "source": entry.source.title if hasattr(entry, 'source') else "Google News",
             "published": entry.published if hasattr(entry, 'published') else ""
         })
-        
+
     return news_items
+
+
+def _cache_key(country):
+    return f"growth:news:{country_key(country)}"
+
+
+def refresh_news(country):
+    """
+    Fetches and parses the feed for `country` and stores it in the
+    cache. On failure the previous entry is kept and None is returned.
+    """
+    try:
+        items = parse_feed(get_feed_source().fetch(country))
+    except Exception:
+        logger.exception("News refresh failed for %s", country)
+        return None
+
+    cache.set(
+        _cache_key(country),
+        {"items": items, "fetched_at": time.time()},
+        timeout=settings.NEWS_STALE_TTL,
+    )
+    return items
+
+
+def schedule_refresh(country):
+    """
+    Starts a background refresh for `country`, or joins the one already
+    running, and returns its future.
+    """
+    return _refreshes.submit(country, _executor, refresh_news, country)
+
+
+def _cached_news(country):
+    """
+    Returns (items, future): the cached items for `country`, or None
+    with the future of the fetch that will fill the cache. Countries
+    without cities get no items and are never fetched.
+    """
+    country = canonical_country(country)
+    if country is None:
+        return [], None
+    entry = cache.get(_cache_key(country))
+    if entry is not None:
+        if time.time() - entry["fetched_at"] >= settings.NEWS_CACHE_TTL:
+            schedule_refresh(country)
+        return entry["items"], None
+    return None, schedule_refresh(country)
+
+
+def fetch_growth_news(country="India"):
+    """
+    Returns the cached headlines for `country`; an empty list if no
+    city is in it.
+
+    Fresh entries (younger than NEWS_CACHE_TTL) are returned as is.
+    Stale entries are returned immediately while a background refresh
+    runs. On a cold cache the fetch is awaited for at most
+    NEWS_FETCH_TIMEOUT seconds; past that an empty list is returned and
+    the fetch keeps filling the cache in the background.
+    """
+    items, future = _cached_news(country)
+    if future is None:
+        return items
+
+    try:
+        return future.result(timeout=settings.NEWS_FETCH_TIMEOUT) or []
+    except TimeoutError:
+        logger.warning("News fetch for %s exceeded %ss", country, settings.NEWS_FETCH_TIMEOUT)
+        return []
+
+
+def _published_at(item):
+    try:
+        published = parsedate_to_datetime(item["published"])
+    except (TypeError, ValueError):
+        return datetime.min.replace(tzinfo=timezone.utc)
+    if published.tzinfo is None:
+        published = published.replace(tzinfo=timezone.utc)
+    return published
+
+
+def fetch_growth_news_batch(countries, deadline=None):
+    """
+    Fetches the feeds of several countries concurrently and merges them.
+
+    Cold countries are fetched in parallel on the news executor; whatever
+    has not arrived after `deadline` seconds (NEWS_BATCH_DEADLINE by
+    default) is left out and keeps loading in the background.
+
+    Returns (items, pending): the merged headlines, de-duplicated by link
+    and newest first, each tagged with its country; and the countries
+    that missed the deadline.
+    """
+    if deadline is None:
+        deadline = settings.NEWS_BATCH_DEADLINE
+
+    results = {}
+    futures = {}
+    for country in countries:
+        items, future = _cached_news(country)
+        if future is None:
+            results[country] = items
+        else:
+            futures[future] = country
+
+    done, _ = wait(futures, timeout=deadline)
+    for future in done:
+        if future.exception() is None:
+            results[futures[future]] = future.result() or []
+    pending = [country for country in countries if country not in results]
+
+    merged = {}
+    for country in countries:
+        for item in results.get(country, []):
+            if item["link"] not in merged:
+                merged[item["link"]] = {**item, "country": country}
+
+    items = sorted(merged.values(), key=_published_at, reverse=True)
+    return items, pending
@@ -0,0 +1,64 @@
+"""
+Single-flight request coalescing.
+
+When a cache entry expires, every concurrent request for it would
+otherwise recompute the same value at once. A SingleFlight lets exactly
+one caller per key run the computation while the others wait for and
+share its result (or exception). Coalescing is per process: each web
+worker computes a cold key at most once, however many threads ask.
+"""
+from concurrent.futures import Future
+from threading import Lock
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = Lock()
+        self._inflight = {}
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._inflight
+
+    def _claim(self, key):
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future, False
+            future = Future()
+            future.set_running_or_notify_cancel()
+            self._inflight[key] = future
+            return future, True
+
+    def _run(self, key, future, fn, args, kwargs):
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as exc:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(exc)
+        else:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_result(result)
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Runs fn(*args, **kwargs) in the calling thread unless a call for
+        `key` is already in flight, in which case it waits for that one.
+        Returns the shared result or raises the shared exception.
+        """
+        future, leader = self._claim(key)
+        if leader:
+            self._run(key, future, fn, args, kwargs)
+        return future.result()
+
+    def submit(self, key, executor, fn, *args, **kwargs):
+        """
+        Like do(), but the leader runs fn on `executor`. Returns the
+        shared Future so callers can wait with their own timeout.
+        """
+        future, leader = self._claim(key)
+        if leader:
+            executor.submit(self._run, key, future, fn, args, kwargs)
+        return future
@@ -0,0 +1,175 @@
+"""
+Pre-serialized snapshots of the list endpoints.
+
+The prediction and city tables only change when the training or seed
+scripts run, so the fully rendered JSON for each (endpoint, country)
+pair is kept as bytes and served without touching the ORM or the
+serializers. Snapshots are keyed by the dataset version, live in the
+shared Django cache for SNAPSHOT_TTL seconds and are mirrored in a
+per-process dict so that a warm hit is one version lookup plus a memory
+copy.
+
+Only countries that have cities get snapshots (see countries.py), so
+neither the cache nor the per-process dict grows with whatever
+?country= clients send; the mirror also drops superseded versions.
+
+Each snapshot is stored pre-compressed (gzip, and brotli when the
+`brotli` package is installed) next to the plain bytes, so identical
+payloads are compressed once per dataset version instead of per request.
+"""
+import gzip
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from ..filters import DEFAULT_PREDICTION_ORDERING, PREDICTION_ORDERINGS
+from ..models import City, CityGrowthPrediction
+from ..serializers import CitySerializer, CityGrowthPredictionSerializer
+from .countries import country_key, known_countries, normalize_country
+from .dataset_version import bump_dataset_version, get_dataset_version
+from .singleflight import SingleFlight
+
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 9
+
+# Content-Encoding tokens in server preference order.
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+_local = {}
+_renders = SingleFlight()
+
+
+def _render_predictions(country):
+    predictions = CityGrowthPrediction.objects.select_related("city")
+    if country:
+        predictions = predictions.filter(city__country=country)
+    predictions = predictions.order_by(*PREDICTION_ORDERINGS[DEFAULT_PREDICTION_ORDERING])
+    return CityGrowthPredictionSerializer(predictions, many=True).data
+
+
+def _render_cities(country):
+    cities = City.objects.all()
+    if country:
+        cities = cities.filter(country=country)
+    return CitySerializer(cities, many=True).data
+
+
+SNAPSHOTS = {
+    "predictions": _render_predictions,
+    "cities": _render_cities,
+}
+
+
+def _cache_key(name, country, generation):
+    return f"growth:snapshot:{name}:{country_key(country)}:{generation}:variants"
+
+
+def compress_variants(payload):
+    """
+    Returns {content_encoding: bytes} for `payload`, with the plain
+    bytes under "identity".
+    """
+    variants = {
+        "identity": payload,
+        "gzip": gzip.compress(payload, compresslevel=GZIP_LEVEL, mtime=0),
+    }
+    if brotli is not None:
+        variants["br"] = brotli.compress(payload, quality=BROTLI_QUALITY)
+    return variants
+
+
+def negotiate_encoding(accept_encoding, available=ENCODINGS):
+    """
+    Picks the best encoding in `available` allowed by an Accept-Encoding
+    header, honouring q-values (q=0 forbids). Falls back to "identity".
+    """
+    weights = {}
+    for part in (accept_encoding or "").split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[token] = q
+
+    best, best_q = "identity", 0.0
+    for encoding in available:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def _render(name, country, key):
+    variants = compress_variants(JSONRenderer().render(SNAPSHOTS[name](country)))
+    cache.set(key, variants, timeout=settings.SNAPSHOT_TTL)
+    return variants
+
+
+def get_snapshot(name, country=None, generation=None):
+    """
+    Returns the encoded variants of snapshot `name` (see
+    compress_variants), scoped to `country` (or global when None),
+    rendering them on a miss. Returns None for a country no city has;
+    callers answer those dynamically.
+
+    `generation` is the dataset version token; callers that already
+    looked it up can pass it to save a query.
+    """
+    global _local
+    if generation is None:
+        generation = get_dataset_version().token
+    local_key = (name, country)
+
+    hit = _local.get(local_key)
+    if hit is not None and hit[0] == generation:
+        return hit[1]
+    if country is not None and known_countries(generation).get(normalize_country(country)) != country:
+        return None
+
+    key = _cache_key(name, country, generation)
+    variants = cache.get(key)
+    if variants is None:
+        # Concurrent misses for the same snapshot render it once.
+        variants = _renders.do(key, _render, name, country, key)
+
+    # Entries of earlier versions are never read again.
+    _local = {key: entry for key, entry in _local.items() if entry[0] == generation}
+    _local[local_key] = (generation, variants)
+    return variants
+
+
+def invalidate_snapshots():
+    """
+    Moves every snapshot to a new dataset version. Old entries are never
+    read again and expire from the shared cache after SNAPSHOT_TTL.
+    """
+    bump_dataset_version()
+    _local.clear()
+
+
+def rebuild_snapshots():
+    """
+    Invalidates and eagerly re-renders the global and per-country
+    snapshots. Called by the pipeline scripts after they write.
+    """
+    invalidate_snapshots()
+    countries = [None] + list(
+        City.objects.order_by().values_list("country", flat=True).distinct()
+    )
+    for name in SNAPSHOTS:
+        for country in countries:
+            get_snapshot(name, country)
@@ -0,0 +1,83 @@
+"""
+Spatial lookups over City coordinates.
+
+Nearest-neighbour queries use an in-process haversine BallTree, rebuilt
+lazily whenever the dataset version changes. Bounding boxes are plain
+range queries (bbox_filter) answered by the database on the
+(latitude, longitude) index, so their size never depends on how many
+cities match.
+"""
+import numpy as np
+from django.db.models import Q
+from sklearn.neighbors import BallTree
+
+from ..models import City
+from .dataset_version import get_dataset_version
+from .singleflight import SingleFlight
+
+EARTH_RADIUS_KM = 6371.0088
+
+_index = None
+_builds = SingleFlight()
+
+
+class CityIndex:
+    def __init__(self, ids, latitudes, longitudes, version=None):
+        self.version = version
+        self.ids = np.asarray(ids, dtype=np.int64)
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+
+        self.tree = None
+        if len(self.ids):
+            self.tree = BallTree(np.radians(np.column_stack([latitudes, longitudes])),
+                                 metric="haversine")
+
+    def __len__(self):
+        return len(self.ids)
+
+    def nearest(self, latitude, longitude, k=10):
+        """
+        Returns (ids, distances_km) of the `k` closest cities, nearest
+        first.
+        """
+        k = min(k, len(self))
+        if k == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        distances, positions = self.tree.query(np.radians([[latitude, longitude]]), k=k)
+        return self.ids[positions[0]], distances[0] * EARTH_RADIUS_KM
+
+
+def bbox_filter(min_lon, min_lat, max_lon, max_lat):
+    """
+    Q object selecting the cities inside the box. A box with
+    min_lon > max_lon wraps across the antimeridian and becomes two
+    longitude ranges.
+    """
+    box = Q(latitude__range=(min_lat, max_lat))
+    if min_lon <= max_lon:
+        return box & Q(longitude__range=(min_lon, max_lon))
+    return box & (Q(longitude__gte=min_lon) | Q(longitude__lte=max_lon))
+
+
+def build_city_index(version=None):
+    rows = np.array(
+        City.objects.order_by("id").values_list("id", "latitude", "longitude"),
+        dtype=np.float64,
+    ).reshape(-1, 3)
+    return CityIndex(rows[:, 0], rows[:, 1], rows[:, 2], version=version)
+
+
+def get_city_index(version=None):
+    """
+    Returns the process-wide CityIndex, rebuilding it when the dataset
+    version token differs from the one it was built for.
+    """
+    global _index
+    if version is None:
+        version = get_dataset_version().token
+    index = _index
+    if index is None or index.version != version:
+        index = _builds.do(version, build_city_index, version)
+        _index = index
+    return index
@@ -0,0 +1,36 @@
+"""
+Incremental JSON encoding for full-dataset responses.
+
+Rows are read with QuerySet.iterator() and serialized one chunk at a
+time, so peak memory is bounded by `chunk_size` rows rather than by the
+table size, and the first bytes go out before the last row is read.
+"""
+from rest_framework.renderers import JSONRenderer
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def stream_json_array(queryset, serializer_class, chunk_size=DEFAULT_CHUNK_SIZE, **serializer_kwargs):
+    """
+    Yields the JSON array of `queryset` serialized with
+    `serializer_class`, as byte chunks.
+    """
+    renderer = JSONRenderer()
+
+    def encode(batch):
+        data = serializer_class(batch, many=True, **serializer_kwargs).data
+        # Drop the enclosing brackets so chunks can be joined with commas.
+        return renderer.render(data)[1:-1]
+
+    yield b"["
+    first = True
+    batch = []
+    for obj in queryset.iterator(chunk_size=chunk_size):
+        batch.append(obj)
+        if len(batch) == chunk_size:
+            yield (b"" if first else b",") + encode(batch)
+            first = False
+            batch = []
+    if batch:
+        yield (b"" if first else b",") + encode(batch)
+    yield b"]"
@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import City, InfrastructureFeature, CityGrowthPrediction
+from .services.dataset_version import bump_dataset_version
+
+
+@receiver(post_save, sender=City)
+@receiver(post_save, sender=InfrastructureFeature)
+@receiver(post_save, sender=CityGrowthPrediction)
+@receiver(post_delete, sender=City)
+@receiver(post_delete, sender=InfrastructureFeature)
+@receiver(post_delete, sender=CityGrowthPrediction)
+def dataset_changed(sender, **kwargs):
+    bump_dataset_version()
@@ -1,3 +1,1488 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import sys
+import tempfile
+import threading
+import time
+import types
+import warnings
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest import mock, skipIf
 
-# Create your tests here.
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+from django.core.cache import cache
+from django.core.cache.backends.base import CacheKeyWarning
+from django.core.cache.backends import locmem
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .models import City, InfrastructureFeature, CityGrowthPrediction
+from .osm import centrality, extract, graph as road_graph, store as osm_store
+from .osm.graph import RoadGraph, great_circle
+from .osm.network import network_metrics, simplify
+from .osm.overpass import OSMCache
+from .ml import inference, registry
+from .ml.features import FEATURE_NAMES, growth_factors, growth_target, load_training_frame, training_matrix
+from .ml.forest import FlatForest
+from .ml.incremental import feature_stats, plan_update, row_fingerprints
+from .ml.training import cpu_budget, train_growth_model
+from .renderers import msgpack, pa
+from .services import news, snapshots
+from .services.snapshots import brotli, negotiate_encoding
+from .serializers import CitySerializer
+from .services.bulk import bulk_save, bulk_update, bulk_upsert
+from .services.dataset_version import get_dataset_version
+from .services.singleflight import SingleFlight
+from .services.streaming import stream_json_array
+
+TEST_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+}
+
+
+def make_city(name, country="India", growth_score=5.0, **prediction_fields):
+    city = City.objects.create(
+        name=name,
+        state=f"{name} State",
+        country=country,
+        population=1_000_000,
+        latitude=10.0,
+        longitude=70.0,
+    )
+    CityGrowthPrediction.objects.create(
+        city=city,
+        growth_score=growth_score,
+        predicted_growth=growth_score * 0.8,
+        **prediction_fields
+    )
+    return city
+
+
+@override_settings(CACHES=TEST_CACHES)
+class GrowthTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        snapshots.invalidate_snapshots()
+
+
+class PredictionListTests(GrowthTestCase):
+    def setUp(self):
+        super().setUp()
+        make_city("Pune", growth_score=7.5)
+        make_city("Jaipur", growth_score=4.0)
+        make_city("Austin", country="USA", growth_score=6.0)
+
+    def test_list_uses_constant_number_of_queries(self):
+        # One query for the dataset version, one for the joined rows.
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("get_predictions"), {"min_score": 0})
+        self.assertEqual(len(response.json()), 3)
+
+    def test_filters_by_country_and_score_range(self):
+        response = self.client.get(
+            reverse("get_predictions"),
+            {"country": "India", "min_score": 5},
+        )
+        self.assertEqual([p["city"]["name"] for p in response.json()], ["Pune"])
+
+    def test_default_ordering_is_descending_growth_score(self):
+        response = self.client.get(reverse("get_predictions"))
+        scores = [p["growth_score"] for p in response.json()]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_cursor_pagination_walks_all_rows(self):
+        response = self.client.get(
+            reverse("get_predictions"), {"limit": 2, "ordering": "growth_score"}
+        )
+        first = response.json()
+        self.assertEqual([p["city"]["name"] for p in first["results"]], ["Jaipur", "Austin"])
+
+        second = self.client.get(first["next"]).json()
+        self.assertEqual([p["city"]["name"] for p in second["results"]], ["Pune"])
+        self.assertIsNone(second["next"])
+
+    def test_rejects_unknown_ordering(self):
+        response = self.client.get(reverse("get_predictions"), {"ordering": "name"})
+        self.assertEqual(response.status_code, 400)
+
+
+class SnapshotTests(GrowthTestCase):
+    def setUp(self):
+        super().setUp()
+        make_city("Pune", growth_score=7.5)
+        make_city("Austin", country="USA", growth_score=6.0)
+
+    def test_warm_snapshot_only_reads_the_dataset_version(self):
+        self.client.get(reverse("get_predictions"))
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("get_predictions"))
+        self.assertEqual(len(response.json()), 2)
+
+    def test_snapshot_is_scoped_by_country(self):
+        response = self.client.get(reverse("get_cities"), {"country": "USA"})
+        self.assertEqual([c["name"] for c in response.json()], ["Austin"])
+
+    def test_writes_invalidate_snapshot(self):
+        self.client.get(reverse("get_predictions"))
+        make_city("Leeds", country="UK", growth_score=3.0)
+        response = self.client.get(reverse("get_predictions"))
+        self.assertEqual(len(response.json()), 3)
+
+    def test_unknown_country_is_served_without_a_snapshot(self):
+        self.client.get(reverse("get_cities"), {"country": "USA"})
+        before = dict(snapshots._local)
+        for country in ("Atlantis", "usa", "x" * 300):
+            response = self.client.get(reverse("get_cities"), {"country": country})
+            self.assertEqual(response.json(), [])
+            self.assertIsNone(snapshots.get_snapshot("cities", country))
+        self.assertEqual(snapshots._local, before)
+
+    def test_cache_keys_are_safe_for_any_country(self):
+        make_city("Auckland", country="New Zealand")
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", CacheKeyWarning)
+            response = self.client.get(reverse("get_predictions"), {"country": "New Zealand"})
+        self.assertEqual([p["city"]["name"] for p in response.json()], ["Auckland"])
+        key = snapshots._cache_key("predictions", "New Zealand", get_dataset_version().token)
+        self.assertNotIn(" ", key)
+
+    @override_settings(SNAPSHOT_TTL=60)
+    def test_superseded_snapshots_expire(self):
+        generation = get_dataset_version().token
+        snapshots.get_snapshot("predictions", generation=generation)
+        key = snapshots._cache_key("predictions", None, generation)
+        snapshots.invalidate_snapshots()
+        self.assertIsNotNone(cache.get(key))
+        later = mock.Mock(time=mock.Mock(return_value=time.time() + 120))
+        with mock.patch.object(locmem, "time", later):
+            self.assertIsNone(cache.get(key))
+
+
+class ConditionalGetTests(GrowthTestCase):
+    def setUp(self):
+        super().setUp()
+        make_city("Pune", growth_score=7.5)
+
+    def test_matching_etag_returns_304(self):
+        response = self.client.get(reverse("get_predictions"))
+        etag = response["ETag"]
+        self.assertTrue(etag.startswith('"'))
+        self.assertIn("Last-Modified", response)
+
+        response = self.client.get(reverse("get_predictions"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_etag_changes_with_dataset_version(self):
+        etag = self.client.get(reverse("get_cities"))["ETag"]
+        make_city("Leeds", country="UK")
+        response = self.client.get(reverse("get_cities"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_etag_varies_with_query(self):
+        all_cities = self.client.get(reverse("get_cities"))["ETag"]
+        india = self.client.get(reverse("get_cities"), {"country": "India"})["ETag"]
+        self.assertNotEqual(all_cities, india)
+
+
+class SparseFieldsetTests(GrowthTestCase):
+    def setUp(self):
+        super().setUp()
+        make_city("Pune", growth_score=7.5, historic_growth=[{"year": 2020}])
+
+    def test_fields_limit_keys_and_columns(self):
+        with self.assertNumQueries(2) as ctx:
+            response = self.client.get(
+                reverse("get_predictions"),
+                {"fields": "growth_score,gdp_current,city.latitude,city.longitude"},
+            )
+        self.assertEqual(response.json(), [{
+            "city": {"latitude": 10.0, "longitude": 70.0},
+            "growth_score": 7.5,
+            "gdp_current": 0.0,
+        }])
+        self.assertNotIn("historic_growth", ctx.captured_queries[-1]["sql"])
+
+    def test_exclude_drops_json_blobs(self):
+        response = self.client.get(
+            reverse("get_predictions"),
+            {"exclude": "historic_growth,positive_factors,negative_factors,city.state"},
+        )
+        row = response.json()[0]
+        self.assertNotIn("historic_growth", row)
+        self.assertNotIn("state", row["city"])
+        self.assertIn("aqi", row)
+
+    def test_fields_without_city_skip_the_join(self):
+        with self.assertNumQueries(2) as ctx:
+            response = self.client.get(reverse("get_predictions"), {"fields": "growth_score"})
+        self.assertEqual(response.json(), [{"growth_score": 7.5}])
+        self.assertNotIn("JOIN", ctx.captured_queries[-1]["sql"])
+
+    def test_city_fields(self):
+        response = self.client.get(reverse("get_cities"), {"fields": "name,population"})
+        self.assertEqual(response.json(), [{"name": "Pune", "population": 1_000_000}])
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get(reverse("get_predictions"), {"fields": "city.mayor"})
+        self.assertEqual(response.status_code, 400)
+
+
+class ColumnarFormatTests(GrowthTestCase):
+    def setUp(self):
+        super().setUp()
+        make_city("Pune", growth_score=7.5, gdp_current=80.0)
+        make_city("Austin", country="USA", growth_score=6.0, gdp_current=150.0)
+
+    def test_columnar_json_via_format_param(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                reverse("get_predictions"),
+                {"format": "columnar", "fields": "name,growth_score,gdp_current"},
+            )
+        self.assertEqual(response.json(), {
+            "name": ["Pune", "Austin"],
+            "growth_score": [7.5, 6.0],
+            "gdp_current": [80.0, 150.0],
+        })
+
+    def test_columnar_json_via_accept_header(self):
+        response = self.client.get(
+            reverse("get_cities"),
+            {"country": "USA"},
+            HTTP_ACCEPT="application/vnd.citygrowth.columnar+json",
+        )
+        self.assertEqual(response.json()["name"], ["Austin"])
+        self.assertIn("Accept", response["Vary"])
+
+    @skipIf(msgpack is None, "msgpack is not installed")
+    def test_messagepack(self):
+        response = self.client.get(reverse("get_predictions"), {"format": "msgpack"})
+        self.assertEqual(response["Content-Type"], "application/x-msgpack")
+        columns = msgpack.unpackb(response.content)
+        self.assertEqual(columns["city_id"], [City.objects.get(name="Pune").id,
+                                              City.objects.get(name="Austin").id])
+
+    @skipIf(pa is None, "pyarrow is not installed")
+    def test_arrow_ipc(self):
+        response = self.client.get(
+            reverse("get_predictions"),
+            {"fields": "latitude,aqi"},
+            HTTP_ACCEPT="application/vnd.apache.arrow.stream",
+        )
+        table = pa.ipc.open_stream(response.content).read_all()
+        self.assertEqual(table.column_names, ["latitude", "aqi"])
+        self.assertEqual(table.num_rows, 2)
+
+    def test_unknown_column_is_rejected(self):
+        response = self.client.get(reverse("get_predictions"), {"format": "columnar", "fields": "city"})
+        self.assertEqual(response.status_code, 400)
+
+
+def add_infrastructure(city, nodes=1000):
+    return InfrastructureFeature.objects.create(
+        city=city,
+        nodes=nodes,
+        edges=nodes * 2,
+        avg_degree=2.5,
+        intersections=nodes // 2,
+        infrastructure_index=0.5,
+    )
+
+
+class InfrastructureEndpointTests(GrowthTestCase):
+    def setUp(self):
+        super().setUp()
+        self.pune = make_city("Pune")
+        self.austin = make_city("Austin", country="USA")
+        self.leeds = City.objects.create(
+            name="Leeds", state="Yorkshire", country="UK", latitude=53.8, longitude=-1.5
+        )
+        add_infrastructure(self.pune, nodes=1200)
+        add_infrastructure(self.austin, nodes=900)
+
+    def test_single_city_lookup(self):
+        response = self.client.get(reverse("get_infrastructure", args=[self.austin.id]))
+        self.assertEqual(response.json()["nodes"], 900)
+        self.assertEqual(response.json()["city"]["name"], "Austin")
+
+    def test_single_city_lookup_missing(self):
+        response = self.client.get(reverse("get_infrastructure", args=[self.leeds.id]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_bulk_lookup_is_one_query(self):
+        ids = f"{self.pune.id},{self.austin.id},{self.leeds.id}"
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("get_infrastructure_bulk"), {"ids": ids})
+        self.assertEqual([i["city"]["name"] for i in response.json()], ["Pune", "Austin"])
+
+    def test_bulk_lookup_rejects_bad_ids(self):
+        response = self.client.get(reverse("get_infrastructure_bulk"), {"ids": "1,x"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_city_detail_in_one_query(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("get_city_detail", args=[self.pune.id]))
+        body = response.json()
+        self.assertEqual(body["city"]["name"], "Pune")
+        self.assertEqual(body["infrastructure"]["nodes"], 1200)
+        self.assertNotIn("city", body["infrastructure"])
+        self.assertEqual(body["prediction"]["growth_score"], 5.0)
+
+    def test_city_detail_without_related_rows(self):
+        body = self.client.get(reverse("get_city_detail", args=[self.leeds.id])).json()
+        self.assertIsNone(body["infrastructure"])
+        self.assertIsNone(body["prediction"])
+
+
+RSS_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel><title>Test feed</title>{items}</channel></rss>
+"""
+
+RSS_ITEM = """<item><title>{title}</title><link>{link}</link>
+<pubDate>{published}</pubDate><source url="https://example.com">Example Wire</source></item>"""
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.005)
+
+
+def write_feed(directory, name, entries):
+    items = "".join(RSS_ITEM.format(**entry) for entry in entries)
+    (Path(directory) / f"{name}.xml").write_text(RSS_TEMPLATE.format(items=items))
+
+
+class NewsServiceTests(GrowthTestCase):
+    def setUp(self):
+        super().setUp()
+        make_city("Pune")
+        self.feeds = tempfile.TemporaryDirectory()
+        self.addCleanup(self.feeds.cleanup)
+        write_feed(self.feeds.name, "India", [{
+            "title": "Metro line opens",
+            "link": "https://example.com/metro",
+            "published": "Mon, 05 Oct 2026 10:00:00 GMT",
+        }])
+        overrides = self.settings(
+            NEWS_FEED_SOURCE="growth.services.news.FileFeedSource",
+            NEWS_FEED_OPTIONS={"directory": self.feeds.name},
+            NEWS_CACHE_TTL=60,
+            NEWS_FETCH_TIMEOUT=2,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_cold_fetch_parses_feed(self):
+        items = news.fetch_growth_news("India")
+        self.assertEqual(items, [{
+            "title": "Metro line opens",
+            "link": "https://example.com/metro",
+            "source": "Example Wire",
+            "published": "Mon, 05 Oct 2026 10:00:00 GMT",
+        }])
+
+    def test_fresh_entry_is_served_from_cache(self):
+        news.fetch_growth_news("India")
+        with mock.patch.object(news.FileFeedSource, "fetch") as fetch:
+            news.fetch_growth_news("India")
+        fetch.assert_not_called()
+
+    def test_stale_entry_is_served_while_refreshing(self):
+        news.fetch_growth_news("India")
+        write_feed(self.feeds.name, "India", [{
+            "title": "Airport expansion approved",
+            "link": "https://example.com/airport",
+            "published": "Tue, 06 Oct 2026 10:00:00 GMT",
+        }])
+        with mock.patch.object(news.time, "time", return_value=time.time() + 120):
+            stale = news.fetch_growth_news("India")
+        self.assertEqual(stale[0]["title"], "Metro line opens")
+
+        wait_for(lambda: "India" not in news._refreshes)
+        self.assertEqual(news.fetch_growth_news("India")[0]["title"], "Airport expansion approved")
+
+    def test_country_without_cities_is_not_fetched(self):
+        with mock.patch.object(news, "schedule_refresh") as schedule:
+            self.assertEqual(news.fetch_growth_news("Atlantis"), [])
+        schedule.assert_not_called()
+        self.assertIsNone(cache.get(news._cache_key("Atlantis")))
+
+    def test_country_is_matched_and_keyed_normalized(self):
+        self.assertEqual(news.fetch_growth_news(" india ")[0]["title"], "Metro line opens")
+        self.assertEqual(news._cache_key("India"), news._cache_key("INDIA"))
+        self.assertNotIn(" ", news._cache_key("New Zealand"))
+
+    def test_cold_fetch_gives_up_after_timeout(self):
+        release = threading.Event()
+        real_fetch = news.FileFeedSource.fetch
+
+        def slow_fetch(source, country):
+            release.wait(5)
+            return real_fetch(source, country)
+
+        with self.settings(NEWS_FETCH_TIMEOUT=0.05), \
+                mock.patch.object(news.FileFeedSource, "fetch", slow_fetch), \
+                self.assertLogs("growth.services.news", "WARNING"):
+            self.assertEqual(news.fetch_growth_news("India"), [])
+            release.set()
+            wait_for(lambda: "India" not in news._refreshes)
+
+        # The abandoned fetch still lands in the cache for the next caller.
+        self.assertEqual(news.fetch_growth_news("India")[0]["title"], "Metro line opens")
+
+
+class NewsBatchTests(GrowthTestCase):
+    def setUp(self):
+        super().setUp()
+        make_city("Pune")
+        make_city("Austin", country="USA")
+        self.feeds = tempfile.TemporaryDirectory()
+        self.addCleanup(self.feeds.cleanup)
+        shared = {
+            "title": "Global infrastructure report",
+            "link": "https://example.com/shared",
+            "published": "Wed, 07 Oct 2026 09:00:00 GMT",
+        }
+        write_feed(self.feeds.name, "India", [shared, {
+            "title": "Metro line opens",
+            "link": "https://example.com/metro",
+            "published": "Mon, 05 Oct 2026 10:00:00 GMT",
+        }])
+        write_feed(self.feeds.name, "USA", [{
+            "title": "Transit bill passes",
+            "link": "https://example.com/transit",
+            "published": "Thu, 08 Oct 2026 12:00:00 GMT",
+        }, shared])
+        overrides = self.settings(
+            NEWS_FEED_SOURCE="growth.services.news.FileFeedSource",
+            NEWS_FEED_OPTIONS={"directory": self.feeds.name},
+            NEWS_BATCH_DEADLINE=2,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_merges_dedupes_and_sorts(self):
+        response = self.client.get(reverse("get_news"), {"country": "India,USA"})
+        items = response.json()
+        self.assertEqual(
+            [(i["title"], i["country"]) for i in items],
+            [
+                ("Transit bill passes", "USA"),
+                ("Global infrastructure report", "India"),
+                ("Metro line opens", "India"),
+            ],
+        )
+        self.assertNotIn("X-News-Pending", response)
+
+    def test_slow_feed_is_left_out_after_deadline(self):
+        release = threading.Event()
+        real_fetch = news.FileFeedSource.fetch
+
+        def fetch(source, country):
+            if country == "USA":
+                release.wait(5)
+            return real_fetch(source, country)
+
+        with self.settings(NEWS_BATCH_DEADLINE=0.1), \
+                mock.patch.object(news.FileFeedSource, "fetch", fetch):
+            response = self.client.get(reverse("get_news"), {"country": "India,USA"})
+            release.set()
+            wait_for(lambda: "USA" not in news._refreshes)
+
+        self.assertEqual(response["X-News-Pending"], "USA")
+        self.assertEqual({i["country"] for i in response.json()}, {"India"})
+
+
+class SingleFlightTests(TestCase):
+    def test_concurrent_callers_share_one_computation(self):
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return "value"
+
+        claims = []
+        claim = flight._claim
+
+        def counting_claim(key):
+            future, is_leader = claim(key)
+            claims.append(is_leader)
+            return future, is_leader
+
+        flight._claim = counting_claim
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flight.do("k", compute)))
+        leader.start()
+        started.wait(5)
+        followers = [
+            threading.Thread(target=lambda: results.append(flight.do("k", compute)))
+            for _ in range(5)
+        ]
+        for thread in followers:
+            thread.start()
+        wait_for(lambda: len(claims) == 6)
+        release.set()
+        for thread in [leader, *followers]:
+            thread.join(5)
+
+        self.assertEqual(calls, [1])
+        self.assertEqual(claims, [True] + [False] * 5)
+        self.assertEqual(results, ["value"] * 6)
+        self.assertNotIn("k", flight)
+
+    def test_exception_is_shared_and_key_released(self):
+        flight = SingleFlight()
+
+        def boom():
+            raise RuntimeError("upstream down")
+
+        with self.assertRaises(RuntimeError):
+            flight.do("k", boom)
+        self.assertEqual(flight.do("k", lambda: 42), 42)
+
+
+class SpatialIndexTests(GrowthTestCase):
+    def setUp(self):
+        super().setUp()
+        for name, country, latitude, longitude in [
+            ("Mumbai", "India", 19.076, 72.8777),
+            ("Pune", "India", 18.5204, 73.8567),
+            ("Delhi", "India", 28.7041, 77.1025),
+            ("London", "UK", 51.5074, -0.1278),
+            ("Auckland", "New Zealand", -36.8485, 174.7633),
+        ]:
+            City.objects.create(name=name, state=name, country=country,
+                                latitude=latitude, longitude=longitude)
+
+    def test_nearby_orders_by_distance(self):
+        response = self.client.get(
+            reverse("get_nearby_cities"), {"lat": 19.0, "lon": 73.0, "k": 3}
+        )
+        body = response.json()
+        self.assertEqual([c["name"] for c in body], ["Mumbai", "Pune", "Delhi"])
+        self.assertAlmostEqual(body[1]["distance_km"], 104.8, delta=0.5)
+
+    def test_nearby_validates_parameters(self):
+        response = self.client.get(reverse("get_nearby_cities"), {"lat": 95, "lon": 0})
+        self.assertEqual(response.status_code, 400)
+
+    def test_bbox_filters_cities(self):
+        response = self.client.get(reverse("get_cities"), {"bbox": "72,18,74,20"})
+        self.assertEqual(sorted(c["name"] for c in response.json()), ["Mumbai", "Pune"])
+
+    def test_bbox_across_antimeridian(self):
+        response = self.client.get(reverse("get_cities"), {"bbox": "170,-40,-170,-30"})
+        self.assertEqual([c["name"] for c in response.json()], ["Auckland"])
+
+    def test_bbox_validates_values(self):
+        for bbox in ("nan,nan,nan,nan", "0,0,inf,10", "0,0,999,999", "0,-91,10,10", "0,20,10,10", "1,2,3"):
+            with self.subTest(bbox=bbox):
+                response = self.client.get(reverse("get_cities"), {"bbox": bbox})
+                self.assertEqual(response.status_code, 400)
+
+    def test_bbox_is_a_range_query(self):
+        with self.assertNumQueries(2) as ctx:
+            response = self.client.get(reverse("get_cities"), {"bbox": "-180,-90,180,90", "fields": "id"})
+        self.assertEqual(len(response.json()), City.objects.count())
+        sql = ctx.captured_queries[-1]["sql"]
+        self.assertIn("BETWEEN", sql)
+        self.assertNotIn(" IN (", sql)
+
+    def test_index_is_rebuilt_after_changes(self):
+        self.client.get(reverse("get_nearby_cities"), {"lat": 51.5, "lon": 0, "k": 1})
+        City.objects.create(name="Greenwich", state="London", country="UK",
+                            latitude=51.4769, longitude=0.0)
+        response = self.client.get(reverse("get_nearby_cities"), {"lat": 51.48, "lon": 0, "k": 1})
+        self.assertEqual(response.json()[0]["name"], "Greenwich")
+
+
+class RankingTests(GrowthTestCase):
+    def setUp(self):
+        super().setUp()
+        make_city("Pune", growth_score=7.5, aqi=160)
+        make_city("Jaipur", growth_score=4.0, aqi=190)
+        make_city("Austin", country="USA", growth_score=6.0, aqi=40)
+        make_city("Denver", country="USA", growth_score=6.5, aqi=35)
+
+    def test_top_k_descending(self):
+        response = self.client.get(reverse("get_rankings"), {"metric": "growth_score", "k": 2})
+        body = response.json()
+        self.assertEqual([(r["rank"], r["city"]["name"]) for r in body], [(1, "Pune"), (2, "Denver")])
+        self.assertEqual(body[0]["value"], 7.5)
+
+    def test_country_and_ascending_order(self):
+        response = self.client.get(
+            reverse("get_rankings"), {"metric": "aqi", "country": "USA", "order": "asc", "k": 5}
+        )
+        self.assertEqual([r["city"]["name"] for r in response.json()], ["Denver", "Austin"])
+
+    def test_query_is_limited(self):
+        with self.assertNumQueries(2) as ctx:
+            self.client.get(reverse("get_rankings"), {"metric": "predicted_growth", "k": 3})
+        self.assertIn("LIMIT 3", ctx.captured_queries[-1]["sql"])
+
+    def test_rejects_unindexed_metric(self):
+        response = self.client.get(reverse("get_rankings"), {"metric": "population"})
+        self.assertEqual(response.status_code, 400)
+
+
+class StreamingTests(GrowthTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(5):
+            make_city(f"City {i}", growth_score=float(i))
+
+    def test_streamed_predictions_match_buffered(self):
+        buffered = self.client.get(reverse("get_predictions"), {"min_score": 0}).json()
+        response = self.client.get(reverse("get_predictions"), {"min_score": 0, "stream": "1"})
+        self.assertTrue(response.streaming)
+        self.assertEqual(json.loads(b"".join(response.streaming_content)), buffered)
+
+    def test_chunks_are_joined_into_one_array(self):
+        chunks = list(stream_json_array(City.objects.order_by("id"), CitySerializer,
+                                        chunk_size=2, fields={"name": None}))
+        self.assertEqual(len(chunks), 5)
+        self.assertEqual(json.loads(b"".join(chunks)), [{"name": f"City {i}"} for i in range(5)])
+
+    def test_empty_queryset(self):
+        chunks = stream_json_array(City.objects.none(), CitySerializer)
+        self.assertEqual(b"".join(chunks), b"[]")
+
+    def test_streamed_cities(self):
+        response = self.client.get(reverse("get_cities"), {"stream": "true", "fields": "name"})
+        self.assertEqual(len(json.loads(b"".join(response.streaming_content))), 5)
+
+
+class CompressionTests(GrowthTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(20):
+            make_city(f"City {i}", growth_score=float(i))
+        self.plain = self.client.get(reverse("get_predictions")).content
+
+    def test_snapshot_served_gzipped(self):
+        response = self.client.get(reverse("get_predictions"), HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(gzip.decompress(response.content), self.plain)
+
+    @skipIf(brotli is None, "brotli is not installed")
+    def test_snapshot_prefers_brotli(self):
+        response = self.client.get(reverse("get_cities"), HTTP_ACCEPT_ENCODING="gzip, deflate, br")
+        self.assertEqual(response["Content-Encoding"], "br")
+        plain = self.client.get(reverse("get_cities")).content
+        self.assertEqual(brotli.decompress(response.content), plain)
+
+    def test_identity_without_accept_encoding(self):
+        response = self.client.get(reverse("get_predictions"))
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_dynamic_response_is_gzipped(self):
+        response = self.client.get(
+            reverse("get_predictions"), {"min_score": 0}, HTTP_ACCEPT_ENCODING="gzip"
+        )
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))), 20)
+
+    def test_gzipped_dynamic_response_keeps_strong_etag(self):
+        params = {"min_score": 0}
+        first = self.client.get(reverse("get_predictions"), params, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(first["Content-Encoding"], "gzip")
+        self.assertTrue(first["ETag"].startswith('"'))
+        second = self.client.get(reverse("get_predictions"), params, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(second.content, first.content)
+
+        response = self.client.get(reverse("get_predictions"), params, HTTP_ACCEPT_ENCODING="gzip",
+                                   HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, 304)
+        identity = self.client.get(reverse("get_predictions"), params)
+        self.assertNotEqual(identity["ETag"], first["ETag"])
+
+    def test_gzipped_stream_keeps_strong_etag(self):
+        response = self.client.get(reverse("get_cities"), {"stream": "1"}, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertTrue(response["ETag"].startswith('"'))
+        self.assertEqual(len(json.loads(gzip.decompress(b"".join(response.streaming_content)))), 20)
+
+    def test_negotiation_honours_q_values(self):
+        self.assertEqual(negotiate_encoding("gzip;q=1.0, br;q=0"), "gzip")
+        self.assertEqual(negotiate_encoding("br;q=0.5, gzip;q=0.8"), "gzip")
+        self.assertEqual(negotiate_encoding("*"), snapshots.ENCODINGS[0])
+        self.assertEqual(negotiate_encoding("identity"), "identity")
+        self.assertEqual(negotiate_encoding(""), "identity")
+
+
+def feature_matrix(rows, seed=0, low=0, high=100):
+    """
+    Random feature rows in FEATURE_NAMES order, and the generator that
+    drew them for any further draws.
+    """
+    rng = np.random.default_rng(seed)
+    return rng.uniform(low, high, size=(rows, len(FEATURE_NAMES))), rng
+
+
+@override_settings(CACHES=TEST_CACHES)
+class PredictEndpointTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.X, _ = feature_matrix(200)
+        y = cls.X[:, 2] * 0.05 - cls.X[:, 6] * 0.01 + 5
+        cls.model = RandomForestRegressor(n_estimators=10, random_state=0).fit(cls.X, y)
+
+        cls.model_dir = tempfile.TemporaryDirectory()
+        with override_settings(MODEL_REGISTRY_DIR=cls.model_dir.name):
+            registry.register(cls.model, metrics={"train_r2": 1.0})
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.model_dir.cleanup()
+        super().tearDownClass()
+
+    def rows(self, count):
+        return [dict(zip(FEATURE_NAMES, row)) for row in self.X[:count].tolist()]
+
+    def post(self, payload):
+        with self.settings(MODEL_REGISTRY_DIR=self.model_dir.name):
+            return self.client.post(reverse("predict"), payload, content_type="application/json")
+
+    def test_batch_matches_model(self):
+        response = self.post(self.rows(50))
+        self.assertEqual(response.json()["predictions"], self.model.predict(self.X[:50]).tolist())
+        self.assertEqual(response.json()["model_version"], "0001")
+
+    def test_single_object(self):
+        response = self.post(self.rows(1)[0])
+        self.assertEqual(len(response.json()["predictions"]), 1)
+
+    def test_batch_is_one_predict_call(self):
+        with mock.patch.object(type(self.model), "predict", autospec=True,
+                               side_effect=lambda m, X: X[:, 0]) as predict, \
+                mock.patch.object(inference, "FLAT_FOREST_MAX_ROWS", 0):
+            response = self.post(self.rows(25))
+        self.assertEqual(predict.call_count, 1)
+        self.assertEqual(len(response.json()["predictions"]), 25)
+
+    def test_small_batch_uses_flat_forest(self):
+        with mock.patch.object(FlatForest, "predict", autospec=True,
+                               side_effect=lambda f, X: X[:, 0]) as predict:
+            self.post(self.rows(5))
+        self.assertEqual(predict.call_count, 1)
+
+    def test_missing_feature(self):
+        row = self.rows(1)[0]
+        del row["aqi"]
+        response = self.post([row])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("aqi", response.json()["rows"])
+
+    def test_no_model_available(self):
+        with self.settings(MODEL_REGISTRY_DIR=Path(self.model_dir.name) / "empty"):
+            response = self.client.post(reverse("predict"), self.rows(1), content_type="application/json")
+        self.assertEqual(response.status_code, 503)
+
+
+class BulkWriteTests(TestCase):
+    def test_bulk_save_creates_and_updates_cities(self):
+        pune = make_city("Pune")
+        pune.population = 7_000_000
+        nagpur = City(name="Nagpur", state="MH", country="India", population=2, latitude=21.1, longitude=79.0)
+        version = get_dataset_version().version
+
+        # savepoint, INSERT ... RETURNING, UPDATE, version bump, release
+        with self.assertNumQueries(5):
+            bulk_save(City, [pune, nagpur], ["population"])
+
+        self.assertIsNotNone(nagpur.pk)
+        self.assertEqual(City.objects.get(pk=pune.pk).population, 7_000_000)
+        self.assertGreater(get_dataset_version().version, version)
+
+    def test_upsert_inserts_new_and_updates_existing_predictions(self):
+        pune = make_city("Pune", growth_score=7.0, aqi=90)
+        nagpur = City.objects.create(name="Nagpur", state="MH", country="India", population=2,
+                                     latitude=21.1, longitude=79.0)
+        rows = [
+            CityGrowthPrediction(city=pune, growth_score=1.0, predicted_growth=1.0, aqi=120),
+            CityGrowthPrediction(city=nagpur, growth_score=5.0, predicted_growth=0.0, aqi=60),
+        ]
+        bulk_upsert(CityGrowthPrediction, rows, unique_fields=["city"], update_fields=["aqi"])
+
+        pune_prediction = CityGrowthPrediction.objects.get(city=pune)
+        self.assertEqual((pune_prediction.aqi, pune_prediction.growth_score), (120, 7.0))
+        self.assertEqual(CityGrowthPrediction.objects.get(city=nagpur).aqi, 60)
+
+    def test_upsert_without_update_fields_keeps_existing_rows(self):
+        pune = make_city("Pune")
+        add_infrastructure(pune, nodes=10)
+        bulk_upsert(InfrastructureFeature, [
+            InfrastructureFeature(city=pune, nodes=1000, edges=2000, avg_degree=2.5,
+                                  intersections=500, infrastructure_index=0.5),
+        ], unique_fields=["city"])
+        self.assertEqual(InfrastructureFeature.objects.get(city=pune).nodes, 10)
+
+    def test_bulk_update_is_chunked_in_one_transaction(self):
+        cities = [make_city(f"City {i}") for i in range(5)]
+        predictions = list(CityGrowthPrediction.objects.all())
+        for prediction in predictions:
+            prediction.aqi = 42
+        # savepoint, 3 chunked UPDATEs, version bump, release
+        with self.assertNumQueries(6):
+            self.assertEqual(bulk_update(CityGrowthPrediction, predictions, ["aqi"], batch_size=2), 5)
+        self.assertEqual(CityGrowthPrediction.objects.filter(aqi=42).count(), len(cities))
+
+
+class TrainingFeatureTests(TestCase):
+    def setUp(self):
+        self.pune = make_city("Pune", gdp_current=80.0, traffic_index=9.0, crime_rate=200.0, aqi=180)
+        add_infrastructure(self.pune, nodes=400)
+        self.jaipur = make_city("Jaipur", gdp_current=20.0, traffic_index=4.0, crime_rate=900.0, aqi=60)
+        add_infrastructure(self.jaipur, nodes=100)
+        make_city("Nagpur")  # no infrastructure row: excluded
+
+    def test_frame_joins_infrastructure_and_metrics(self):
+        frame = load_training_frame()
+        self.assertEqual(frame["city_id"].tolist(), [self.pune.id, self.jaipur.id])
+        self.assertEqual(training_matrix(frame)[:, :2].tolist(), [[400, 800], [100, 200]])
+        self.assertEqual(training_matrix(frame).shape, (2, len(FEATURE_NAMES)))
+
+    def test_target_matches_scalar_formula(self):
+        class NoChaos:
+            def uniform(self, low, high, size):
+                return np.zeros(size)
+
+        frame = load_training_frame()
+        # Pune: 3 + (0.5*2*4 + 1.6*2) - (0.9*2.5 + 0.25*1.5 + 0.6) = 6.975
+        # Jaipur: 3 + (4 + 0.4*2) - (0.4*2.5 + 1.0*1.5 + 0.2) = 5.1
+        np.testing.assert_allclose(growth_target(frame, NoChaos()), [6.975, 5.1])
+
+    def test_factors(self):
+        positive, negative = growth_factors(load_training_frame(), np.array([5.0, 2.0]))
+        self.assertEqual(positive, [[], ["Efficient Commute (Low Traffic)"]])
+        self.assertEqual(negative, [
+            ["Severe Traffic Bottlenecks", "Environmental Stress"],
+            ["Safety Concerns", "Stagnation Risk"],
+        ])
+
+
+class CrossValidatedTrainingTests(TestCase):
+    def test_out_of_fold_predictions_and_metrics(self):
+        X, rng = feature_matrix(60)
+        y = X[:, 2] * 0.05 + rng.normal(scale=0.5, size=60)
+        grid = {"n_estimators": [5, 10], "max_depth": [None, 3]}
+
+        model, oof, metrics = train_growth_model(X, y, param_grid=grid, folds=3, cpus=1)
+
+        self.assertEqual(oof.shape, (60,))
+        # In-sample predictions memorize the target; out-of-fold ones can't.
+        self.assertLess(np.abs(model.predict(X) - y).mean(), np.abs(oof - y).mean())
+        self.assertIn(metrics["params"], [entry["params"] for entry in metrics["search"]])
+        self.assertEqual(len(metrics["search"]), 4)
+        self.assertEqual((metrics["n_rows"], metrics["cv_folds"]), (60, 3))
+        self.assertIsNone(model.n_jobs)
+        json.dumps(metrics)
+
+    def test_needs_two_rows(self):
+        with self.assertRaises(ValueError):
+            train_growth_model([[0.0] * len(FEATURE_NAMES)], [1.0])
+
+    def test_cpu_budget(self):
+        cores = cpu_budget()
+        self.assertGreaterEqual(cores, 1)
+        self.assertEqual(cpu_budget(1), 1)
+        self.assertEqual(cpu_budget(cores + 100), cores)
+        self.assertEqual(cpu_budget(-1), cores)
+        self.assertEqual(cpu_budget(-cores - 5), 1)
+
+
+class IncrementalTrainingTests(TestCase):
+    def setUp(self):
+        self.X, _ = feature_matrix(40)
+        self.fingerprints = row_fingerprints(self.X)
+        self.metadata = {
+            "feature_names": FEATURE_NAMES,
+            "data_fingerprint": registry.data_fingerprint(self.X),
+            "metrics": {"n_rows": 40, **feature_stats(self.X)},
+        }
+
+    def plan(self, X):
+        return plan_update(X, row_fingerprints(X), self.fingerprints, self.metadata)
+
+    def test_unchanged_matrix_is_a_noop(self):
+        self.assertEqual(self.plan(self.X.copy()).action, "noop")
+
+    def test_fingerprints_are_per_row(self):
+        X = self.X.copy()
+        X[3, 0] += 1
+        fingerprints = row_fingerprints(X)
+        self.assertEqual(len(fingerprints[0]), 32)
+        self.assertEqual([i for i in range(40) if fingerprints[i] != self.fingerprints[i]], [3])
+
+    def test_few_changed_rows_are_rescored(self):
+        X = self.X.copy()
+        X[[3, 7], 0] += 1
+        plan = self.plan(X)
+        self.assertEqual(plan.action, "rescore")
+        self.assertEqual(plan.changed.tolist(), [3, 7])
+
+    def test_many_changed_rows_retrain(self):
+        X = self.X.copy()
+        X[:20, 0] += 1
+        self.assertEqual(self.plan(X).action, "retrain")
+
+    def test_row_count_change_retrains(self):
+        X = np.vstack([self.X, self.X[:5]])
+        plan = plan_update(X, row_fingerprints(X), self.fingerprints + [""] * 5, self.metadata)
+        self.assertEqual(plan.action, "retrain")
+        self.assertEqual(len(plan.changed), 45)
+
+    def test_drift_retrains(self):
+        X = self.X.copy()
+        X[0, 1] += 1000  # one row, but it moves the mean by > 0.5 std
+        self.assertEqual(self.plan(X).action, "retrain")
+
+    def test_no_active_model_retrains(self):
+        with tempfile.TemporaryDirectory() as directory, self.settings(MODEL_REGISTRY_DIR=directory):
+            plan = plan_update(self.X, self.fingerprints, self.fingerprints)
+        self.assertEqual((plan.action, len(plan.changed)), ("retrain", 40))
+
+
+class FlatForestTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        X, rng = feature_matrix(300, seed=1, high=1000)
+        y = X[:, 0] * 0.01 + rng.normal(size=300)
+        cls.model = RandomForestRegressor(n_estimators=20, random_state=0).fit(X, y)
+        # Include values outside the training range and exact thresholds.
+        cls.queries = np.vstack([
+            rng.uniform(-100, 1100, size=(500, len(FEATURE_NAMES))),
+            np.full((1, len(FEATURE_NAMES)), cls.model.estimators_[0].tree_.threshold[0]),
+        ])
+
+    def test_predictions_match_sklearn_exactly(self):
+        forest = FlatForest.from_sklearn(self.model)
+        np.testing.assert_array_equal(forest.predict(self.queries), self.model.predict(self.queries))
+        np.testing.assert_array_equal(forest.predict(self.queries[0]), self.model.predict(self.queries[:1]))
+
+    def test_leaves_match_sklearn(self):
+        forest = FlatForest.from_sklearn(self.model)
+        leaves = forest.apply(self.queries) - forest.roots
+        np.testing.assert_array_equal(leaves, self.model.apply(self.queries))
+
+    def test_save_and_memory_mapped_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            FlatForest.from_sklearn(self.model).save(directory)
+            forest = FlatForest.load(directory)
+            self.assertIsInstance(forest.threshold, np.memmap)
+            np.testing.assert_array_equal(forest.predict(self.queries), self.model.predict(self.queries))
+
+    def test_rejects_wrong_width_and_non_forests(self):
+        forest = FlatForest.from_sklearn(self.model)
+        with self.assertRaises(ValueError):
+            forest.predict([[1.0, 2.0]])
+        with self.assertRaises(ValueError):
+            FlatForest.from_sklearn({"weights": [1, 2]})
+
+
+class ModelRegistryTests(TestCase):
+    def setUp(self):
+        self.registry_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.registry_dir.cleanup)
+        overrides = self.settings(MODEL_REGISTRY_DIR=self.registry_dir.name)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_register_records_schema_metrics_and_fingerprint(self):
+        X = np.arange(14, dtype=float).reshape(2, 7)
+        version = registry.register({"weights": np.ones(3)}, metrics={"r2": 0.9},
+                                    fingerprint=registry.data_fingerprint(X))
+        meta = registry.get_metadata(version)
+        self.assertEqual(meta["feature_names"], FEATURE_NAMES)
+        self.assertEqual(meta["metrics"], {"r2": 0.9})
+        self.assertEqual(meta["data_fingerprint"], registry.data_fingerprint(X.copy()))
+        self.assertEqual(registry.active_version(), version)
+
+    def test_load_memory_maps_arrays(self):
+        registry.register({"weights": np.arange(1000, dtype=float)})
+        model, meta = registry.load()
+        self.assertIsInstance(model["weights"], np.memmap)
+        self.assertEqual(meta["version"], "0001")
+
+    def test_promote_and_rollback(self):
+        first = registry.register({"v": 1})
+        second = registry.register({"v": 2})
+        self.assertEqual(registry.active_version(), second)
+
+        self.assertEqual(registry.rollback(), first)
+        self.assertEqual(registry.load()[0], {"v": 1})
+
+        registry.promote(second)
+        self.assertEqual(registry.active_version(), second)
+        with self.assertRaises(registry.RegistryError):
+            registry.promote("9999")
+
+    def test_rollback_without_history(self):
+        registry.register({"v": 1})
+        with self.assertRaises(registry.RegistryError):
+            registry.rollback()
+
+
+def write_osm_cache(directory):
+    """
+    A tiny osmnx cache: one Nominatim response and one Overpass response.
+
+        2 - 5 - 1 - 3        1 -> 4 -> 9 one-way, 9 outside the polygon
+                |  \         7 - 8 disconnected
+               10   4 - 9
+    """
+    coordinates = {1: (0, 0), 2: (-1, 0), 3: (1, 0), 4: (0, -1.5), 5: (-0.5, 0),
+                   7: (5, 5), 8: (5, 6), 9: (0, -3), 10: (0, 1)}
+    ways = [([2, 5, 1, 3], {}), ([1, 4, 9], {"oneway": "yes"}), ([1, 10], {}), ([7, 8], {})]
+    overpass = {"elements": [
+        *({"type": "node", "id": i, "lon": x, "lat": y} for i, (x, y) in coordinates.items()),
+        *({"type": "way", "id": 100 + i, "nodes": nodes, "tags": {"highway": "residential", **tags}}
+          for i, (nodes, tags) in enumerate(ways)),
+    ]}
+    square = [[-2, -2], [2, -2], [2, 2], [-2, 2], [-2, -2]]
+    nominatim = [
+        {"name": "Testville", "display_name": "Testville, India", "geojson": {"type": "Point", "coordinates": [0, 0]}},
+        {"name": "Testville District", "display_name": "Testville District, India",
+         "boundingbox": ["-2", "2", "-2", "2"], "geojson": {"type": "Polygon", "coordinates": [square]}},
+    ]
+    Path(directory, "a.json").write_text(json.dumps(overpass))
+    Path(directory, "b.json").write_text(json.dumps(nominatim))
+
+
+class OSMNetworkTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        write_osm_cache(directory.name)
+        self.cache = OSMCache(directory.name)
+
+    def test_place_uses_first_polygon_result(self):
+        place = self.cache.place("Testville")
+        self.assertEqual(place.name, "Testville District")
+        self.assertEqual(place.bbox, (-2, -2, 2, 2))
+        self.assertIsNone(self.cache.place("Nowhere"))
+
+    def test_parses_ways_with_oneway_handling(self):
+        graph = self.cache.network(self.cache.place("Testville"))
+        self.assertEqual(graph.n_nodes, 9)
+        # 3 two-way ways with 3 + 1 + 1 segments, one one-way way with 2
+        self.assertEqual(graph.n_arcs, 2 * 5 + 2)
+
+    def test_metrics_simplify_and_truncate(self):
+        place = self.cache.place("Testville")
+        graph = self.cache.network(place)
+        # 5 and 4 are interstitial; 7-8 is not the largest component.
+        metrics = network_metrics(graph)
+        self.assertEqual({key: metrics[key] for key in ("nodes", "edges", "avg_degree", "intersections")},
+                         {"nodes": 5, "edges": 4, "avg_degree": 1.6, "intersections": 1})
+        self.assertEqual(metrics["infrastructure_index"], 0.4 * (4 / 5) + 0.4 * 1.6 + 0.2 * (1 / 5))
+        # Every path between 2, 3, 10 and 9 runs through 1: 9 of 12 pairs.
+        self.assertEqual(metrics["max_betweenness"], 0.75)
+        self.assertAlmostEqual(metrics["avg_betweenness"], 0.15)
+        # Straight streets; 7-8 holds 2 of the 11 degrees of arc length.
+        self.assertAlmostEqual(metrics["circuity"], 1.0, places=6)
+        self.assertAlmostEqual(metrics["giant_component_ratio"], 9 / 11, places=6)
+
+        # Truncating to the square drops 9 and with it the 1 -> 9 edge.
+        metrics = network_metrics(graph, place)
+        self.assertEqual((metrics["nodes"], metrics["edges"], metrics["intersections"]), (4, 3, 1))
+        self.assertEqual(metrics["avg_degree"], 1.5)
+        self.assertEqual(metrics["giant_component_ratio"], 1.0)
+        degree_km = great_circle(0, 0, 0, 1) / 1000
+        self.assertAlmostEqual(metrics["street_density"], 3 * degree_km / place.area_km2, places=6)
+        self.assertAlmostEqual(place.area_km2, (4 * degree_km) ** 2, delta=0.01 * place.area_km2)
+
+    def test_simplify_sums_chain_lengths(self):
+        graph = self.cache.network(self.cache.place("Testville"))
+        simplified = simplify(graph.largest_component())
+        two, one = (np.flatnonzero(simplified.osm_ids == i)[0] for i in (2, 1))
+        arc = np.flatnonzero((simplified.src == two) & (simplified.dst == one))
+        self.assertEqual(len(arc), 1)
+        expected = great_circle(0, -1, 0, -0.5) + great_circle(0, -0.5, 0, 0)
+        self.assertAlmostEqual(float(simplified.lengths[arc[0]]), expected, delta=0.01)
+
+    def test_graph_cache_is_memory_mapped(self):
+        with tempfile.TemporaryDirectory() as graphs:
+            cache = OSMCache(self.cache.directory, graph_dir=graphs)
+            place = cache.place("Testville")
+            built = cache.network(place)
+            self.assertEqual(len(list(Path(graphs).glob("*.npz"))), 1)
+            loaded = cache.network(place)
+            self.assertIsInstance(loaded.indices, np.memmap)
+            for name in road_graph.ARRAYS:
+                np.testing.assert_array_equal(getattr(loaded, name), getattr(built, name))
+            self.assertEqual(network_metrics(loaded, place), network_metrics(built, place))
+
+
+class CentralityTests(TestCase):
+    def setUp(self):
+        # Two-way path 0 - 1 - 2 - 3 - 4
+        self.path = RoadGraph.from_arcs([0, 1, 2, 3, 1, 2, 3, 4], [1, 2, 3, 4, 0, 1, 2, 3],
+                                        lon=range(5), lat=[0] * 5)
+
+    def test_exact_when_every_source_is_used(self):
+        scores, used, bound = centrality.sampled_betweenness(self.path)
+        self.assertEqual((used, bound), (5, 0.0))
+        np.testing.assert_allclose(scores, [0, 0.5, 8 / 12, 0.5, 0])
+
+    def test_batches_match_single_pass(self):
+        with mock.patch.object(centrality, "BATCH_STATES", 5):
+            scores, _, _ = centrality.sampled_betweenness(self.path, workers=2)
+        np.testing.assert_allclose(scores, [0, 0.5, 8 / 12, 0.5, 0])
+
+    def test_time_budget_stops_sampling(self):
+        with mock.patch.object(centrality, "BATCH_STATES", 10):
+            scores, used, bound = centrality.sampled_betweenness(self.path, time_budget=0)
+        self.assertEqual(used, 2)
+        self.assertGreater(bound, 0)
+        self.assertEqual(scores.shape, (5,))
+
+    def test_sample_size_bound(self):
+        n = 100_000
+        k = centrality.sample_size(n, epsilon=0.05, delta=0.1)
+        self.assertLess(k, n)
+        self.assertLessEqual(centrality.error_bound(n, k, delta=0.1), 0.05)
+        self.assertGreater(centrality.error_bound(n, k - 1, delta=0.1), 0.05)
+        self.assertEqual(centrality.sample_size(50, epsilon=0.05), 50)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ExtractInfraCommandTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache_dir = Path(directory.name, "cache")
+        self.cache_dir.mkdir()
+        write_osm_cache(self.cache_dir)
+        self.checkpoint = Path(directory.name, "checkpoint.json")
+        self.testville = City.objects.create(name="Testville", country="India", latitude=0, longitude=0)
+        self.nowhere = City.objects.create(name="Nowhere", country="India", latitude=0, longitude=0)
+
+    def run_command(self, **options):
+        options = {"offline": True, "cache_dir": str(self.cache_dir),
+                   "checkpoint": str(self.checkpoint), "jobs": 1, **options}
+        call_command("extractinfra", stdout=io.StringIO(), stderr=io.StringIO(), **options)
+        return extract.Checkpoint.load(self.checkpoint).finished
+
+    def test_saves_features_and_checkpoints(self):
+        finished = self.run_command()
+        self.assertEqual(finished, {self.testville.id: "saved", self.nowhere.id: "skipped"})
+        feature = InfrastructureFeature.objects.get(city=self.testville)
+        self.assertEqual((feature.nodes, feature.edges, feature.intersections), (4, 3, 1))
+        self.assertFalse(InfrastructureFeature.objects.filter(city=self.nowhere).exists())
+
+    def test_resume_skips_finished_cities(self):
+        self.run_command()
+        InfrastructureFeature.objects.filter(city=self.testville).update(nodes=0)
+        self.run_command(resume=True)
+        self.assertEqual(InfrastructureFeature.objects.get(city=self.testville).nodes, 0)
+        self.run_command()
+        self.assertEqual(InfrastructureFeature.objects.get(city=self.testville).nodes, 4)
+
+    def test_failed_city_does_not_abort_and_is_retried(self):
+        real = extract.cached_features
+
+        def flaky(name, osm_cache, **options):
+            if name == "Testville":
+                raise RuntimeError("Overpass timeout")
+            return real(name, osm_cache, **options)
+
+        with mock.patch.object(extract, "cached_features", flaky):
+            finished = self.run_command()
+        self.assertEqual(finished, {self.testville.id: "failed", self.nowhere.id: "skipped"})
+
+        finished = self.run_command(resume=True)
+        self.assertEqual(finished[self.testville.id], "saved")
+
+    def test_process_pool(self):
+        self.run_command(jobs=2, batch_size=1)
+        self.assertEqual(InfrastructureFeature.objects.get(city=self.testville).nodes, 4)
+
+    def test_online_downloads_join_the_store(self):
+        store_dir = self.cache_dir.parent / "store"
+        osm_store.CacheStore(store_dir).put("old", json.dumps({"elements": []}).encode())
+        fake_osmnx = types.SimpleNamespace(settings=types.SimpleNamespace(cache_folder="cache"))
+
+        def download(ox, name, country, **options):
+            if name != "Testville":
+                return None
+            write_osm_cache(ox.settings.cache_folder)
+            return extract.cached_features(name, OSMCache(ox.settings.cache_folder), **options)
+
+        with mock.patch.dict(sys.modules, {"osmnx": fake_osmnx}), \
+                mock.patch.object(extract, "_download_features", download), \
+                override_settings(OSM_CACHE_MAX_BYTES=1):
+            self.run_command(offline=False, cache_dir=str(store_dir))
+        self.assertEqual(InfrastructureFeature.objects.get(city=self.testville).nodes, 4)
+        entries = osm_store.CacheStore(store_dir).entries
+        # The cap evicts older responses, never the city just downloaded.
+        self.assertEqual({key: entry["city"] for key, entry in entries.items()},
+                         {"a": "Testville", "b": "Testville"})
+        self.assertEqual(list(store_dir.glob("?.json")) + list(store_dir.glob(".download-*")), [])
+        self.assertEqual(fake_osmnx.settings.cache_folder, "cache")
+
+    def online_run(self, store_dir, fail_after=None):
+        """
+        Runs extractinfra online against a fake osmnx that, like osmnx,
+        reads responses from its cache folder and only "downloads" (and
+        caches) the missing ones. Returns the keys it downloaded.
+        """
+        source = self.cache_dir.parent / "upstream"
+        source.mkdir(exist_ok=True)
+        write_osm_cache(source)
+        fake_osmnx = types.SimpleNamespace(settings=types.SimpleNamespace(cache_folder="cache"))
+        downloaded = []
+
+        def download(ox, name, country, **options):
+            if name != "Testville":
+                return None
+            for key in ("b", "a"):
+                cached = Path(ox.settings.cache_folder, f"{key}.json")
+                if not cached.exists():
+                    if fail_after is not None and len(downloaded) == fail_after:
+                        raise TimeoutError("Overpass timeout")
+                    downloaded.append(key)
+                    cached.write_bytes((source / f"{key}.json").read_bytes())
+            return extract.cached_features(name, OSMCache(ox.settings.cache_folder), **options)
+
+        with mock.patch.dict(sys.modules, {"osmnx": fake_osmnx}), \
+                mock.patch.object(extract, "_download_features", download):
+            self.run_command(offline=False, cache_dir=str(store_dir))
+        return downloaded
+
+    def test_online_rerun_downloads_nothing(self):
+        store_dir = self.cache_dir.parent / "store"
+        self.assertEqual(self.online_run(store_dir), ["b", "a"])
+        files = {key: entry["file"] for key, entry in osm_store.CacheStore(store_dir).entries.items()}
+        self.assertEqual(self.online_run(store_dir), [])
+        self.assertEqual({key: entry["file"] for key, entry in osm_store.CacheStore(store_dir).entries.items()},
+                         files)
+        self.assertEqual(InfrastructureFeature.objects.get(city=self.testville).nodes, 4)
+
+    def test_online_failure_keeps_partial_downloads(self):
+        store_dir = self.cache_dir.parent / "store"
+        self.assertEqual(self.online_run(store_dir, fail_after=1), ["b"])
+        self.assertEqual(sorted(osm_store.CacheStore(store_dir).entries), ["b"])
+        self.assertEqual(self.online_run(store_dir), ["a"])
+        self.assertEqual(InfrastructureFeature.objects.get(city=self.testville).nodes, 4)
+
+    def test_plain_osmnx_files_are_reused_online(self):
+        self.assertEqual(self.online_run(self.cache_dir), [])
+
+    def test_online_geocodes_with_the_city_country(self):
+        geocode = mock.Mock(side_effect=LookupError("no such place"))
+        fake_osmnx = types.SimpleNamespace(settings=types.SimpleNamespace(cache_folder="cache"),
+                                           geocode_to_gdf=geocode)
+        extract.init_worker(str(self.cache_dir))
+        with mock.patch.dict(sys.modules, {"osmnx": fake_osmnx}):
+            city_id, features, error = extract.extract_city(7, "Austin", "USA")
+        geocode.assert_called_once_with("Austin, USA")
+        self.assertEqual((city_id, features, error), (7, None, "LookupError: no such place"))
+
+    def test_explicit_zero_options_are_not_replaced_by_settings(self):
+        with mock.patch.object(extract, "init_worker", wraps=extract.init_worker) as init_worker:
+            self.run_command(time_budget=0)
+        self.assertEqual(init_worker.call_args.args[2]["time_budget"], 0)
+
+    def test_rejects_out_of_range_options(self):
+        for options in ({"epsilon": 0}, {"epsilon": 1.5}, {"delta": 0}, {"time_budget": -1}, {"threads": 0}):
+            with self.subTest(**options), self.assertRaises(CommandError):
+                self.run_command(**options)
+
+
+class CacheStoreTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        clock = iter(range(10_000))
+        patcher = mock.patch.object(osm_store, "_now", lambda: f"2026-01-01T00:00:00.{next(clock):06d}+00:00")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def overpass(self, lon):
+        return json.dumps({"elements": [{"type": "node", "id": 1, "lon": lon, "lat": 1.0},
+                                        {"type": "node", "id": 2, "lon": lon + 1, "lat": 2.0}]}).encode()
+
+    def test_put_compresses_and_records_entry(self):
+        store = osm_store.CacheStore(self.directory)
+        payload = self.overpass(10.0)
+        entry = store.put("abc", payload, city="Testville", query="[out:json];")
+        self.assertEqual((entry["kind"], entry["bbox"], entry["raw_size"]), ("overpass", (10.0, 1.0, 11.0, 2.0), len(payload)))
+        self.assertTrue((self.directory / entry["file"]).exists())
+        self.assertEqual(entry["size"], (self.directory / entry["file"]).stat().st_size)
+
+        reopened = osm_store.CacheStore(self.directory)
+        self.assertEqual(reopened.entries["abc"]["city"], "Testville")
+        self.assertEqual(reopened.get("abc"), json.loads(payload))
+
+    def test_gzip_without_zstandard(self):
+        with mock.patch.object(osm_store, "zstandard", None):
+            store = osm_store.CacheStore(self.directory)
+            entry = store.put("abc", self.overpass(10.0))
+            self.assertTrue(entry["file"].endswith(".json.gz"))
+            self.assertEqual(store.get("abc")["elements"][0]["lon"], 10.0)
+
+    def test_put_evicts_least_recently_used(self):
+        store = osm_store.CacheStore(self.directory)
+        for key in ("a", "b", "c"):
+            store.put(key, self.overpass(10.0))
+        store.get("a")
+        store.flush()
+        store.max_bytes = 3 * store.entries["a"]["size"]
+        store.put("d", self.overpass(10.0))
+        self.assertEqual(sorted(store.entries), ["a", "c", "d"])
+        self.assertEqual(sorted(p.name.split(".")[0] for p in self.directory.glob("*.json.*")), ["a", "c", "d"])
+
+    def test_import_writes_manifest_once_and_evicts(self):
+        for i in range(5):
+            (self.directory / f"k{i}.json").write_bytes(self.overpass(10.0))
+        store = osm_store.CacheStore(self.directory)
+        store.put("old", self.overpass(10.0))
+        store.max_bytes = 5 * store.entries["old"]["size"]
+        with mock.patch.object(store, "_write_manifest", wraps=store._write_manifest) as write:
+            imported = store.import_files(sorted(self.directory.glob("k*.json")))
+        self.assertEqual(write.call_count, 1)
+        self.assertEqual(len(imported), 5)
+        self.assertEqual(sorted(store.entries), [f"k{i}" for i in range(5)])
+        self.assertFalse(any(self.directory.glob("old.*")))
+
+    def test_files_are_deleted_after_the_manifest_is_written(self):
+        store = osm_store.CacheStore(self.directory)
+        entry = store.put("a", self.overpass(10.0))
+        with mock.patch.object(store, "_write_manifest", side_effect=OSError("disk full")), \
+                self.assertRaises(OSError):
+            store.prune(max_bytes=0)
+        self.assertTrue((self.directory / entry["file"]).exists())
+        self.assertIn("a", osm_store.CacheStore(self.directory).entries)
+
+    def test_prune_dry_run_is_read_only(self):
+        store = osm_store.CacheStore(self.directory)
+        store.put("a", self.overpass(10.0))
+        with mock.patch.object(store, "_write_manifest") as write, \
+                mock.patch.object(osm_store, "fcntl") as lock:
+            removed = store.prune(max_bytes=0, dry_run=True)
+        self.assertEqual([entry["key"] for entry in removed], ["a"])
+        write.assert_not_called()
+        lock.flock.assert_not_called()
+
+    def test_prune(self):
+        store = osm_store.CacheStore(self.directory)
+        store.put("old", self.overpass(10.0), city="Pune", fetched_at="2020-01-01T00:00:00+00:00")
+        store.put("new", self.overpass(20.0), city="Delhi")
+        cutoff = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        self.assertEqual([e["key"] for e in store.prune(fetched_before=cutoff, dry_run=True)], ["old"])
+        self.assertEqual(sorted(store.entries), ["new", "old"])
+        self.assertEqual([e["key"] for e in store.prune(city="delhi")], ["new"])
+        self.assertEqual([e["key"] for e in store.prune(max_bytes=0)], ["old"])
+        self.assertEqual(store.entries, {})
+
+    def test_import_and_read_through_osm_cache(self):
+        write_osm_cache(self.directory)
+        before = OSMCache(self.directory)
+        place = before.place("Testville")
+        expected = network_metrics(before.network(place), place)
+
+        imported = osm_store.CacheStore(self.directory).import_files(sorted(self.directory.glob("*.json")))
+        self.assertEqual(imported["a"]["kind"], "overpass")
+        self.assertEqual(imported["a"]["city"], "Testville")
+        self.assertEqual(imported["b"]["city"], "Testville")
+        self.assertEqual(list(self.directory.glob("?.json")), [])
+
+        after = OSMCache(self.directory)
+        place = after.place("Testville")
+        self.assertEqual(network_metrics(after.network(place), place), expected)
+        self.assertGreater(osm_store.CacheStore(self.directory).entries["a"]["last_used"],
+                           imported["a"]["last_used"])
+
+    def test_command(self):
+        write_osm_cache(self.directory)
+        out = io.StringIO()
+        call_command("osmcache", "stats", cache_dir=str(self.directory), stdout=out)
+        self.assertIn("2 osmnx files", out.getvalue())
+        call_command("osmcache", "import", cache_dir=str(self.directory), stdout=io.StringIO())
+        out = io.StringIO()
+        call_command("osmcache", "prune", cache_dir=str(self.directory), max_size="0", dry_run=True, stdout=out)
+        self.assertIn("Would free", out.getvalue())
+        self.assertEqual(len(osm_store.CacheStore(self.directory).entries), 2)
+
+
+class RoadGraphTests(TestCase):
+    def setUp(self):
+        # 0 <-> 1 -> 2, 1 <-> 1 loop, 3 isolated
+        self.graph = RoadGraph.from_arcs(
+            src=[1, 0, 1, 1], dst=[0, 1, 2, 1],
+            lon=[0, 0.01, 0.02, 1], lat=[0, 0, 0, 1], osm_ids=[10, 11, 12, 13],
+        )
+
+    def test_csr_layout(self):
+        graph = self.graph
+        self.assertEqual((graph.n_nodes, graph.n_arcs), (4, 4))
+        self.assertEqual(graph.indptr.dtype, np.int32)
+        self.assertEqual(graph.indices.dtype, np.int32)
+        self.assertEqual(graph.lon.dtype, np.float32)
+        self.assertEqual(graph.lengths.dtype, np.float32)
+        self.assertEqual(graph.indptr.tolist(), [0, 1, 4, 4, 4])
+        self.assertEqual(graph.src.tolist(), [0, 1, 1, 1])
+        self.assertEqual(graph.dst.tolist(), [1, 0, 2, 1])
+        self.assertAlmostEqual(float(graph.lengths[0]), great_circle(0, 0, 0, 0.01), delta=0.01)
+        self.assertEqual(float(graph.lengths[3]), 0.0)
+
+    def test_components(self):
+        self.assertEqual(self.graph.component_labels().tolist(), [0, 0, 0, 3])
+        largest = self.graph.largest_component()
+        self.assertEqual(largest.osm_ids.tolist(), [10, 11, 12])
+        self.assertEqual(largest.n_arcs, 4)
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory, "graph.npz")
+            self.graph.save(path)
+            for mmap in (True, False):
+                loaded = RoadGraph.load(path, mmap=mmap)
+                self.assertEqual(isinstance(loaded.lengths, np.memmap), mmap)
+                for name in road_graph.ARRAYS:
+                    np.testing.assert_array_equal(getattr(loaded, name), getattr(self.graph, name))
+                    self.assertEqual(getattr(loaded, name).dtype, getattr(self.graph, name).dtype)
+
+    def test_save_and_load_empty(self):
+        empty = RoadGraph.from_arcs([], [], [], [])
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory, "empty.npz")
+            empty.save(path)
+            self.assertEqual(RoadGraph.load(path).n_nodes, 0)
+
+    @skipIf(road_graph.nx is None, "networkx not installed")
+    def test_networkx_round_trip(self):
+        G = self.graph.to_networkx()
+        self.assertEqual((G.number_of_nodes(), G.number_of_edges()), (4, 4))
+        self.assertEqual(G.nodes[11]["x"], float(np.float32(0.01)))
+        back = RoadGraph.from_networkx(G)
+        for name in road_graph.ARRAYS:
+            np.testing.assert_array_equal(getattr(back, name), getattr(self.graph, name))
+
+        undirected = RoadGraph.from_networkx(G.to_undirected())
+        # to_undirected keeps one loop and one 0-1 edge; 1-2 gains its reverse
+        self.assertEqual(sorted(zip(undirected.src.tolist(), undirected.dst.tolist())),
+                         [(0, 1), (1, 0), (1, 1), (1, 2), (2, 1)])
@@ -1,9 +1,24 @@
 from django.urls import path
-from .views import get_cities, get_infrastructure, get_predictions, get_news
+from .views import (
+    get_cities,
+    get_city_detail,
+    get_nearby_cities,
+    get_infrastructure,
+    get_infrastructure_bulk,
+    get_predictions,
+    get_rankings,
+    get_news,
+    predict,
+)
 
 urlpatterns = [
     path("cities/", get_cities, name="get_cities"),
+    path("cities/nearby/", get_nearby_cities, name="get_nearby_cities"),
+    path("cities/<int:city_id>/", get_city_detail, name="get_city_detail"),
+    path("infrastructure/", get_infrastructure_bulk, name="get_infrastructure_bulk"),
     path("infrastructure/<int:city_id>/", get_infrastructure, name="get_infrastructure"),
     path("predictions/", get_predictions, name="get_predictions"),
+    path("rankings/", get_rankings, name="get_rankings"),
     path("news/", get_news, name="get_news"),
+    path("predict/", predict, name="predict"),
 ]
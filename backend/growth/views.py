@@ -1,5 +1,9 @@
-from rest_framework.decorators import api_view
+import math
+
+from rest_framework.decorators import api_view, renderer_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
 from .models import (
     City,
@@ -13,30 +17,376 @@ from .serializers import (
     CityGrowthPredictionSerializer
 )
 
-from .services.news import fetch_growth_news
-from django.http import JsonResponse
+from .decorators import conditional_on_dataset, dataset_version_for
+from .filters import filter_predictions, ranking_params
+from .pagination import PredictionCursorPagination
+from .projection import only_columns, requested_fields
+from .renderers import COLUMNAR_FORMATS, COLUMNAR_RENDERERS
+from .ml.features import FEATURE_NAMES
+from .ml.inference import predict_growth
+from .services.columnar import CITY_COLUMNS, PREDICTION_COLUMNS, build_columns, select_columns
+from .services.news import fetch_growth_news, fetch_growth_news_batch
+from .services.snapshots import get_snapshot, negotiate_encoding
+from .services.spatial import bbox_filter, get_city_index
+from .services.streaming import stream_json_array
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_vary_headers
+
+# Query parameters that a pre-rendered snapshot can answer on its own.
+SNAPSHOT_PARAMS = {'country'}
+
+# Row-oriented JSON stays the default; the columnar formats are opt-in
+# through the Accept header or ?format=columnar|msgpack|arrow.
+DATASET_RENDERERS = [*api_settings.DEFAULT_RENDERER_CLASSES, *COLUMNAR_RENDERERS]
+
+
+def snapshot_response(name, request):
+    variants = get_snapshot(
+        name,
+        request.GET.get('country') or None,
+        generation=dataset_version_for(request).token,
+    )
+    if variants is None:
+        return None
+    encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING'))
+    response = HttpResponse(variants[encoding], content_type='application/json')
+    if encoding != 'identity':
+        response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+def wants_stream(request):
+    return request.query_params.get('stream', '').lower() in ('1', 'true', 'yes')
+
+
+def streaming_response(queryset, serializer_class, **serializer_kwargs):
+    return StreamingHttpResponse(
+        stream_json_array(queryset, serializer_class, **serializer_kwargs),
+        content_type='application/json',
+    )
+
+
+def columnar_response(queryset, request, available):
+    columns = select_columns(request.query_params, available)
+    return Response(build_columns(queryset, columns, available))
+
+
+def parse_floats(value, count, param):
+    try:
+        numbers = [float(part) for part in value.split(',')]
+    except ValueError:
+        numbers = []
+    if len(numbers) != count or not all(math.isfinite(number) for number in numbers):
+        raise ValidationError({param: f'Expected {count} comma separated numbers.'})
+    return numbers
+
+
+def bbox_param(value):
+    """
+    Parses ?bbox=min_lon,min_lat,max_lon,max_lat. min_lon > max_lon is
+    a box across the antimeridian; the latitudes must be ordered.
+    """
+    min_lon, min_lat, max_lon, max_lat = parse_floats(value, 4, 'bbox')
+    if not (-180 <= min_lon <= 180 and -180 <= max_lon <= 180):
+        raise ValidationError({'bbox': 'Longitudes must be between -180 and 180.'})
+    if not (-90 <= min_lat <= 90 and -90 <= max_lat <= 90):
+        raise ValidationError({'bbox': 'Latitudes must be between -90 and 90.'})
+    if min_lat > max_lat:
+        raise ValidationError({'bbox': 'min_lat must not be greater than max_lat.'})
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def float_param(params, name, low, high):
+    try:
+        value = float(params[name])
+    except KeyError:
+        raise ValidationError({name: 'This parameter is required.'})
+    except ValueError:
+        raise ValidationError({name: 'Expected a number.'})
+    if not low <= value <= high:
+        raise ValidationError({name: f'Must be between {low} and {high}.'})
+    return value
+
 
 # Create your views here.
+@conditional_on_dataset
+@api_view(['GET'])
+@renderer_classes(DATASET_RENDERERS)
 def get_cities(request):
+    """
+    Lists cities, optionally filtered by ?country= and
+    ?bbox=min_lon,min_lat,max_lon,max_lat, and projected with
+    ?fields= / ?exclude=. ?stream=1 writes the JSON array incrementally.
+    """
     cities = City.objects.all()
-    serializer = CitySerializer(cities, many=True)
-    return JsonResponse(serializer.data, safe=False)
+    country = request.query_params.get('country')
+    if country:
+        cities = cities.filter(country=country)
+
+    bbox = request.query_params.get('bbox')
+    if bbox:
+        cities = cities.filter(bbox_filter(*bbox_param(bbox)))
+
+    if request.accepted_renderer.format in COLUMNAR_FORMATS:
+        return columnar_response(cities.order_by('id'), request, CITY_COLUMNS)
+
+    if set(request.query_params) <= SNAPSHOT_PARAMS:
+        response = snapshot_response('cities', request)
+        if response is not None:
+            return response
+
+    fields = requested_fields(request.query_params, CitySerializer)
+    if fields is not None:
+        cities = cities.only(*only_columns(fields))
+    if wants_stream(request):
+        return streaming_response(cities.order_by('id'), CitySerializer, fields=fields)
+    serializer = CitySerializer(cities, many=True, fields=fields)
+    return Response(serializer.data)
+
+
+# Upper bound on ?k= for nearest-city queries and rankings.
+MAX_NEARBY = 100
+MAX_RANKING = 100
+
+
+@conditional_on_dataset
+@api_view(['GET'])
+def get_rankings(request):
+    """
+    Top-k cities by a prediction metric, e.g.
+    ?metric=predicted_growth&country=USA&k=20&order=desc. The metric
+    index is walked in order and the query stops after k rows.
+    """
+    metric, ordering, k = ranking_params(request.query_params, MAX_RANKING)
+
+    predictions = CityGrowthPrediction.objects.select_related('city').only(
+        metric, 'city__id', 'city__name', 'city__state', 'city__country'
+    )
+    country = request.query_params.get('country')
+    if country:
+        predictions = predictions.filter(city__country=country)
+    predictions = predictions.order_by(*ordering)[:k]
+
+    return Response([
+        {
+            'rank': rank,
+            'city': CitySerializer(
+                prediction.city,
+                fields={'id': None, 'name': None, 'state': None, 'country': None},
+            ).data,
+            'metric': metric,
+            'value': getattr(prediction, metric),
+        }
+        for rank, prediction in enumerate(predictions, start=1)
+    ])
+
+
+@conditional_on_dataset
+@api_view(['GET'])
+def get_nearby_cities(request):
+    """
+    The ?k= (default 10) cities closest to ?lat=&lon=, nearest first,
+    each with its great-circle distance in kilometres.
+    """
+    latitude = float_param(request.query_params, 'lat', -90, 90)
+    longitude = float_param(request.query_params, 'lon', -180, 180)
+    try:
+        k = int(request.query_params.get('k', 10))
+    except ValueError:
+        raise ValidationError({'k': 'Expected an integer.'})
+    if not 1 <= k <= MAX_NEARBY:
+        raise ValidationError({'k': f'Must be between 1 and {MAX_NEARBY}.'})
+
+    index = get_city_index(dataset_version_for(request).token)
+    ids, distances = index.nearest(latitude, longitude, k)
+    cities = City.objects.in_bulk(ids.tolist())
+
+    results = []
+    for city_id, distance in zip(ids.tolist(), distances.tolist()):
+        if city_id in cities:
+            results.append({**CitySerializer(cities[city_id]).data, 'distance_km': round(distance, 3)})
+    return Response(results)
+
 
 def get_news(request):
+    """
+    Headlines for ?country= (default India). A comma separated list
+    (?country=India,USA,UK) fetches all feeds concurrently and returns a
+    merged list; countries that missed the deadline are named in the
+    X-News-Pending header.
+    """
     country = request.GET.get('country', 'India')
-    news = fetch_growth_news(country)
-    return JsonResponse(news, safe=False)
+    if ',' not in country:
+        news = fetch_growth_news(country)
+        return JsonResponse(news, safe=False)
+
+    countries = list(dict.fromkeys(c.strip() for c in country.split(',') if c.strip()))
+    if len(countries) > settings.NEWS_BATCH_MAX_COUNTRIES:
+        return JsonResponse(
+            {'country': f'At most {settings.NEWS_BATCH_MAX_COUNTRIES} countries per request.'},
+            status=400,
+        )
+
+    news, pending = fetch_growth_news_batch(countries)
+    response = JsonResponse(news, safe=False)
+    if pending:
+        response['X-News-Pending'] = ','.join(pending)
+    return response
+
+
+# Upper bound on ?ids= so a single bulk lookup stays a bounded IN (...).
+MAX_BULK_IDS = 500
+
 
+def parse_ids(value):
+    try:
+        ids = [int(part) for part in value.split(',') if part.strip()]
+    except ValueError:
+        raise ValidationError({'ids': 'Expected a comma separated list of city ids.'})
+    if not ids:
+        raise ValidationError({'ids': 'At least one city id is required.'})
+    if len(ids) > MAX_BULK_IDS:
+        raise ValidationError({'ids': f'At most {MAX_BULK_IDS} ids per request.'})
+    return ids
 
+
+@conditional_on_dataset
+@api_view(['GET'])
+def get_infrastructure(request, city_id):
+    infra = get_object_or_404(
+        InfrastructureFeature.objects.select_related('city'), city_id=city_id
+    )
+    serializer = InfrastructureSerializer(infra)
+    return Response(serializer.data)
+
+
+@conditional_on_dataset
 @api_view(['GET'])
-def get_infrastructure(request):
-    infra = InfrastructureFeature.objects.all()
+def get_infrastructure_bulk(request):
+    """
+    Resolves ?ids=1,2,3 (city ids) in one joined query. Unknown ids are
+    simply absent from the result.
+    """
+    ids = parse_ids(request.query_params.get('ids', ''))
+    infra = (
+        InfrastructureFeature.objects.select_related('city')
+        .filter(city_id__in=ids)
+        .order_by('city_id')
+    )
     serializer = InfrastructureSerializer(infra, many=True)
     return Response(serializer.data)
 
 
+@conditional_on_dataset
 @api_view(['GET'])
+def get_city_detail(request, city_id):
+    """
+    Returns a city together with its infrastructure and prediction in a
+    single query, for the city detail page.
+    """
+    city = get_object_or_404(
+        City.objects.select_related('infrastructurefeature', 'citygrowthprediction'),
+        pk=city_id,
+    )
+
+    infrastructure = None
+    if hasattr(city, 'infrastructurefeature'):
+        infrastructure = InfrastructureSerializer(
+            city.infrastructurefeature,
+            fields=requested_fields({'exclude': 'city'}, InfrastructureSerializer),
+        ).data
+
+    prediction = None
+    if hasattr(city, 'citygrowthprediction'):
+        prediction = CityGrowthPredictionSerializer(
+            city.citygrowthprediction,
+            fields=requested_fields({'exclude': 'city'}, CityGrowthPredictionSerializer),
+        ).data
+
+    return Response({
+        'city': CitySerializer(city).data,
+        'infrastructure': infrastructure,
+        'prediction': prediction,
+    })
+
+
+@conditional_on_dataset
+@api_view(['GET'])
+@renderer_classes(DATASET_RENDERERS)
 def get_predictions(request):
-    predictions = CityGrowthPrediction.objects.all()
-    serializer = CityGrowthPredictionSerializer(predictions, many=True)
+    """
+    Lists growth predictions, optionally filtered by ?country=,
+    ?min_score=/?max_score= and sorted by ?ordering=.
+
+    Passing ?limit= (or following a ?cursor=) switches to keyset
+    pagination; without it the full filtered list is returned.
+    ?fields= / ?exclude= (dotted for city, e.g. city.latitude) restrict
+    both the selected columns and the emitted keys. ?stream=1 writes the
+    unpaginated list incrementally.
+
+    Columnar formats return one array per (flat) column instead of a
+    list of objects; ?fields= then names those columns.
+    """
+    if request.accepted_renderer.format in COLUMNAR_FORMATS:
+        predictions, _ = filter_predictions(CityGrowthPrediction.objects.all(), request.query_params)
+        return columnar_response(predictions, request, PREDICTION_COLUMNS)
+
+    if set(request.query_params) <= SNAPSHOT_PARAMS:
+        response = snapshot_response('predictions', request)
+        if response is not None:
+            return response
+
+    fields = requested_fields(request.query_params, CityGrowthPredictionSerializer)
+    predictions = CityGrowthPrediction.objects.select_related('city')
+    predictions, ordering = filter_predictions(predictions, request.query_params)
+    if fields is not None:
+        if 'city' not in fields:
+            predictions = predictions.select_related(None)
+        # Sort keys stay loaded so the cursor can be built without a refetch.
+        sort_columns = [name.lstrip('-') for name in ordering]
+        predictions = predictions.only(*only_columns(fields), *sort_columns)
+
+    paginator = PredictionCursorPagination()
+    if 'limit' in request.query_params or paginator.cursor_query_param in request.query_params:
+        paginator.ordering = ordering
+        page = paginator.paginate_queryset(predictions, request)
+        serializer = CityGrowthPredictionSerializer(page, many=True, fields=fields)
+        return paginator.get_paginated_response(serializer.data)
+
+    if wants_stream(request):
+        return streaming_response(predictions, CityGrowthPredictionSerializer, fields=fields)
+
+    serializer = CityGrowthPredictionSerializer(predictions, many=True, fields=fields)
     return Response(serializer.data)
+
+
+# Upper bound on rows per POST /api/predict/ request.
+MAX_PREDICT_ROWS = 10_000
+
+
+@api_view(['POST'])
+def predict(request):
+    """
+    Scores one feature object or a list of them with the trained growth
+    model. Every row needs the keys in FEATURE_NAMES; the whole batch is
+    evaluated with a single vectorized predict() call.
+    """
+    rows = request.data
+    if isinstance(rows, dict):
+        rows = [rows]
+    if not isinstance(rows, list) or not rows:
+        raise ValidationError({
+            'rows': f'Expected an object or a non-empty list of objects with {", ".join(FEATURE_NAMES)}.'
+        })
+    if len(rows) > MAX_PREDICT_ROWS:
+        raise ValidationError({'rows': f'At most {MAX_PREDICT_ROWS} rows per request.'})
+
+    try:
+        predictions, version = predict_growth(rows)
+    except ValueError as exc:
+        raise ValidationError({'rows': str(exc)})
+
+    return Response({'predictions': predictions.tolist(), 'model_version': version})
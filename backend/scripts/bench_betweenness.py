@@ -0,0 +1,84 @@
+"""
+Benchmark: sampled betweenness cost and accuracy against exact Brandes.
+
+Runs sampled_betweenness on a two-way grid or on a cached city network
+for a range of sample sizes and thread counts, and reports wall time,
+the guaranteed error bound and the observed maximum error against the
+exact scores (when the graph is small enough to compute them).
+
+    python scripts/bench_betweenness.py [--grid 60] [--city Pune [--raw]]
+        [--samples 16,64,256,1024] [--threads 1,2,4] [--delta 0.1]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from growth.osm.centrality import error_bound, sample_size, sampled_betweenness
+from growth.osm.graph import RoadGraph
+from growth.osm.network import street_network
+from growth.osm.overpass import OSMCache
+
+
+def grid(side):
+    index = np.arange(side * side).reshape(side, side)
+    right = np.stack([index[:, :-1].ravel(), index[:, 1:].ravel()])
+    down = np.stack([index[:-1, :].ravel(), index[1:, :].ravel()])
+    tail, head = np.concatenate([right, down], axis=1)
+    lon, lat = (index % side) * 1e-3, (index // side) * 1e-3
+    return RoadGraph.from_arcs(np.concatenate([tail, head]), np.concatenate([head, tail]),
+                               lon.ravel(), lat.ravel())
+
+
+def city(name, cache_dir, raw):
+    cache = OSMCache(cache_dir)
+    place = cache.place(name)
+    if place is None:
+        sys.exit(f"No cached place for {name}")
+    graph = cache.network(place)
+    return graph.largest_component() if raw else street_network(graph, place)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--grid", type=int, default=60, help="side of the synthetic grid")
+    parser.add_argument("--city", default=None, help="use this city's cached network instead")
+    parser.add_argument("--cache-dir", default=os.path.join(BASE_DIR, "cache"))
+    parser.add_argument("--raw", action="store_true", help="unsimplified largest component of --city")
+    parser.add_argument("--samples", default="16,64,256,1024")
+    parser.add_argument("--threads", default="1,2,4")
+    parser.add_argument("--delta", type=float, default=0.1)
+    parser.add_argument("--exact-max", type=int, default=5000,
+                        help="compute exact scores for graphs up to this many nodes")
+    args = parser.parse_args()
+
+    graph = city(args.city, args.cache_dir, args.raw) if args.city else grid(args.grid)
+    n = graph.n_nodes
+    print(f"{n} nodes, {graph.n_arcs} arcs, {graph.nbytes / 1e6:.1f} MB")
+    print(f"sources for epsilon 0.05 / 0.01: {sample_size(n, 0.05, args.delta)} / "
+          f"{sample_size(n, 0.01, args.delta)}")
+
+    exact = None
+    if n <= args.exact_max:
+        start = time.perf_counter()
+        exact, _, _ = sampled_betweenness(graph, k=n)
+        print(f"exact: {time.perf_counter() - start:.2f} s")
+
+    print(f"{'k':>6} {'threads':>7} {'seconds':>8} {'bound':>7} {'max err':>8}")
+    for k in (int(value) for value in args.samples.split(",")):
+        k = min(k, n)
+        for threads in (int(value) for value in args.threads.split(",")):
+            start = time.perf_counter()
+            scores, used, _ = sampled_betweenness(graph, k=k, workers=threads, seed=1)
+            elapsed = time.perf_counter() - start
+            error = f"{np.abs(scores - exact).max():.4f}" if exact is not None else "-"
+            print(f"{used:>6} {threads:>7} {elapsed:>8.2f} {error_bound(n, used, args.delta):>7.3f} {error:>8}")
+
+
+if __name__ == "__main__":
+    main()
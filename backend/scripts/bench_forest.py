@@ -0,0 +1,68 @@
+"""
+Micro-benchmark: sklearn RandomForestRegressor.predict vs FlatForest.
+
+Trains a forest shaped like the production growth model on synthetic
+data and reports per-call latency for a range of batch sizes plus the
+memory held by each representation.
+
+    python scripts/bench_forest.py [--trees 100] [--rows 2000] [--repeat 50]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from growth.ml.features import FEATURE_NAMES
+from growth.ml.forest import FlatForest
+
+
+def timed(fn, X, repeat):
+    fn(X)  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(X)
+    return (time.perf_counter() - start) / repeat
+
+
+def sklearn_nbytes(model):
+    return sum(
+        estimator.tree_.__getstate__()["nodes"].nbytes + estimator.tree_.value.nbytes
+        for estimator in model.estimators_
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--trees", type=int, default=100)
+    parser.add_argument("--rows", type=int, default=2000, help="training rows")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    X = rng.uniform(0, 1000, size=(args.rows, len(FEATURE_NAMES)))
+    y = X[:, 2] * 0.05 - X[:, 6] * 0.01 + rng.normal(size=args.rows)
+    model = RandomForestRegressor(n_estimators=args.trees, random_state=42).fit(X, y)
+    forest = FlatForest.from_sklearn(model)
+
+    queries = rng.uniform(0, 1000, size=(10_000, len(FEATURE_NAMES)))
+    assert np.array_equal(forest.predict(queries), model.predict(queries))
+
+    print(f"{args.trees} trees, {forest.n_nodes} nodes")
+    print(f"memory: sklearn {sklearn_nbytes(model) / 1e6:.1f} MB, flat {forest.nbytes / 1e6:.1f} MB")
+    print(f"{'rows':>6} {'sklearn ms':>11} {'flat ms':>9} {'speedup':>8}")
+    for n in (1, 10, 100, 256, 1000, 10_000):
+        repeat = max(1, args.repeat * 10 // max(n, 10))
+        batch = queries[:n]
+        baseline = timed(model.predict, batch, repeat)
+        flat = timed(forest.predict, batch, repeat)
+        print(f"{n:>6} {baseline * 1e3:>11.3f} {flat * 1e3:>9.3f} {baseline / flat:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
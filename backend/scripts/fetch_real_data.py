@@ -12,7 +12,11 @@ sys.path.append(BASE_DIR)
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
 django.setup()
 
+from django.db import transaction
+
 from growth.models import City, CityGrowthPrediction
+from growth.services.bulk import bulk_update
+from growth.services.snapshots import rebuild_snapshots
 
 def get_population_from_wikipedia(city_name):
     known_populations = {
@@ -82,9 +86,10 @@ def get_india_gdp_per_capita():
 def update_real_data():
     print("--- Fetching Real World Data ---")
     
-    cities = City.objects.all()
+    cities = list(City.objects.select_related("citygrowthprediction"))
     gdp_per_capita = get_india_gdp_per_capita()
     urban_productivity_multiplier = 3.5 # Cities are more productive than national avg
+    predictions = []
     
     for city in cities:
         print(f"\nProcessing {city.name}...")
@@ -92,7 +97,6 @@ def update_real_data():
         # 1. Update Population
         population = get_population_from_wikipedia(city.name)
         city.population = population
-        city.save()
         print(f"   Updated Population: {population:,}")
         
         # 2. Calculate Real GDP
@@ -114,12 +118,18 @@ def update_real_data():
             else:
                 pred.gdp_growth_rate = 5.5
                 
-            pred.save()
+            predictions.append(pred)
             print(f"   Updated GDP: ${gdp_billions:.2f}B")
             print(f"   Updated GDP Growth: {pred.gdp_growth_rate}%")
             
         except CityGrowthPrediction.DoesNotExist:
             print("   No prediction object found to update.")
 
+    # Network lookups are done; write everything in one transaction.
+    with transaction.atomic():
+        bulk_update(City, cities, ["population"])
+        bulk_update(CityGrowthPrediction, predictions, ["gdp_current", "gdp_growth_rate"])
+
 if __name__ == "__main__":
     update_real_data()
+    rebuild_snapshots()
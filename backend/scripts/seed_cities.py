@@ -14,7 +14,11 @@ sys.path.append(BASE_DIR)
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
 django.setup()
 
+from django.db import transaction
+
 from growth.models import City, CityGrowthPrediction, InfrastructureFeature
+from growth.services.bulk import bulk_save, bulk_upsert
+from growth.services.snapshots import rebuild_snapshots
 
 CITIES_LIST = [
     {"name": "Mumbai", "state": "Maharashtra", "tier": 1},
@@ -86,6 +90,12 @@ def get_population(city_name):
     except:
         return 1000000
 
+# Seeded prediction columns; growth_score/predicted_growth belong to training.
+METRIC_FIELDS = [
+    "traffic_index", "crime_rate", "aqi", "gdp_current", "gdp_growth_rate",
+    "livability_score", "livability_growth", "negative_factors", "positive_factors",
+]
+
 def seed_data():
     print("--- Seeding 40+ Indian Cities ---")
     
@@ -96,21 +106,30 @@ def seed_data():
     except:
         india_gdp_capita = 2500.0
         
+    # Existing cities by name (first one wins if a name is duplicated)
+    existing = {}
+    for city in City.objects.filter(name__in=[c["name"] for c in CITIES_LIST]).order_by("id"):
+        existing.setdefault(city.name, city)
+
+    cities = []
+    predictions = []
+    infrastructure = []
+
     for city_data in CITIES_LIST:
         name = city_data["name"]
         print(f"Processing {name}...")
         
         # Check if exists
-        city, created = City.objects.get_or_create(
-            name=name,
-            defaults={
-                "state": city_data["state"],
-                "country": "India",
-                "latitude": 0.0,
-                "longitude": 0.0,
-                "population": 0
-            }
-        )
+        city = existing.get(name)
+        if city is None:
+            city = City(
+                name=name,
+                state=city_data["state"],
+                country="India",
+                latitude=0.0,
+                longitude=0.0,
+                population=0,
+            )
         
         # Update details
         if city.latitude == 0.0 or city.population == 0:
@@ -126,18 +145,12 @@ def seed_data():
                 
             variance = random.uniform(0.7, 1.5)
             city.population = int(pop_base * variance)
-            city.save()
-            print(f"   Saved {name}: Pop {city.population:,}, Loc {city.latitude:.2f}, {city.longitude:.2f}")
+            print(f"   Located {name}: Pop {city.population:,}, Loc {city.latitude:.2f}, {city.longitude:.2f}")
             time.sleep(1) # Be nice to Nominatim
+        cities.append(city)
 
-        # Create/Update Prediction & Metrics
-        pred, _ = CityGrowthPrediction.objects.get_or_create(
-            city=city,
-            defaults={
-                "growth_score": 5.0,
-                "predicted_growth": 0.0
-            }
-        )
+        # Create/Update Prediction & Metrics (scores only apply to new rows)
+        pred = CityGrowthPrediction(city=city, growth_score=5.0, predicted_growth=0.0)
         
         # --- Advanced Metrics Logic ---
         
@@ -193,21 +206,27 @@ def seed_data():
         if pred.gdp_growth_rate > 7.0: pred.positive_factors.append("Rapid Economic Growth")
         if city_data["tier"] == 2: pred.positive_factors.append("Emerging Market Opportunities")
         if pred.livability_score > 7.0: pred.positive_factors.append("High Quality of Life")
+        predictions.append(pred)
         
         # Ensure Infra Feature exists for consistency (simplification for seed)
-        InfrastructureFeature.objects.get_or_create(
+        infrastructure.append(InfrastructureFeature(
             city=city, 
-            defaults={
-                "nodes": 1000, 
-                "edges": 2000, 
-                "infrastructure_index": 0.5,
-                "avg_degree": 2.5,
-                "intersections": 500
-            }
-        )
+            nodes=1000, 
+            edges=2000, 
+            infrastructure_index=0.5,
+            avg_degree=2.5,
+            intersections=500,
+        ))
         
-        pred.save()
         print(f"   Metrics: Traffic {pred.traffic_index}, Crime {pred.crime_rate}, GDP ${pred.gdp_current}B")
 
+    # Geocoding is done; write every city in one transaction.
+    with transaction.atomic():
+        bulk_save(City, cities, ["latitude", "longitude", "population"])
+        bulk_upsert(CityGrowthPrediction, predictions, unique_fields=["city"], update_fields=METRIC_FIELDS)
+        # Existing infrastructure rows are kept as is
+        bulk_upsert(InfrastructureFeature, infrastructure, unique_fields=["city"])
+
 if __name__ == "__main__":
     seed_data()
+    rebuild_snapshots()
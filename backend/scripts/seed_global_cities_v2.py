@@ -12,7 +12,11 @@ sys.path.append(BASE_DIR)
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
 django.setup()
 
+from django.db import transaction
+
 from growth.models import City, CityGrowthPrediction
+from growth.services.bulk import bulk_save, bulk_upsert
+from growth.services.snapshots import rebuild_snapshots
 
 # --- GLOBAL CONFIGURATION ---
 # Base GDP Per Capita (USD)
@@ -149,9 +153,21 @@ GLOBAL_CITIES = [
     {"name": "Osaka", "state": "Osaka", "country": "Japan"},
 ]
 
+PREDICTION_FIELDS = [
+    "gdp_current", "gdp_growth_rate", "crime_rate", "traffic_index", "aqi", "growth_score",
+    "predicted_growth", "historic_growth", "positive_factors", "negative_factors",
+]
+
 def seed_global_data():
     geolocator = Nominatim(user_agent="city_growth_global_v2")
 
+    # Existing cities by name (first one wins if a name is duplicated)
+    existing = {}
+    for city in City.objects.filter(name__in=[c["name"] for c in GLOBAL_CITIES]).order_by("id"):
+        existing.setdefault(city.name, city)
+    cities = []
+    predictions = []
+
     for city_data in GLOBAL_CITIES:
         name = city_data["name"]
         country = city_data["country"]
@@ -190,20 +206,20 @@ def seed_global_data():
             population = 1000000 # Fallback
 
         # 3. Create/Update City
-        city_obj, created = City.objects.get_or_create(
-            name=name,
-            defaults={
-                "state": city_data["state"],
-                "country": country,
-                "latitude": lat,
-                "longitude": lon,
-                "population": population
-            }
-        )
-        if not created:
+        city_obj = existing.get(name)
+        if city_obj is None:
+            city_obj = City(
+                name=name,
+                state=city_data["state"],
+                country=country,
+                latitude=lat,
+                longitude=lon,
+                population=population,
+            )
+        else:
             city_obj.country = country
             city_obj.population = population
-            city_obj.save()
+        cities.append(city_obj)
 
         # 4. Generate Advanced Metrics
         # Economic Logic
@@ -254,23 +270,28 @@ def seed_global_data():
         if crime_rate > 60: negative_factors.append("Crime Rate")
 
         # Create/Update Prediction safely
-        pred, created = CityGrowthPrediction.objects.update_or_create(
+        pred = CityGrowthPrediction(
             city=city_obj,
-            defaults={
-                "gdp_current": round(city_gdp_total, 2),
-                "gdp_growth_rate": gdp_growth_rate,
-                "crime_rate": crime_rate,
-                "traffic_index": traffic_index,
-                "aqi": aqi,
-                "growth_score": growth_score,
-                "predicted_growth": predicted_growth,
-                "historic_growth": history,
-                "positive_factors": positive_factors,
-                "negative_factors": negative_factors
-            }
+            gdp_current=round(city_gdp_total, 2),
+            gdp_growth_rate=gdp_growth_rate,
+            crime_rate=crime_rate,
+            traffic_index=traffic_index,
+            aqi=aqi,
+            growth_score=growth_score,
+            predicted_growth=predicted_growth,
+            historic_growth=history,
+            positive_factors=positive_factors,
+            negative_factors=negative_factors,
         )
+        predictions.append(pred)
         
         print(f"   -> GDP: ${pred.gdp_current}B | Growth: {pred.growth_score}/10")
 
+    # Lookups are done; write every city in one transaction.
+    with transaction.atomic():
+        bulk_save(City, cities, ["country", "population"])
+        bulk_upsert(CityGrowthPrediction, predictions, unique_fields=["city"], update_fields=PREDICTION_FIELDS)
+
 if __name__ == "__main__":
     seed_global_data()
+    rebuild_snapshots()
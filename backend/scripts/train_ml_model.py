@@ -1,9 +1,8 @@
+import argparse
 import os
 import sys
 import django
-import random
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(BASE_DIR)
@@ -11,111 +10,94 @@ sys.path.append(BASE_DIR)
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
 django.setup()
 
-from growth.models import City, InfrastructureFeature, CityGrowthPrediction
+from growth.models import CityGrowthPrediction
+from growth.ml import registry
+from growth.ml.features import growth_factors, growth_target, load_training_frame, training_matrix
+from growth.ml.incremental import Plan, plan_update, row_fingerprints, stored_fingerprints
+from growth.ml.training import DEFAULT_FOLDS, train_growth_model
+from growth.services.bulk import bulk_update
+from growth.services.snapshots import rebuild_snapshots
 
-# Reformatted Logic to use CityGrowthPrediction data + Infrastructure
+# Uses CityGrowthPrediction data + Infrastructure.
 # This script assumes seed_cities.py has run and populated basic metrics.
 
-# Fetch all cities
-cities = City.objects.all()
-
-X = []
-y = []
-training_cities = []
-
-for city in cities:
-    # 1. Get Infrastructure Features
-    try:
-        infra = city.infrastructurefeature
-    except:
-        # If missing, skip or create default (should exist from seed)
-        continue
-
-    # 2. Get Existing Prediction Metrics (seeded by seed_cities.py)
-    try:
-        pred_obj = city.citygrowthprediction
-    except:
-        continue
-
-    # 3. Create Feature Vector
-    # We combine physical infrastructure with Quality of Life metrics
-    features = [
-        infra.nodes,
-        infra.edges,
-        infra.infrastructure_index,
-        pred_obj.gdp_current,    # Economic Base
-        pred_obj.traffic_index,  # Negative Driver
-        pred_obj.crime_rate,     # Negative Driver
-        pred_obj.aqi             # Negative Driver
-    ]
-    
-    X.append(features)
-    training_cities.append(city)
-
-    # 4. Define "Ground Truth" (y) -> Growth Score
-    # Growth is complex:
-    # + Positive: Infra Index, GDP (high base can convert to stability or growth)
-    # - Negative: High Traffic, High Crime, High AQI (Pollution)
-    
-    # Normalized Factors
-    norm_infra = infra.infrastructure_index * 2.0  # (0-2 roughly)
-    norm_gdp = min(2.0, pred_obj.gdp_current / 50.0) # Cap impact of massive GDP
-    norm_traffic = pred_obj.traffic_index / 10.0   # 0-1
-    norm_crime = min(1.0, pred_obj.crime_rate / 800.0) # 0-1
-    norm_aqi = min(1.0, pred_obj.aqi / 300.0)      # 0-1
-    
-    # Base Growth Potential
-    # Good Infra + Money = Growth
-    growth_potential = (norm_infra * 4.0) + (norm_gdp * 2.0)
-    
-    # Drag Factors
-    # Traffic/Crime slow things down
-    drag = (norm_traffic * 2.5) + (norm_crime * 1.5) + (norm_aqi * 1.0)
-    
-    # Final Score (tuned to be typically 1.0 to 9.0)
-    final_score = max(1.0, min(9.5, 3.0 + growth_potential - drag))
-    
-    # Add some randomness for "market volatility"
-    chaos = random.uniform(-0.5, 0.5)
-    y.append(final_score + chaos)
-
-X = np.array(X)
-y = np.array(y)
-
-# Train Random Forest
-if len(X) > 0:
-    model = RandomForestRegressor(n_estimators=100, random_state=42)
-    model.fit(X, y)
-    
-    predicted_growths = model.predict(X)
-
-    print(f"--- Updating Predictions for {len(training_cities)} Cities ---")
-
-    for i, city in enumerate(training_cities):
-        pred_obj = city.citygrowthprediction
-        
-        # Update Scores
-        pred_obj.growth_score = round(y[i], 2)
-        pred_obj.predicted_growth = round(predicted_growths[i], 2)
-        
-        # Recalculate Positive/Negative Factors based on the FULL PICTURE
-        pos = []
-        neg = []
-        
-        if pred_obj.gdp_growth_rate > 6.0: pos.append("High Economic Velocity")
-        if city.population > 5000000: pos.append("Large Talent Pool")
-        if city.infrastructurefeature.infrastructure_index > 0.8: pos.append("Robost Infrastructure")
-        if pred_obj.traffic_index < 5.0: pos.append("Efficient Commute (Low Traffic)")
-        
-        if pred_obj.traffic_index > 8.0: neg.append("Severe Traffic Bottlenecks")
-        if pred_obj.crime_rate > 400: neg.append("Safety Concerns")
-        if pred_obj.aqi > 150: neg.append("Environmental Stress")
-        if pred_obj.predicted_growth < 3.0: neg.append("Stagnation Risk")
-        
-        pred_obj.positive_factors = pos
-        pred_obj.negative_factors = neg
-        
-        pred_obj.save()
-        print(f"   {city.name}: Growth {pred_obj.predicted_growth}, GDP ${pred_obj.gdp_current}B")
-
-print("✅ Global ML Model Trained & Applied")
+
+def main(seed=None, folds=DEFAULT_FOLDS, cpus=None, force=False):
+    # One joined query for every city with infrastructure and metrics;
+    # physical infrastructure is combined with Quality of Life metrics.
+    frame = load_training_frame()
+    X = training_matrix(frame)
+
+    if len(X) < 2:
+        print("Not enough cities with infrastructure and prediction rows; nothing to train.")
+        return
+
+    # Skip cities whose feature row is unchanged since it was scored
+    fingerprints = row_fingerprints(X)
+    prediction_ids = frame["prediction_id"].astype(int).tolist()
+    if force:
+        plan = Plan("retrain", np.arange(len(X)), "forced")
+    else:
+        plan = plan_update(X, fingerprints, stored_fingerprints(prediction_ids))
+    print(f"--- {plan.action.capitalize()}: {plan.reason} ---")
+    if plan.action == "noop":
+        return
+
+    rows = plan.changed
+    subset = {name: column[rows] for name, column in frame.items()}
+    y = growth_target(subset, np.random.default_rng(seed))
+
+    if plan.action == "retrain":
+        # Cross-validated Random Forest; predicted_growth is out-of-fold so
+        # no city is scored by a model that was fitted on it.
+        model, predicted, metrics = train_growth_model(X, y, folds=folds, cpus=cpus)
+        # Register a new version for online scoring via POST /api/predict/
+        version = registry.register(model, metrics=metrics, fingerprint=registry.data_fingerprint(X))
+        print(f"Registered model version {version}: params {metrics['params']}, "
+              f"CV R2 {metrics['cv_r2']}, out-of-fold MAE {metrics['oof_mae']}")
+    else:
+        # Re-score only the changed cities with the active model
+        model, metadata = registry.load()
+        predicted = model.predict(X[rows])
+        print(f"Scored with model version {metadata['version']}")
+
+    growth_scores = np.round(y, 2)
+    predicted_growths = np.round(predicted, 2)
+    # Recalculate Positive/Negative Factors based on the FULL PICTURE
+    positive, negative = growth_factors(subset, predicted_growths)
+
+    print(f"--- Updating Predictions for {len(rows)} Cities ---")
+
+    predictions = CityGrowthPrediction.objects.select_related("city").in_bulk(
+        [prediction_ids[row] for row in rows]
+    )
+    updated = []
+    for i, row in enumerate(rows):
+        pred_obj = predictions[prediction_ids[row]]
+        pred_obj.growth_score = float(growth_scores[i])
+        pred_obj.predicted_growth = float(predicted_growths[i])
+        pred_obj.positive_factors = positive[i]
+        pred_obj.negative_factors = negative[i]
+        pred_obj.feature_fingerprint = fingerprints[row]
+        updated.append(pred_obj)
+        print(f"   {pred_obj.city.name}: Growth {pred_obj.predicted_growth}, GDP ${pred_obj.gdp_current}B")
+
+    bulk_update(
+        CityGrowthPrediction,
+        updated,
+        ["growth_score", "predicted_growth", "positive_factors", "negative_factors", "feature_fingerprint"],
+    )
+
+    rebuild_snapshots()
+    print("✅ Global ML Model Trained & Applied")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train and register the growth model.")
+    parser.add_argument("--cpus", type=int, default=None,
+                        help="CPU budget for the search and final fit (default: all cores; -2 = all but one)")
+    parser.add_argument("--folds", type=int, default=DEFAULT_FOLDS)
+    parser.add_argument("--seed", type=int, default=None, help="seed for the target noise")
+    parser.add_argument("--force", action="store_true", help="retrain even if features are unchanged")
+    args = parser.parse_args()
+    main(seed=args.seed, folds=args.folds, cpus=args.cpus, force=args.force)
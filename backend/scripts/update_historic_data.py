@@ -10,11 +10,13 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
 django.setup()
 
 from growth.models import CityGrowthPrediction
+from growth.services.bulk import bulk_update
+from growth.services.snapshots import rebuild_snapshots
 
 def update_historic_data():
     print("--- Generatig Historic Growth Data (2019-2024) ---")
     
-    predictions = CityGrowthPrediction.objects.all()
+    predictions = list(CityGrowthPrediction.objects.select_related("city"))
     
     for pred in predictions:
         print(f"Processing {pred.city.name}...")
@@ -50,8 +52,11 @@ def update_historic_data():
             })
             
         pred.historic_growth = history
-        pred.save()
         print(f"   Added {len(history)} years of history.")
 
+    # One transaction for every city instead of a commit per save()
+    bulk_update(CityGrowthPrediction, predictions, ["historic_growth"])
+
 if __name__ == "__main__":
     update_historic_data()
+    rebuild_snapshots()
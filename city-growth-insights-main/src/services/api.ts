@@ -41,6 +41,7 @@ export interface NewsItem {
   link: string;
   source: string;
   published: string;
+  country?: string;
 }
 
 export const fetchCities = async (): Promise<City[]> => {
@@ -58,4 +59,11 @@ export const fetchNews = async (country: string = 'India'): Promise<NewsItem[]>
   return response.data;
 };
 
+export const fetchNewsBatch = async (countries: string[]): Promise<NewsItem[]> => {
+  const response = await api.get('/api/news/', {
+    params: { country: countries.join(',') },
+  });
+  return response.data;
+};
+
 export default api;